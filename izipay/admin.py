@@ -1,8 +1,52 @@
 from django.contrib import admin
-from .models import IzipayConfig
+from django.contrib.admin.views.main import ChangeList
+from .models import IzipayConfig, IzipayNotification, PaymentEvent, Tenant
+
+
+class IzipayConfigChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        # El listado no muestra las claves: solo se leen las columnas de list_display
+        return super().get_queryset(request, exclude_parameters).only(*self.model_admin.list_display)
+
 
 @admin.register(IzipayConfig)
 class IzipayConfigAdmin(admin.ModelAdmin):
     list_display = ['merchant_code', 'is_sandbox', 'is_active', 'created_at']
     list_filter = ['is_sandbox', 'is_active']
-    fields = ['merchant_code', 'api_key', 'hash_key', 'public_key', 'is_sandbox', 'is_active']
\ No newline at end of file
+    fields = ['merchant_code', 'api_key', 'hash_key', 'public_key', 'is_sandbox', 'is_active']
+
+    def get_changelist(self, request, **kwargs):
+        return IzipayConfigChangeList
+
+
+@admin.register(IzipayNotification)
+class IzipayNotificationAdmin(admin.ModelAdmin):
+    list_display = ['transaction_uuid', 'order_id', 'order_status', 'status', 'attempts', 'received_at']
+    list_filter = ['status', 'order_status']
+    search_fields = ['transaction_uuid', 'order_id']
+    readonly_fields = ['transaction_uuid', 'order_id', 'order_status', 'answer_type', 'raw_answer', 'received_at', 'processed_at']
+
+
+@admin.register(Tenant)
+class TenantAdmin(admin.ModelAdmin):
+    list_display = ['shop', 'izipay_config', 'is_active', 'created_at']
+    list_filter = ['is_active']
+    search_fields = ['shop__shop_name', 'izipay_config__merchant_code']
+    list_select_related = ['shop', 'izipay_config']
+
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ['order_id', 'status', 'source', 'amount', 'currency', 'transaction_uuid', 'created_at']
+    list_filter = ['status', 'source']
+    search_fields = ['order_id', 'transaction_uuid']
+
+    # El libro es de solo inserción: los eventos los escribe la aplicación y no se editan ni se borran
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
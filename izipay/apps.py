@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class IzipayConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'izipay'
+
+    def ready(self):
+        from . import ledger, signals  # noqa: F401
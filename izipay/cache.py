@@ -0,0 +1,88 @@
+"""
+Caché por proceso de la configuración activa de Izipay.
+
+La configuración activa se lee en cada carga del checkout pero cambia muy
+pocas veces. Cada proceso guarda su propia copia junto con un número de
+generación; la generación vive en el backend de caché de Django, así que al
+invalidarla desde cualquier worker el resto recarga la fila en su siguiente
+lectura. Mientras la generación no cambie, la lectura no toca la base de datos.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from shop_izi import metrics
+
+_MISSING = object()
+
+
+class VersionedCache:
+    """Valor cacheado en memoria del proceso y versionado por un contador compartido"""
+
+    def __init__(self, key, loader):
+        self.name = key
+        self.generation_key = f'{key}:generation'
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._generation = None
+        self._value = _MISSING
+
+    def current_generation(self):
+        """Generación vigente; si el backend la perdió se crea una nueva"""
+        generation = cache.get(self.generation_key)
+        if generation is None:
+            # Un valor basado en el reloj evita reutilizar una generación
+            # que algún proceso ya tenga cacheada
+            cache.add(self.generation_key, time.time_ns(), timeout=None)
+            generation = cache.get(self.generation_key)
+        return generation
+
+    def get(self):
+        """Retorna el valor cacheado, recargándolo si la generación cambió"""
+        generation = self.current_generation()
+        if self._value is not _MISSING and self._generation == generation:
+            metrics.observe_cache(self.name, hit=True)
+            return self._value
+        metrics.observe_cache(self.name, hit=False)
+        with self._lock:
+            if self._value is _MISSING or self._generation != generation:
+                # La generación se leyó antes de cargar: si alguien invalida
+                # durante la carga, la siguiente lectura volverá a cargar
+                self._value = self.loader()
+                self._generation = generation
+            return self._value
+
+    def invalidate(self):
+        """Incrementa la generación para que todos los procesos recarguen"""
+        with self._lock:
+            self._value = _MISSING
+        try:
+            cache.incr(self.generation_key)
+        except ValueError:
+            cache.add(self.generation_key, time.time_ns(), timeout=None)
+
+
+def _load_active_config():
+    from .models import IzipayConfig
+    # Hay a lo sumo una fila activa (izipay_single_active_config): sin ORDER BY se
+    # lee del índice parcial. public_key (la clave RSA, un TEXT grande) no se usa
+    # en el servidor
+    rows = IzipayConfig.objects.filter(is_active=True).order_by().defer('public_key')[:1]
+    return rows[0] if rows else None
+
+
+active_config_cache = VersionedCache('izipay:active_config', _load_active_config)
+
+
+def invalidate_active_config():
+    """
+    Invalida la configuración activa cacheada.
+
+    Se invalida de inmediato y otra vez al confirmar la transacción: si otro
+    worker recargara antes del commit, guardaría la fila antigua con la
+    generación nueva.
+    """
+    active_config_cache.invalidate()
+    transaction.on_commit(active_config_cache.invalidate)
@@ -0,0 +1,110 @@
+"""
+Pruebas de conectividad con Izipay, en versión síncrona y asíncrona.
+monitoring.probes ejecuta periódicamente las asíncronas (todas las
+configuraciones en un solo event loop); los endpoints sirven su resultado.
+"""
+from datetime import datetime
+
+import httpx
+import requests
+
+from shop_izi import async_http, http
+from .signing import get_signer
+
+
+def _environment(config):
+    return 'Sandbox' if config.is_sandbox else 'Producción'
+
+
+def _simple_result(config, test_url, response):
+    return {
+        'success': True,
+        'message': 'Conectividad básica exitosa con Izipay',
+        'config_info': {
+            'merchant_code': config.merchant_code,
+            'environment': _environment(config),
+            'script_url': config.script_url,
+            'tested_url': test_url
+        },
+        'response_status': response.status_code
+    }
+
+
+def _full_request(config):
+    """URL, cuerpo y headers firmados de la petición CreatePayment de prueba"""
+    api_url = config.get_api_url('Charge/CreatePayment')
+
+    # Datos de prueba
+    test_data = {
+        'amount': 100,
+        'currency': 'PEN',
+        'orderId': f'test-{datetime.now().strftime("%Y%m%d%H%M%S")}'
+    }
+
+    # Se envían exactamente los bytes firmados
+    body, headers = get_signer(config).prepare(test_data)
+    return api_url, body, headers
+
+
+def _full_result(config, api_url, response):
+    return {
+        'success': True,
+        'message': f'Respuesta recibida de Izipay (Status: {response.status_code})',
+        'config_info': {
+            'merchant_code': config.merchant_code,
+            'environment': _environment(config),
+            'script_url': config.script_url,
+            'api_url': api_url
+        },
+        'response_status': response.status_code,
+        'response_preview': response.text[:200] + '...' if len(response.text) > 200 else response.text
+    }
+
+
+def _error_result(error, attempted_url):
+    return {
+        'success': False,
+        'message': 'No se pudo conectar con Izipay',
+        'error': f'Error de conexión: {str(error)}',
+        'attempted_url': attempted_url
+    }
+
+
+def simple_test(config):
+    """Prueba simple de conectividad"""
+    test_url = config.script_url
+    try:
+        response = http.get(test_url)
+    except requests.exceptions.RequestException as e:
+        return _error_result(e, test_url)
+    return _simple_result(config, test_url, response)
+
+
+def full_test(config):
+    """Prueba completa de conectividad con API"""
+    api_url, body, headers = _full_request(config)
+    try:
+        response = http.post(api_url, data=body, headers=headers, timeout=http.timeouts(read=30))
+    except requests.exceptions.RequestException as e:
+        return _error_result(e, api_url)
+    return _full_result(config, api_url, response)
+
+
+async def asimple_test(config):
+    """Versión asíncrona de simple_test"""
+    test_url = config.script_url
+    try:
+        response = await async_http.get(test_url)
+    except httpx.HTTPError as e:
+        return _error_result(e, test_url)
+    return _simple_result(config, test_url, response)
+
+
+async def afull_test(config):
+    """Versión asíncrona de full_test"""
+    api_url, body, headers = _full_request(config)
+    try:
+        response = await async_http.post(api_url, content=body, headers=headers, timeout=async_http.timeouts(read=30))
+    except httpx.HTTPError as e:
+        return _error_result(e, api_url)
+    return _full_result(config, api_url, response)
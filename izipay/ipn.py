@@ -0,0 +1,149 @@
+"""
+Recepción y procesamiento diferido de las notificaciones de pago (IPN) de Izipay.
+
+La vista solo verifica la firma, guarda la notificación y responde; en la
+misma transacción encola el job izipay.process_notification, que ejecuta el
+worker run_jobs. El comando process_izipay_notifications queda para procesar
+pendientes a mano. La deduplicación se apoya en el índice único de
+transaction_uuid, y cada procesamiento reserva antes la notificación (claim)
+para que el job y el comando no registren dos veces el mismo pago; las
+reservadas por un proceso que murió vuelven a 'pending' tras STALE_TIMEOUT.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from jobs.registry import enqueue
+from shop_izi import fastjson
+
+from . import ledger
+from .signing import get_signer
+from .models import IzipayNotification
+
+# Segundos en 'processing' tras los que se da por muerto a quien la reservó
+STALE_TIMEOUT = 600
+
+
+class InvalidNotification(Exception):
+    """La notificación no tiene el formato esperado"""
+
+
+def verify_signature(config, answer, signature):
+    """kr-hash es el HMAC-SHA256 (hex) de kr-answer con la clave hash"""
+    return get_signer(config).verify(answer, signature)
+
+
+def get_merchant_code(answer):
+    """shopId de kr-answer (código de comercio), para elegir la configuración con la que verificar"""
+    try:
+        return fastjson.loads(answer).get('shopId') or ''
+    except (ValueError, AttributeError):
+        return ''
+
+
+def parse_answer(answer):
+    """Extrae de kr-answer los campos necesarios para deduplicar e indexar"""
+    try:
+        data = fastjson.loads(answer)
+        transaction_data = data['transactions'][0]
+        transaction_uuid = transaction_data['uuid']
+    except (ValueError, KeyError, IndexError, TypeError):
+        raise InvalidNotification('kr-answer sin transacción')
+    return {
+        'transaction_uuid': transaction_uuid,
+        'order_id': (data.get('orderDetails') or {}).get('orderId') or '',
+        'order_status': data.get('orderStatus') or '',
+    }
+
+
+def store_notification(answer, answer_type=''):
+    """
+    Guarda la notificación pendiente de procesar.
+    Retorna False si la transacción ya se había recibido.
+    """
+    fields = parse_answer(answer)
+    try:
+        with transaction.atomic():
+            notification = IzipayNotification.objects.create(raw_answer=answer, answer_type=answer_type, **fields)
+            enqueue('izipay.process_notification', notification_id=notification.pk)
+    except IntegrityError:
+        return False
+    return True
+
+
+def process_notification(notification):
+    """
+    Procesa una notificación recibida: normaliza sus datos y registra el
+    cambio de estado del pago en el libro de transacciones
+    """
+    data = fastjson.loads(notification.raw_answer)
+    fields = parse_answer(notification.raw_answer)
+    notification.order_id = fields['order_id']
+    notification.order_status = fields['order_status']
+    ledger.record_notification(notification, data)
+    return data
+
+
+def claim(notification_id, statuses=(IzipayNotification.STATUS_PENDING,)):
+    """
+    Reserva la notificación pasándola a 'processing' solo si sigue en uno de
+    `statuses`, para que el job y process_izipay_notifications no la procesen
+    los dos. Retorna la notificación reservada o None si otro la tomó.
+    """
+    claimed = (
+        IzipayNotification.objects
+        .filter(pk=notification_id, status__in=statuses)
+        .update(status=IzipayNotification.STATUS_PROCESSING, updated_at=timezone.now())
+    )
+    if claimed != 1:
+        return None
+    return IzipayNotification.objects.get(pk=notification_id)
+
+
+def requeue_stale(timeout=STALE_TIMEOUT):
+    """Devuelve a 'pending' las notificaciones reservadas por un proceso que murió sin terminarlas"""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return IzipayNotification.objects.filter(
+        status=IzipayNotification.STATUS_PROCESSING, updated_at__lt=cutoff,
+    ).update(status=IzipayNotification.STATUS_PENDING, updated_at=timezone.now())
+
+
+def handle_notification(notification):
+    """Procesa la notificación y guarda el resultado; retorna el estado final"""
+    notification.attempts += 1
+    try:
+        process_notification(notification)
+    except Exception as e:
+        notification.status = IzipayNotification.STATUS_FAILED
+        notification.error = str(e)
+    else:
+        notification.status = IzipayNotification.STATUS_PROCESSED
+        notification.error = ''
+    notification.processed_at = timezone.now()
+    notification.save(update_fields=[
+        'order_id', 'order_status', 'status', 'attempts', 'error', 'processed_at', 'updated_at',
+    ])
+    return notification.status
+
+
+def process_pending(batch_size=100, stale_timeout=STALE_TIMEOUT):
+    """
+    Procesa un lote de notificaciones pendientes en orden de llegada, tras
+    recuperar las reservadas hace más de `stale_timeout` segundos.
+    Retorna el número de notificaciones procesadas (con éxito o no).
+    """
+    requeue_stale(stale_timeout)
+    pending = list(
+        IzipayNotification.objects
+        .filter(status=IzipayNotification.STATUS_PENDING)
+        .order_by('received_at')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    processed = 0
+    for notification_id in pending:
+        notification = claim(notification_id)
+        if notification:
+            handle_notification(notification)
+            processed += 1
+    return processed
@@ -0,0 +1,68 @@
+"""
+Escritura en el libro de transacciones (PaymentEvent) desde cada origen.
+Todas las funciones solo insertan filas.
+"""
+from decimal import Decimal
+
+from shopify import webhooks
+
+from .models import PaymentEvent
+
+# orderStatus de las IPN de Izipay
+IPN_STATUSES = {
+    'PAID': PaymentEvent.STATUS_CAPTURED,
+    'RUNNING': PaymentEvent.STATUS_PENDING,
+    'PARTIALLY_PAID': PaymentEvent.STATUS_PENDING,
+    'UNPAID': PaymentEvent.STATUS_FAILED,
+    'ABANDONED': PaymentEvent.STATUS_FAILED,
+}
+
+
+def shopify_gid(order_id):
+    return f'gid://shopify/Order/{order_id}'
+
+
+def record_payment_results(orders, results):
+    """Un evento por orden enviada a CreatePayment (mismo orden que `orders`)"""
+    PaymentEvent.objects.bulk_create([
+        PaymentEvent(
+            order_id=result['order_id'],
+            shopify_order_gid=shopify_gid(result['order_id']),
+            amount=order['total_price'],
+            currency=order['currency'],
+            status=PaymentEvent.STATUS_CREATED if result['success'] else PaymentEvent.STATUS_FAILED,
+            source=PaymentEvent.SOURCE_API,
+        )
+        for order, result in zip(orders, results)
+    ])
+
+
+def record_notification(notification, data):
+    """Evento a partir de una IPN ya verificada (data es kr-answer decodificado)"""
+    status = IPN_STATUSES.get(notification.order_status)
+    if not status or not notification.order_id:
+        return None
+    details = data.get('orderDetails') or {}
+    amount = details.get('orderTotalAmount')
+    return PaymentEvent.objects.create(
+        order_id=notification.order_id,
+        shopify_order_gid=shopify_gid(notification.order_id),
+        transaction_uuid=notification.transaction_uuid,
+        # Izipay informa los montos en céntimos
+        amount=Decimal(amount) / 100 if amount is not None else None,
+        currency=details.get('orderCurrency') or '',
+        status=status,
+        source=PaymentEvent.SOURCE_IPN,
+    )
+
+
+@webhooks.register('orders/paid')
+def record_shopify_paid(shop_domain, payload):
+    PaymentEvent.objects.create(
+        order_id=str(payload['id']),
+        shopify_order_gid=payload.get('admin_graphql_api_id') or shopify_gid(payload['id']),
+        amount=Decimal(str(payload['total_price'])) if payload.get('total_price') else None,
+        currency=payload.get('currency') or '',
+        status=PaymentEvent.STATUS_SHOPIFY_PAID,
+        source=PaymentEvent.SOURCE_SHOPIFY,
+    )
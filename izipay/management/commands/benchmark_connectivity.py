@@ -0,0 +1,54 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from shop_izi.benchmarks import Timer, stub_server, summarize
+from izipay import connectivity
+from izipay.models import IzipayConfig
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la concurrencia de la prueba de conectividad síncrona (hilos de un "
+        "worker WSGI) frente a la asíncrona (un solo event loop) contra un upstream local lento"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Peticiones en vuelo a la vez")
+        parser.add_argument('--threads', type=int, default=8, help="Hilos del worker síncrono")
+        parser.add_argument('--delay', type=float, default=0.2, help="Latencia simulada del upstream (s)")
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        with stub_server(delay=options['delay']) as base_url:
+            # Instancia sin guardar: save() reescribiría script_url
+            config = IzipayConfig(merchant_code='bench', script_url=f'{base_url}/payments/v1/js/index.js')
+
+            def timed_sync(_):
+                start = time.perf_counter()
+                connectivity.simple_test(config)
+                return time.perf_counter() - start
+
+            with Timer() as timer, ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                latencies = list(pool.map(timed_sync, range(total)))
+            self._report('sync (requests + hilos)', summarize(latencies, timer.elapsed))
+
+            async def timed_async():
+                start = time.perf_counter()
+                await connectivity.asimple_test(config)
+                return time.perf_counter() - start
+
+            async def run_async():
+                return await asyncio.gather(*(timed_async() for _ in range(total)))
+
+            with Timer() as timer:
+                latencies = asyncio.run(run_async())
+            self._report('async (httpx, un loop)', summarize(latencies, timer.elapsed))
+
+    def _report(self, label, summary):
+        self.stdout.write(
+            f"{label:<26} {summary['requests']} req en {summary['elapsed_s']}s "
+            f"-> {summary['throughput_rps']} req/s, p50 {summary['p50_ms']}ms, p99 {summary['p99_ms']}ms"
+        )
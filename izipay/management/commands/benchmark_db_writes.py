@@ -0,0 +1,72 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+from shop_izi.benchmarks import Timer, summarize
+from izipay.models import PaymentEvent
+
+ORDER_PREFIX = 'bench-'
+
+
+class Command(BaseCommand):
+    help = (
+        "Escrituras concurrentes al estilo de los webhooks (leer el último estado y "
+        "agregar un evento, en una transacción) contra la base configurada. Compara "
+        "ejecutándolo con DB_ENGINE=postgres, DB_ENGINE=sqlite y SQLITE_TUNING=0."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--writes', type=int, default=200, help="Escrituras por hilo")
+
+    def handle(self, *args, **options):
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def writer(index):
+            own_latencies, own_errors = [], []
+            for number in range(options['writes']):
+                order_id = f'{ORDER_PREFIX}{index}-{number % 10}'
+                start = time.perf_counter()
+                try:
+                    with transaction.atomic():
+                        PaymentEvent.objects.latest_for_order(order_id)
+                        PaymentEvent.objects.create(
+                            order_id=order_id,
+                            status=PaymentEvent.STATUS_PENDING,
+                            source=PaymentEvent.SOURCE_IPN,
+                        )
+                except OperationalError as e:
+                    own_errors.append(str(e))
+                else:
+                    own_latencies.append(time.perf_counter() - start)
+            connection.close()
+            with lock:
+                latencies.extend(own_latencies)
+                errors.extend(own_errors)
+
+        threads = [threading.Thread(target=writer, args=(index,)) for index in range(options['threads'])]
+        try:
+            with Timer() as timer:
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            PaymentEvent.objects.filter(order_id__startswith=ORDER_PREFIX).delete()
+
+        database = settings.DATABASES['default']
+        mode = database['ENGINE'].rsplit('.', 1)[-1]
+        if mode == 'sqlite3':
+            mode += ' (WAL)' if database.get('OPTIONS') else ' (por defecto)'
+        summary = summarize(latencies, timer.elapsed)
+        self.stdout.write(
+            f"{mode}: {summary['requests']} escrituras en {summary['elapsed_s']}s "
+            f"-> {summary['throughput_rps']}/s, p50 {summary['p50_ms']}ms, p99 {summary['p99_ms']}ms, "
+            f"{len(errors)} errores"
+        )
+        if errors:
+            self.stdout.write(f"  primer error: {errors[0]}")
@@ -0,0 +1,102 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from shop_izi.benchmarks import summarize
+from izipay.models import PaymentEvent
+
+# Secuencia de estados de una orden; algunas se quedan en pendiente
+LIFECYCLE = [
+    PaymentEvent.STATUS_CREATED,
+    PaymentEvent.STATUS_PENDING,
+    PaymentEvent.STATUS_CAPTURED,
+    PaymentEvent.STATUS_SHOPIFY_PAID,
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de las consultas del libro de transacciones sobre N filas. "
+        "Las filas se insertan dentro de una transacción que se revierte al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--lookups', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                order_ids, transaction_uuids = self._populate(options['rows'], options['batch_size'])
+                self._measure(order_ids, transaction_uuids, options['lookups'])
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write("Filas de prueba revertidas")
+
+    def _populate(self, rows, batch_size):
+        now = timezone.now()
+        order_ids, transaction_uuids, batch = [], [], []
+        inserted = 0
+        start = time.perf_counter()
+        order_number = 0
+        while inserted < rows:
+            order_number += 1
+            order_id = str(10_000_000 + order_number)
+            order_ids.append(order_id)
+            txn = uuid.uuid4().hex
+            transaction_uuids.append(txn)
+            created = now - timedelta(minutes=random.randint(0, 60 * 24 * 30))
+            # Una de cada diez órdenes se queda en pendiente
+            steps = 2 if order_number % 10 == 0 else len(LIFECYCLE)
+            for step, status in enumerate(LIFECYCLE[:steps]):
+                batch.append(PaymentEvent(
+                    order_id=order_id,
+                    transaction_uuid=txn if step else '',
+                    amount=100,
+                    currency='PEN',
+                    status=status,
+                    source=PaymentEvent.SOURCE_API,
+                    created_at=created + timedelta(minutes=step),
+                ))
+            if len(batch) >= batch_size:
+                PaymentEvent.objects.bulk_create(batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            PaymentEvent.objects.bulk_create(batch)
+            inserted += len(batch)
+        self.stdout.write(f"{inserted} filas insertadas en {time.perf_counter() - start:.1f}s")
+        return order_ids, transaction_uuids
+
+    def _measure(self, order_ids, transaction_uuids, lookups):
+        queries = {
+            'por orden (último estado)': lambda: PaymentEvent.objects.latest_for_order(random.choice(order_ids)),
+            'por orden (historial)': lambda: list(PaymentEvent.objects.for_order(random.choice(order_ids))),
+            'por transacción': lambda: list(PaymentEvent.objects.for_transaction(random.choice(transaction_uuids))),
+            'pendientes > 60 min (100)': lambda: list(PaymentEvent.objects.stale_pending(60)[:100]),
+        }
+        plans = {
+            'por orden (último estado)': PaymentEvent.objects.for_order(order_ids[0]),
+            'por transacción': PaymentEvent.objects.for_transaction(transaction_uuids[0]),
+            'pendientes > 60 min (100)': PaymentEvent.objects.stale_pending(60)[:100],
+        }
+        for label, query in queries.items():
+            latencies = []
+            for _ in range(lookups):
+                start = time.perf_counter()
+                query()
+                latencies.append(time.perf_counter() - start)
+            summary = summarize(latencies, sum(latencies))
+            self.stdout.write(f"{label:<28} p50 {summary['p50_ms']}ms  p99 {summary['p99_ms']}ms")
+            if label in plans:
+                self.stdout.write(f"    plan: {plans[label].explain().replace(chr(10), ' | ')}")
@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from izipay import serializers as izipay_serializers
+from izipay.models import IzipayConfig
+from shop_izi import fastjson
+from shopify import serializers as shopify_serializers
+from shopify.models import ShopifyConfig
+
+
+def _izipay_configs(count):
+    """Instancias sin guardar y sus filas equivalentes de .values(): no toca la base de datos"""
+    now = timezone.now()
+    configs = [
+        IzipayConfig(
+            id=number + 1, merchant_code=f'400{number:04d}', api_key='a' * 40, hash_key='h' * 40,
+            script_url='https://sandbox-checkout.izipay.pe/payments/v1/js/index.js', is_sandbox=number % 2 == 0,
+            is_active=number == 0, created_at=now - timedelta(days=number), updated_at=now,
+        )
+        for number in range(count)
+    ]
+    columns = izipay_serializers.config_public.columns
+    return configs, [{column: getattr(config, column) for column in columns} for config in configs]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide µs por respuesta de los serializadores DRF de los endpoints más llamados frente "
+        "a los ligeros de shop_izi.lean (solo CPU de serialización, sin base de datos)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20_000)
+        parser.add_argument('--page-size', type=int, default=20, help="Configuraciones por página del listado")
+
+    def handle(self, *args, **options):
+        configs, rows = _izipay_configs(options['page_size'])
+        shop = ShopifyConfig(id=1, shop_name='tienda.myshopify.com', api_key='legacy', is_active=True)
+        shop_row = {column: getattr(shop, column) for column in shopify_serializers.config_public.columns}
+        izipay_result = {
+            'success': True, 'message': 'Conectividad OK', 'response_status': 200, 'latency_ms': 41.3,
+            'config_info': {'merchant_code': '4001834', 'environment': 'Sandbox'},
+            'test_type': 'simple', 'timestamp': timezone.now(),
+        }
+        shopify_result = {'success': True, 'message': 'Connection successful.', 'latency_ms': 52.8,
+                          'timestamp': timezone.now()}
+
+        runs = [
+            ('izipay list (página)',
+             lambda: izipay_serializers.IzipayConfigPublicSerializer(configs, many=True).data,
+             lambda: izipay_serializers.config_public.many(rows)),
+            ('izipay active_config',
+             lambda: izipay_serializers.IzipayConfigPublicSerializer(configs[0]).data,
+             lambda: izipay_serializers.config_public.from_instance(configs[0])),
+            ('izipay test_connectivity',
+             lambda: izipay_serializers.ConnectivityTestResponseSerializer(izipay_result).data,
+             lambda: izipay_serializers.connectivity_response.to_representation(izipay_result)),
+            ('shopify active_config',
+             lambda: shopify_serializers.ShopifyConfigPublicSerializer(shop).data,
+             lambda: shopify_serializers.config_public.to_representation(shop_row)),
+            ('shopify test_connectivity',
+             lambda: shopify_serializers.ConnectivityTestResponseSerializer(shopify_result).data,
+             lambda: shopify_serializers.connectivity_response.to_representation(shopify_result)),
+        ]
+        iterations = options['iterations']
+        for label, drf, lean in runs:
+            if fastjson.dumps(drf()) != fastjson.dumps(lean()):
+                self.stderr.write(f"{label}: la salida no coincide")
+            before, after = self._time(drf, iterations), self._time(lean, iterations)
+            self.stdout.write(
+                f"{label:<26} DRF {before:>8.1f} µs  ligero {after:>7.1f} µs  ({before / after:.1f}x)"
+            )
+
+    @staticmethod
+    def _time(function, iterations):
+        start = time.process_time()
+        for _ in range(iterations):
+            function()
+        return (time.process_time() - start) / iterations * 1e6
@@ -0,0 +1,53 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from izipay.models import IzipayConfig
+from izipay.payments import build_payment_data
+from izipay.signing import get_signer
+
+
+def _sign_without_cache(config, data):
+    """Firma como se hacía antes: clave, header Basic y JSON rehechos en cada llamada"""
+    payload = json.dumps(data, separators=(',', ':'))
+    signature = hmac.new(config.hash_key.encode('utf-8'), payload.encode('utf-8'), hashlib.sha256).hexdigest()
+    headers = {
+        'Content-Type': 'application/json',
+        'Authorization': f'Basic {base64.b64encode(f"{config.merchant_code}:{config.api_key}".encode()).decode()}',
+        'X-Hmac-Sha256': signature,
+    }
+    # requests volvía a serializar el dict con json=...
+    return json.dumps(data).encode('utf-8'), headers
+
+
+class Command(BaseCommand):
+    help = "Mide firmas por segundo del Signer cacheado frente a rehacer clave, header y JSON en cada pago"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200_000)
+
+    def handle(self, *args, **options):
+        # Instancia sin guardar: no toca la base de datos
+        config = IzipayConfig(merchant_code='4001834', api_key='a' * 40, hash_key='h' * 40)
+        data = build_payment_data({
+            'id': '5551234', 'name': '#1001', 'total_price': '149.90', 'currency': 'PEN',
+            'email': 'cliente@example.com',
+        })
+        iterations = options['iterations']
+        runs = [
+            ('sin caché', lambda: _sign_without_cache(config, data)),
+            ('Signer.prepare', lambda: get_signer(config).prepare(data)),
+            ('Signer.sign (solo HMAC)', lambda: get_signer(config).sign(b'{"amount":14990}')),
+        ]
+        for label, sign in runs:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                sign()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{label:<24} {iterations / elapsed:>12,.0f} firmas/s  {elapsed / iterations * 1e6:.2f} µs/firma"
+            )
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from izipay.ipn import STALE_TIMEOUT, process_pending
+
+
+class Command(BaseCommand):
+    help = "Procesa las notificaciones (IPN) de Izipay pendientes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help="Seguir esperando nuevas notificaciones")
+        parser.add_argument('--interval', type=float, default=1.0, help="Espera entre lotes vacíos (s)")
+        parser.add_argument(
+            '--stale-timeout', type=int, default=STALE_TIMEOUT,
+            help="Reprocesar las que llevan más de estos segundos en proceso",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending(options['batch_size'], options['stale_timeout'])
+            if processed:
+                self.stdout.write(f"{processed} notificaciones procesadas")
+            elif not options['loop']:
+                break
+            else:
+                time.sleep(options['interval'])
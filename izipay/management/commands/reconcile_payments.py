@@ -0,0 +1,74 @@
+import csv
+import sys
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from izipay.reconciliation import FixPusher, MultipleShopsError, reconcile
+from shopify.models import ShopifyConfig
+
+
+class Command(BaseCommand):
+    help = (
+        "Cruza los cobros de Izipay con las órdenes de Shopify de un rango de fechas y "
+        "escribe un reporte CSV de diferencias. Sincroniza antes las órdenes con sync_shopify_orders."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', required=True, help="Fecha inicial (YYYY-MM-DD, incluida)")
+        parser.add_argument('--until', help="Fecha final (YYYY-MM-DD, incluida); por defecto hoy")
+        parser.add_argument(
+            '--shop', help="shop_name de la tienda a conciliar (obligatoria si el rango tiene órdenes de varias tiendas)",
+        )
+        parser.add_argument('--output', help="Archivo CSV del reporte (por defecto la salida estándar)")
+        parser.add_argument('--push-fixes', action='store_true', help="Marcar como pagadas en Shopify las órdenes cobradas")
+
+    def _day_start(self, value, option):
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Fecha inválida para {option}: {value}")
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    def handle(self, *args, **options):
+        since = self._day_start(options['since'], '--since')
+        until = (
+            self._day_start(options['until'], '--until') if options['until']
+            else timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        ) + timedelta(days=1)
+
+        config = None
+        if options['shop']:
+            config = ShopifyConfig.objects.filter(shop_name=options['shop']).first()
+            if not config:
+                raise CommandError(f"No existe la tienda {options['shop']}")
+
+        try:
+            mismatches = reconcile(since, until, config)
+        except MultipleShopsError as e:
+            raise CommandError(f"{e} (--shop)")
+
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        pusher = FixPusher() if options['push_fixes'] else None
+        found = fixed = 0
+        try:
+            writer = csv.writer(output)
+            writer.writerow([
+                'order_id', 'kind', 'izipay_amount', 'shopify_amount', 'shopify_status',
+                'transaction_uuids', 'detail', 'fix',
+            ])
+            for mismatch in mismatches:
+                found += 1
+                fix = ''
+                if pusher:
+                    success, fix = pusher.push(mismatch)
+                    fixed += success
+                writer.writerow([
+                    mismatch.order_id, mismatch.kind, mismatch.izipay_amount, mismatch.shopify_amount,
+                    mismatch.shopify_status, mismatch.transaction_uuids, mismatch.detail, fix,
+                ])
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(f"{found} diferencias encontradas, {fixed} corregidas")
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('izipay', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IzipayNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_uuid', models.CharField(max_length=64, unique=True, verbose_name='UUID de transacción')),
+                ('order_id', models.CharField(blank=True, max_length=64, verbose_name='ID de orden')),
+                ('order_status', models.CharField(blank=True, max_length=32, verbose_name='Estado de la orden en Izipay')),
+                ('answer_type', models.CharField(blank=True, max_length=64, verbose_name='Tipo de respuesta')),
+                ('raw_answer', models.TextField(verbose_name='Respuesta original (kr-answer)')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('processing', 'En proceso'), ('processed', 'Procesada'), ('failed', 'Fallida')], default='pending', max_length=16, verbose_name='Estado de procesamiento')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Intentos de procesamiento')),
+                ('error', models.TextField(blank=True, verbose_name='Último error')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de recepción')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de procesamiento')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Última actualización')),
+            ],
+            options={
+                'verbose_name': 'Notificación Izipay',
+                'verbose_name_plural': 'Notificaciones Izipay',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(fields=['status', 'received_at'], name='izipay_notif_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('izipay', '0002_izipaynotification'),
+        ('shopify', '0003_orders_and_sync_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='izipayconfig',
+            name='merchant_code',
+            field=models.CharField(db_index=True, help_text='Código de comercio proporcionado por Izipay', max_length=50, verbose_name='Código de comercio'),
+        ),
+        migrations.CreateModel(
+            name='Tenant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Activo')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Última actualización')),
+                ('izipay_config', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='tenants', to='izipay.izipayconfig', verbose_name='Configuración Izipay')),
+                ('shop', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='tenant', to='shopify.shopifyconfig', verbose_name='Tienda Shopify')),
+            ],
+            options={
+                'verbose_name': 'Tienda vinculada',
+                'verbose_name_plural': 'Tiendas vinculadas',
+            },
+        ),
+    ]
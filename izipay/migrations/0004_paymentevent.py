@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('izipay', '0003_tenant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.CharField(max_length=64, verbose_name='ID de orden')),
+                ('shopify_order_gid', models.CharField(blank=True, max_length=128, verbose_name='GID de la orden en Shopify')),
+                ('transaction_uuid', models.CharField(blank=True, max_length=64, verbose_name='UUID de transacción Izipay')),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='Monto')),
+                ('currency', models.CharField(blank=True, max_length=3, verbose_name='Moneda')),
+                ('status', models.CharField(choices=[('created', 'Pago creado'), ('pending', 'Pendiente'), ('captured', 'Cobrado en Izipay'), ('failed', 'Fallido'), ('refunded', 'Reembolsado'), ('shopify_paid', 'Pagado en Shopify')], max_length=16, verbose_name='Estado')),
+                ('source', models.CharField(choices=[('api', 'API de pagos'), ('ipn', 'IPN de Izipay'), ('shopify', 'Webhook de Shopify'), ('reconciliation', 'Conciliación')], max_length=16, verbose_name='Origen')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha del evento')),
+            ],
+            options={
+                'verbose_name': 'Evento de pago',
+                'verbose_name_plural': 'Eventos de pago',
+                'indexes': [models.Index(fields=['order_id', '-created_at', '-id'], name='payment_event_order_idx'), models.Index(condition=models.Q(('transaction_uuid', ''), _negated=True), fields=['transaction_uuid'], name='payment_event_txn_idx'), models.Index(fields=['status', 'created_at'], name='payment_event_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:53
+
+from django.db import migrations, models
+
+
+def keep_newest_active(apps, schema_editor):
+    """Deja activa solo la configuración activa más reciente antes de crear la restricción"""
+    IzipayConfig = apps.get_model('izipay', 'IzipayConfig')
+    active = IzipayConfig.objects.filter(is_active=True).order_by('-created_at', '-pk')
+    newest = active.values_list('pk', flat=True).first()
+    if newest is not None:
+        active.exclude(pk=newest).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('izipay', '0004_paymentevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_newest_active, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='izipayconfig',
+            index=models.Index(fields=['-created_at'], name='izipay_config_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='izipayconfig',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('is_active',), name='izipay_single_active_config'),
+        ),
+    ]
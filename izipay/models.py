@@ -1,5 +1,11 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import IntegrityError, connections, models, router, transaction
 from django.core.validators import URLValidator
+from django.utils import timezone
+
+# Clave de pg_advisory_xact_lock que serializa las activaciones de IzipayConfig
+ACTIVATION_LOCK_ID = 0x697A6970
 
 class IzipayConfig(models.Model):
     """
@@ -10,6 +16,7 @@ class IzipayConfig(models.Model):
     # Campos esenciales para la conectividad
     merchant_code = models.CharField(
         max_length=50, 
+        db_index=True,
         verbose_name="Código de comercio",
         help_text="Código de comercio proporcionado por Izipay"
     )
@@ -67,6 +74,28 @@ class IzipayConfig(models.Model):
         verbose_name = "Configuración Izipay"
         verbose_name_plural = "Configuraciones Izipay"
         ordering = ['-created_at']
+        constraints = [
+            # Índice parcial sobre la fila activa: get_active_config lo usa y la
+            # base de datos rechaza una segunda configuración activa
+            models.UniqueConstraint(
+                fields=['is_active'],
+                condition=models.Q(is_active=True),
+                name='izipay_single_active_config',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['-created_at'], name='izipay_config_created_idx'),
+        ]
+    
+    # is_active leído de la base de datos (None si no se leyó): save() solo
+    # serializa cuando la fila pasa a activa
+    _loaded_is_active = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_active = instance.__dict__.get('is_active')
+        return instance
     
     def __str__(self):
         return f"Izipay - {self.merchant_code} ({'Sandbox' if self.is_sandbox else 'Producción'})"
@@ -74,9 +103,24 @@ class IzipayConfig(models.Model):
     @classmethod
     def get_active_config(cls):
         """
-        Obtiene la configuración activa
+        Obtiene la configuración activa desde la caché del proceso
+        (ver izipay.cache); solo consulta la base de datos tras una invalidación
+        """
+        from .cache import active_config_cache
+        return active_config_cache.get()
+    
+    def get_base_url(self):
+        """
+        URL base de Izipay según el entorno (configurable en settings.UPSTREAMS)
         """
-        return cls.objects.filter(is_active=True).first()
+        from shop_izi.http import upstream_url
+        return upstream_url('IZIPAY_SANDBOX_URL' if self.is_sandbox else 'IZIPAY_PRODUCTION_URL')
+    
+    def get_api_url(self, endpoint):
+        """
+        Retorna la URL de la API REST V4 de Izipay según el entorno
+        """
+        return f"{self.get_base_url()}/api-payment/V4/{endpoint}"
     
     def get_script_tag(self):
         """
@@ -95,21 +139,88 @@ class IzipayConfig(models.Model):
             'keyRSA': self.public_key
         }
     
-    def save(self, *args, **kwargs):
+    @classmethod
+    def _lock_activations(cls):
         """
-        Auto-actualiza la URL del script según el entorno
+        Serializa hasta el fin de la transacción a quienes cambian la fila
+        activa. En PostgreSQL (READ COMMITTED) un SELECT ... FOR UPDATE no ve la
+        fila que otra transacción acaba de activar ni una nueva insertada, así
+        que se usa un advisory lock; SQLite (transaction_mode IMMEDIATE) ya
+        serializa las escrituras, y en otros motores se bloquean todas las filas
+        en orden de pk
         """
-        if self.is_sandbox:
-            self.script_url = "https://sandbox-checkout.izipay.pe/payments/v1/js/index.js"
+        connection = connections[router.db_for_write(cls)]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [ACTIVATION_LOCK_ID])
         else:
-            # URL de producción
-            self.script_url = "https://checkout.izipay.pe/payments/v1/js/index.js"
+            list(cls.objects.select_for_update().order_by('pk').values_list('pk', flat=True))
+
+    @classmethod
+    def activate(cls, config_id):
+        """
+        Deja activa solo la configuración `config_id`, en una transacción corta
+        serializada con las demás activaciones. No escribe nada si ya era la
+        única activa. Retorna True si hubo cambios (y se invalidaron las cachés
+        una sola vez).
+        """
+        with transaction.atomic():
+            cls._lock_activations()
+            rows = dict(
+                cls.objects.filter(models.Q(pk=config_id) | models.Q(is_active=True))
+                .order_by().values_list('pk', 'is_active')
+            )
+            if config_id not in rows:
+                raise cls.DoesNotExist(f'Configuración con ID {config_id} no encontrada')
+            others = [pk for pk, is_active in rows.items() if is_active and pk != config_id]
+            if rows[config_id] and not others:
+                return False
+            now = timezone.now()
+            # Primero se desactivan las demás: izipay_single_active_config admite una sola activa
+            if others:
+                cls.objects.filter(pk__in=others).update(is_active=False, updated_at=now)
+            if not rows[config_id]:
+                cls.objects.filter(pk=config_id).update(is_active=True, updated_at=now)
+            # update() no emite señales
+            from .cache import invalidate_active_config
+            from .tenants import invalidate_tenants
+            invalidate_active_config()
+            invalidate_tenants()
+        return True
+    
+    def save(self, *args, **kwargs):
+        """
+        Auto-actualiza la URL del script según el entorno. Si la configuración
+        pasa a activa, desactiva las otras en la misma transacción, serializada
+        como activate(); la señal post_save invalida las cachés
+        """
+        self.script_url = f"{self.get_base_url()}/payments/v1/js/index.js"
         
-        # Solo una configuración activa a la vez
-        if self.is_active:
-            IzipayConfig.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
+        if not self.is_active:
+            super().save(*args, **kwargs)
+            self._loaded_is_active = False
+            return
         
-        super().save(*args, **kwargs)
+        if self._loaded_is_active:
+            # Ya era la activa: sin bloqueo ni consulta de las demás
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # Otra activación la desactivó después de leerla: se vuelve a activar con el bloqueo
+                pass
+        
+        with transaction.atomic():
+            IzipayConfig._lock_activations()
+            others = list(
+                IzipayConfig.objects.filter(is_active=True).exclude(pk=self.pk)
+                .order_by().values_list('pk', flat=True)
+            )
+            if others:
+                IzipayConfig.objects.filter(pk__in=others).update(is_active=False, updated_at=timezone.now())
+            super().save(*args, **kwargs)
+        self._loaded_is_active = True
     
     def test_connectivity(self):
         """
@@ -121,3 +232,277 @@ class IzipayConfig(models.Model):
             'environment': 'sandbox' if self.is_sandbox else 'production',
             'status': 'ready_for_testing'
         }
+
+
+class IzipayNotification(models.Model):
+    """
+    Notificación de pago (IPN) recibida de Izipay.
+    Se guarda tal cual llega y se procesa después, fuera de la petición
+    """
+    
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_PROCESSED = 'processed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_PROCESSING, 'En proceso'),
+        (STATUS_PROCESSED, 'Procesada'),
+        (STATUS_FAILED, 'Fallida'),
+    ]
+    
+    # La misma transacción puede notificarse varias veces (reintentos de Izipay)
+    transaction_uuid = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="UUID de transacción"
+    )
+    
+    order_id = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name="ID de orden"
+    )
+    
+    order_status = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name="Estado de la orden en Izipay"
+    )
+    
+    answer_type = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name="Tipo de respuesta"
+    )
+    
+    raw_answer = models.TextField(
+        verbose_name="Respuesta original (kr-answer)"
+    )
+    
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Estado de procesamiento"
+    )
+    
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Intentos de procesamiento"
+    )
+    
+    error = models.TextField(
+        blank=True,
+        verbose_name="Último error"
+    )
+    
+    received_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de recepción"
+    )
+    
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Fecha de procesamiento"
+    )
+    
+    # Con 'processing' indica desde cuándo está reservada (ver ipn.requeue_stale)
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Última actualización"
+    )
+    
+    class Meta:
+        verbose_name = "Notificación Izipay"
+        verbose_name_plural = "Notificaciones Izipay"
+        ordering = ['-received_at']
+        indexes = [
+            # El worker recorre las pendientes en orden de llegada
+            models.Index(fields=['status', 'received_at'], name='izipay_notif_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"IPN {self.transaction_uuid} ({self.get_status_display()})"
+
+
+class Tenant(models.Model):
+    """
+    Vincula una tienda de Shopify con el comercio de Izipay que cobra sus órdenes.
+    Permite atender varias tiendas desde un mismo despliegue; la configuración
+    activa sigue siendo la usada cuando una petición no identifica a su tienda.
+    """
+    
+    shop = models.OneToOneField(
+        'shopify.ShopifyConfig',
+        on_delete=models.CASCADE,
+        related_name='tenant',
+        verbose_name="Tienda Shopify"
+    )
+    
+    izipay_config = models.ForeignKey(
+        IzipayConfig,
+        on_delete=models.PROTECT,
+        related_name='tenants',
+        verbose_name="Configuración Izipay"
+    )
+    
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name="Activo"
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de creación"
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Última actualización"
+    )
+    
+    class Meta:
+        verbose_name = "Tienda vinculada"
+        verbose_name_plural = "Tiendas vinculadas"
+    
+    def __str__(self):
+        return f"{self.shop} -> {self.izipay_config.merchant_code}"
+
+
+class PaymentEventQuerySet(models.QuerySet):
+    def for_order(self, order_id):
+        """Historial de una orden, del más reciente al más antiguo"""
+        return self.filter(order_id=order_id).order_by('-created_at', '-id')
+    
+    def for_transaction(self, transaction_uuid):
+        # La exclusión repite la condición del índice parcial para que se use
+        return (
+            self.filter(transaction_uuid=transaction_uuid)
+            .exclude(transaction_uuid='')
+            .order_by('-created_at', '-id')
+        )
+    
+    def latest_for_order(self, order_id):
+        return self.for_order(order_id).first()
+    
+    def stale_pending(self, minutes):
+        """
+        Eventos pendientes de hace más de `minutes` minutos que siguen siendo
+        el último estado de su orden
+        """
+        cutoff = timezone.now() - timedelta(minutes=minutes)
+        newer = PaymentEvent.objects.filter(
+            order_id=models.OuterRef('order_id'),
+            created_at__gt=models.OuterRef('created_at'),
+        )
+        return (
+            self.filter(status=PaymentEvent.STATUS_PENDING, created_at__lt=cutoff)
+            .exclude(models.Exists(newer))
+            .order_by('created_at')
+        )
+
+
+class PaymentEvent(models.Model):
+    """
+    Libro de transacciones: cada cambio de estado de un pago es una fila nueva.
+    Las filas nunca se actualizan, así que los escritores concurrentes (IPN,
+    webhooks de Shopify, creación de pagos) no compiten por bloqueos de fila.
+    El estado actual de una orden es su evento más reciente.
+    """
+    
+    STATUS_CREATED = 'created'
+    STATUS_PENDING = 'pending'
+    STATUS_CAPTURED = 'captured'
+    STATUS_FAILED = 'failed'
+    STATUS_REFUNDED = 'refunded'
+    STATUS_SHOPIFY_PAID = 'shopify_paid'
+    STATUS_CHOICES = [
+        (STATUS_CREATED, 'Pago creado'),
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_CAPTURED, 'Cobrado en Izipay'),
+        (STATUS_FAILED, 'Fallido'),
+        (STATUS_REFUNDED, 'Reembolsado'),
+        (STATUS_SHOPIFY_PAID, 'Pagado en Shopify'),
+    ]
+    
+    SOURCE_API = 'api'
+    SOURCE_IPN = 'ipn'
+    SOURCE_SHOPIFY = 'shopify'
+    SOURCE_RECONCILIATION = 'reconciliation'
+    SOURCE_CHOICES = [
+        (SOURCE_API, 'API de pagos'),
+        (SOURCE_IPN, 'IPN de Izipay'),
+        (SOURCE_SHOPIFY, 'Webhook de Shopify'),
+        (SOURCE_RECONCILIATION, 'Conciliación'),
+    ]
+    
+    order_id = models.CharField(
+        max_length=64,
+        verbose_name="ID de orden"
+    )
+    
+    shopify_order_gid = models.CharField(
+        max_length=128,
+        blank=True,
+        verbose_name="GID de la orden en Shopify"
+    )
+    
+    transaction_uuid = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name="UUID de transacción Izipay"
+    )
+    
+    amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Monto"
+    )
+    
+    currency = models.CharField(
+        max_length=3,
+        blank=True,
+        verbose_name="Moneda"
+    )
+    
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        verbose_name="Estado"
+    )
+    
+    source = models.CharField(
+        max_length=16,
+        choices=SOURCE_CHOICES,
+        verbose_name="Origen"
+    )
+    
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Fecha del evento"
+    )
+    
+    objects = PaymentEventQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = "Evento de pago"
+        verbose_name_plural = "Eventos de pago"
+        indexes = [
+            # Historial y último estado de una orden
+            models.Index(fields=['order_id', '-created_at', '-id'], name='payment_event_order_idx'),
+            # Búsqueda por transacción; solo las filas que la tienen
+            models.Index(
+                fields=['transaction_uuid'],
+                name='payment_event_txn_idx',
+                condition=~models.Q(transaction_uuid=''),
+            ),
+            # "Pendientes de hace más de N minutos"
+            models.Index(fields=['status', 'created_at'], name='payment_event_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.order_id}: {self.get_status_display()} ({self.created_at:%Y-%m-%d %H:%M})"
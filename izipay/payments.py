@@ -0,0 +1,83 @@
+"""
+Creación de pagos en Izipay (API V4 Charge/CreatePayment) a partir de órdenes de Shopify
+"""
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+
+import requests
+
+from shop_izi import fastjson, http
+from .signing import get_signer
+
+# Hilos por lote; se limita además al tamaño del pool HTTP para no abrir
+# conexiones que el pool descartaría
+DEFAULT_MAX_WORKERS = 8
+
+
+def to_minor_units(amount):
+    """Izipay espera el monto en céntimos: Decimal('12.34') -> 1234"""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def build_payment_data(order):
+    """
+    Cuerpo de CreatePayment a partir de una orden de Shopify (ya validada
+    con ShopifyOrderSerializer)
+    """
+    data = {
+        'amount': to_minor_units(order['total_price']),
+        'currency': order['currency'],
+        'orderId': str(order['id']),
+    }
+    email = order.get('email') or (order.get('customer') or {}).get('email')
+    if email:
+        data['customer'] = {'email': email, 'reference': str(order['id'])}
+    if order.get('name'):
+        data['metadata'] = {'shopifyOrderName': order['name']}
+    return data
+
+
+def create_payment(config, order):
+    """
+    Envía una orden a Izipay y retorna el resultado de esa orden; nunca lanza
+    excepciones de red para que un lote no se interrumpa por una orden
+    """
+    data = build_payment_data(order)
+    body, headers = get_signer(config).prepare(data)
+    result = {'order_id': data['orderId']}
+    try:
+        response = http.post(
+            config.get_api_url('Charge/CreatePayment'),
+            data=body,
+            headers=headers,
+            timeout=http.timeouts(read=30),
+        )
+    except requests.exceptions.RequestException as e:
+        result.update(success=False, error=f'Error de conexión: {str(e)}')
+        return result
+
+    result['response_status'] = response.status_code
+    try:
+        body = fastjson.loads(response.content)
+    except ValueError:
+        body = {}
+    answer = body.get('answer') or {}
+    if response.status_code == 200 and body.get('status') == 'SUCCESS':
+        result.update(success=True, form_token=answer.get('formToken'))
+    else:
+        result.update(
+            success=False,
+            error=answer.get('errorMessage') or response.text[:200],
+            error_code=answer.get('errorCode'),
+        )
+    return result
+
+
+def create_payments(config, orders, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Envía un lote de órdenes con un pool acotado de hilos; los resultados
+    conservan el orden de entrada
+    """
+    max_workers = max(1, min(max_workers, len(orders), http.get_setting('POOL_SIZE')))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='izipay-payment') as pool:
+        return list(pool.map(lambda order: create_payment(config, order), orders))
@@ -0,0 +1,218 @@
+"""
+Conciliación entre los cobros de Izipay (libro PaymentEvent) y las órdenes de
+Shopify (tabla local ShopifyOrder, ver shopify.sync).
+
+Ambos lados se leen de la base de datos ordenados por order_id y en bloques
+(iterator), y se cruzan con un merge join: en memoria solo está la orden que
+se está comparando, no importa cuántas filas tenga el rango de fechas.
+
+Los eventos de Izipay no indican la tienda, así que order_id es la clave del
+cruce: si el rango tiene órdenes de varias tiendas hay que conciliar cada una
+por separado (dos tiendas pueden repetir un order_id).
+"""
+import itertools
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models.functions import Collate
+
+from shopify.client import ShopifyAPIError, ShopifyClient
+from shopify.models import ShopifyConfig, ShopifyOrder
+
+from .models import PaymentEvent
+
+CHUNK_SIZE = 5000
+
+# Una orden suele crearse en Shopify antes de cobrarse
+ORDER_LOOKBACK = timedelta(days=1)
+
+PAID_STATUSES = ('paid', 'partially_refunded', 'refunded')
+
+# Collations que ordenan por code point, igual que `<` entre str de Python. Con
+# la collation por defecto de PostgreSQL (p. ej. en_US.UTF-8) el orden de la
+# base de datos no es el de merge_join
+BINARY_COLLATIONS = {
+    'postgresql': 'C',
+    'sqlite': 'BINARY',
+    'mysql': 'utf8mb4_bin',
+}
+
+CAPTURED_NOT_PAID = 'captured_not_paid'
+AMOUNT_MISMATCH = 'amount_mismatch'
+DUPLICATE_CAPTURE = 'duplicate_capture'
+MISSING_IN_SHOPIFY = 'missing_in_shopify'
+
+Mismatch = namedtuple('Mismatch', [
+    'order_id', 'kind', 'izipay_amount', 'shopify_amount', 'shopify_status',
+    'transaction_uuids', 'config_id', 'detail',
+])
+
+
+class MultipleShopsError(Exception):
+    """El rango tiene órdenes de varias tiendas y no se indicó cuál conciliar"""
+
+
+MARK_AS_PAID_MUTATION = '''
+mutation markAsPaid($input: OrderMarkAsPaidInput!) {
+  orderMarkAsPaid(input: $input) {
+    order { id displayFinancialStatus }
+    userErrors { field message }
+  }
+}
+'''
+
+
+def order_id_key():
+    """Expresión para ordenar por order_id con el mismo orden que Python"""
+    collation = BINARY_COLLATIONS.get(connection.vendor)
+    return Collate('order_id', collation) if collation else 'order_id'
+
+
+def izipay_stream(since, until):
+    """(order_id, [(status, amount, transaction_uuid), ...]) por orden, ordenado por order_id"""
+    rows = (
+        PaymentEvent.objects
+        .filter(created_at__gte=since, created_at__lt=until)
+        .exclude(source=PaymentEvent.SOURCE_SHOPIFY)
+        .order_by(order_id_key(), 'created_at', 'id')
+        .values_list('order_id', 'status', 'amount', 'transaction_uuid')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for order_id, events in itertools.groupby(rows, key=lambda row: row[0]):
+        yield order_id, [row[1:] for row in events]
+
+
+def orders_in_range(since, until):
+    return ShopifyOrder.objects.filter(
+        created_at_shopify__gte=since - ORDER_LOOKBACK,
+        created_at_shopify__lt=until,
+    )
+
+
+def shopify_stream(since, until, config=None):
+    """(order_id, (total_price, financial_status, config_id)) ordenado por order_id"""
+    orders = orders_in_range(since, until)
+    if config:
+        orders = orders.filter(config=config)
+    rows = (
+        orders.order_by(order_id_key())
+        .values_list('order_id', 'total_price', 'financial_status', 'config_id')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for row in rows:
+        yield row[0], row[1:]
+
+
+def merge_join(left, right):
+    """
+    Outer join de dos flujos (clave, valor) ordenados por clave.
+    Produce (clave, valor_izquierdo | None, valor_derecho | None).
+    """
+    missing = object()
+    left, right = iter(left), iter(right)
+    left_item, right_item = next(left, missing), next(right, missing)
+    previous = None
+    while left_item is not missing or right_item is not missing:
+        if right_item is missing or (left_item is not missing and left_item[0] < right_item[0]):
+            key, value = left_item[0], (left_item[1], None)
+            left_item = next(left, missing)
+        elif left_item is missing or right_item[0] < left_item[0]:
+            key, value = right_item[0], (None, right_item[1])
+            right_item = next(right, missing)
+        else:
+            key, value = left_item[0], (left_item[1], right_item[1])
+            left_item, right_item = next(left, missing), next(right, missing)
+        if previous is not None and key <= previous:
+            # El orden de la base de datos no coincide con el de Python
+            raise ValueError(f'Flujos no ordenados: {key!r} después de {previous!r}')
+        previous = key
+        yield (key,) + value
+
+
+def compare(order_id, events, order):
+    """Diferencias de una orden entre sus eventos de Izipay y su orden en Shopify"""
+    captured = {}
+    for status, amount, transaction_uuid in events or ():
+        if status == PaymentEvent.STATUS_CAPTURED:
+            captured.setdefault(transaction_uuid, amount)
+    if not captured:
+        return []
+
+    uuids = ','.join(captured)
+    izipay_amount = next(iter(captured.values()))
+    shopify_amount, shopify_status, config_id = order or (None, '', None)
+
+    def mismatch(kind, detail):
+        return Mismatch(order_id, kind, izipay_amount, shopify_amount, shopify_status, uuids, config_id, detail)
+
+    if order is None:
+        return [mismatch(MISSING_IN_SHOPIFY, 'Cobrada en Izipay, sin orden en Shopify')]
+    found = []
+    if len(captured) > 1:
+        found.append(mismatch(DUPLICATE_CAPTURE, f'{len(captured)} transacciones cobradas'))
+    if izipay_amount is not None and Decimal(izipay_amount) != Decimal(shopify_amount):
+        found.append(mismatch(AMOUNT_MISMATCH, f'Izipay {izipay_amount} vs Shopify {shopify_amount}'))
+    if shopify_status not in PAID_STATUSES:
+        found.append(mismatch(CAPTURED_NOT_PAID, f'Shopify en estado "{shopify_status}"'))
+    return found
+
+
+def reconcile(since, until, config=None):
+    """
+    Diferencias del rango [since, until). Con `config` solo se cruza contra esa
+    tienda y no se informan órdenes faltantes (podrían ser de otra tienda).
+    Sin `config` lanza MultipleShopsError si el rango tiene órdenes de más de
+    una tienda; se valida aquí y no al consumir el generador.
+    """
+    if config is None:
+        shops = orders_in_range(since, until).order_by().values_list('config_id', flat=True).distinct()[:2]
+        if len(shops) > 1:
+            raise MultipleShopsError('Hay órdenes de varias tiendas en el rango: indicar la tienda a conciliar')
+    return _reconcile(since, until, config)
+
+
+def _reconcile(since, until, config):
+    joined = merge_join(izipay_stream(since, until), shopify_stream(since, until, config))
+    for order_id, events, order in joined:
+        for found in compare(order_id, events, order):
+            if config and found.kind == MISSING_IN_SHOPIFY:
+                continue
+            yield found
+
+
+class FixPusher:
+    """Marca como pagadas en Shopify las órdenes cobradas en Izipay"""
+
+    def __init__(self):
+        self._clients = {}
+
+    def _client(self, config_id):
+        if config_id not in self._clients:
+            self._clients[config_id] = ShopifyClient(ShopifyConfig.objects.get(pk=config_id))
+        return self._clients[config_id]
+
+    def push(self, mismatch):
+        """Retorna (éxito, mensaje)"""
+        if mismatch.kind != CAPTURED_NOT_PAID:
+            return False, 'Sin corrección automática'
+        try:
+            body = self._client(mismatch.config_id).graphql(
+                MARK_AS_PAID_MUTATION,
+                {'input': {'id': f'gid://shopify/Order/{mismatch.order_id}'}},
+            )
+        except ShopifyAPIError as e:
+            return False, str(e)
+        errors = body['data']['orderMarkAsPaid']['userErrors']
+        if errors:
+            return False, '; '.join(error['message'] for error in errors)
+        ShopifyOrder.objects.filter(config_id=mismatch.config_id, order_id=mismatch.order_id).update(financial_status='paid')
+        PaymentEvent.objects.create(
+            order_id=mismatch.order_id,
+            shopify_order_gid=f'gid://shopify/Order/{mismatch.order_id}',
+            amount=mismatch.izipay_amount,
+            status=PaymentEvent.STATUS_SHOPIFY_PAID,
+            source=PaymentEvent.SOURCE_RECONCILIATION,
+        )
+        return True, 'Marcada como pagada'
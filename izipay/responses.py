@@ -0,0 +1,75 @@
+"""
+Respuestas precalculadas de los endpoints públicos active_config y script_info.
+
+Se llaman en cada página de la tienda y solo cambian cuando cambia la
+configuración activa, así que el JSON se serializa una vez por generación de
+izipay.cache y se sirve como bytes, con ETag fuerte y Last-Modified según
+updated_at. Las peticiones condicionales reciben un 304 y Cache-Control
+permite que un CDN absorba las visitas repetidas.
+"""
+import hashlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+from .cache import VersionedCache
+from .models import IzipayConfig
+from .serializers import IzipayScriptSerializer, config_public, environment_label
+
+DEFAULT_CACHE_CONTROL = 'public, max-age=60, stale-while-revalidate=300'
+
+PrecomputedResponse = namedtuple('PrecomputedResponse', ['body', 'etag', 'last_modified'])
+
+
+def _precompute(data, config):
+    body = JSONRenderer().render(data)
+    return PrecomputedResponse(
+        body=body,
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        last_modified=int(config.updated_at.timestamp()),
+    )
+
+
+def _render_all():
+    config = IzipayConfig.get_active_config()
+    if not config:
+        return None
+    script_data = {
+        'script_tag': config.get_script_tag(),
+        'script_url': config.script_url,
+        'environment': environment_label(config.is_sandbox),
+        'merchant_code': config.merchant_code
+    }
+    return {
+        'active_config': _precompute(config_public.from_instance(config), config),
+        'script_info': _precompute(IzipayScriptSerializer(script_data).data, config),
+    }
+
+
+# Comparte la generación de la configuración activa: se recalcula cuando ella cambia
+public_responses = VersionedCache('izipay:active_config', _render_all)
+
+
+def get_precomputed(name):
+    """Respuesta precalculada `name` o None si no hay configuración activa"""
+    rendered = public_responses.get()
+    return rendered[name] if rendered else None
+
+
+def serve(request, precomputed):
+    """HttpResponse con cabeceras de caché, o 304 si el cliente ya la tiene"""
+    response = HttpResponse(precomputed.body, content_type='application/json')
+    response['ETag'] = precomputed.etag
+    response['Last-Modified'] = http_date(precomputed.last_modified)
+    response['Cache-Control'] = getattr(settings, 'IZIPAY_PUBLIC_CACHE_CONTROL', DEFAULT_CACHE_CONTROL)
+    response['Content-Length'] = str(len(precomputed.body))
+    return get_conditional_response(
+        request,
+        etag=precomputed.etag,
+        last_modified=precomputed.last_modified,
+        response=response,
+    ) or response
@@ -1,6 +1,12 @@
 from rest_framework import serializers
+from shop_izi.lean import LeanSerializer
 from .models import IzipayConfig
 
+
+def environment_label(is_sandbox):
+    return 'Sandbox' if is_sandbox else 'Producción'
+
+
 class IzipayConfigSerializer(serializers.ModelSerializer):
     """Serializador para el modelo IzipayConfig"""
     
@@ -10,22 +16,9 @@ class IzipayConfigSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'api_key': {'write_only': True},
             'hash_key': {'write_only': True},
+            # izipay_single_active_config: save() desactiva la anterior en vez de rechazar
+            'is_active': {'validators': []},
         }
-    
-    def validate(self, data):
-        """Validación personalizada"""
-        if data.get('is_active', False):
-            # Verificar que no haya otra configuración activa
-            existing_active = IzipayConfig.objects.filter(is_active=True)
-            if self.instance:
-                existing_active = existing_active.exclude(pk=self.instance.pk)
-            
-            if existing_active.exists():
-                raise serializers.ValidationError(
-                    "Solo puede haber una configuración activa a la vez."
-                )
-        
-        return data
 
 class IzipayConfigPublicSerializer(serializers.ModelSerializer):
     """Serializador público sin campos sensibles"""
@@ -36,7 +29,7 @@ class IzipayConfigPublicSerializer(serializers.ModelSerializer):
         fields = ['id', 'merchant_code', 'script_url', 'is_sandbox', 'is_active', 'environment', 'created_at', 'updated_at']
     
     def get_environment(self, obj):
-        return 'Sandbox' if obj.is_sandbox else 'Producción'
+        return environment_label(obj.is_sandbox)
 
 class ConnectivityTestSerializer(serializers.Serializer):
     """Serializador para las pruebas de conectividad"""
@@ -59,6 +52,7 @@ class ConnectivityTestResponseSerializer(serializers.Serializer):
     response_preview = serializers.CharField(required=False)
     error = serializers.CharField(required=False)
     attempted_url = serializers.CharField(required=False)
+    latency_ms = serializers.FloatField(required=False)
     test_type = serializers.CharField()
     timestamp = serializers.DateTimeField()
 
@@ -67,4 +61,69 @@ class IzipayScriptSerializer(serializers.Serializer):
     script_tag = serializers.CharField(read_only=True)
     script_url = serializers.CharField(read_only=True)
     environment = serializers.CharField(read_only=True)
-    merchant_code = serializers.CharField(read_only=True)
\ No newline at end of file
+    merchant_code = serializers.CharField(read_only=True)
+
+class ShopifyOrderCustomerSerializer(serializers.Serializer):
+    email = serializers.EmailField(required=False, allow_blank=True)
+
+
+class ShopifyOrderSerializer(serializers.Serializer):
+    """Campos de una orden de Shopify necesarios para crear el pago"""
+    id = serializers.CharField(max_length=64, help_text="ID de la orden en Shopify")
+    name = serializers.CharField(max_length=64, required=False, allow_blank=True, help_text="Nombre visible, p. ej. #1001")
+    total_price = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
+    currency = serializers.CharField(max_length=3)
+    email = serializers.EmailField(required=False, allow_blank=True, allow_null=True)
+    customer = ShopifyOrderCustomerSerializer(required=False, allow_null=True)
+
+
+class CreatePaymentSerializer(serializers.Serializer):
+    """Serializador para crear el pago de una orden"""
+    order = ShopifyOrderSerializer()
+    config_id = serializers.IntegerField(
+        required=False,
+        help_text="ID de configuración específica (opcional, usa la activa por defecto)"
+    )
+    shop_domain = serializers.CharField(
+        required=False,
+        help_text="Dominio de la tienda; usa el comercio Izipay vinculado a ella"
+    )
+
+
+class CreatePaymentBatchSerializer(serializers.Serializer):
+    """Serializador para crear pagos de un lote de órdenes"""
+    orders = ShopifyOrderSerializer(many=True, allow_empty=False, max_length=5000)
+    config_id = serializers.IntegerField(
+        required=False,
+        help_text="ID de configuración específica (opcional, usa la activa por defecto)"
+    )
+    shop_domain = serializers.CharField(
+        required=False,
+        help_text="Dominio de la tienda; usa el comercio Izipay vinculado a ella"
+    )
+    max_workers = serializers.IntegerField(
+        required=False, min_value=1, max_value=32,
+        help_text="Envíos simultáneos (acotado por el pool HTTP)"
+    )
+    defer = serializers.BooleanField(
+        default=False,
+        help_text="Encolar los pagos para el worker en lugar de crearlos durante la petición"
+    )
+
+
+class PaymentResultSerializer(serializers.Serializer):
+    """Resultado de la creación del pago de una orden"""
+    order_id = serializers.CharField()
+    success = serializers.BooleanField()
+    form_token = serializers.CharField(required=False, allow_null=True)
+    response_status = serializers.IntegerField(required=False)
+    error = serializers.CharField(required=False, allow_null=True)
+    error_code = serializers.CharField(required=False, allow_null=True)
+
+
+# Versiones ligeras (shop_izi.lean) para list/active_config y test_connectivity
+config_public = LeanSerializer(
+    IzipayConfigPublicSerializer,
+    computed={'environment': lambda row: environment_label(row['is_sandbox'])},
+)
+connectivity_response = LeanSerializer(ConnectivityTestResponseSerializer)
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from shopify.models import ShopifyConfig
+from .models import IzipayConfig, Tenant
+from . import signing
+from .cache import invalidate_active_config
+from .tenants import invalidate_tenants
+
+
+@receiver([post_save, post_delete], sender=IzipayConfig)
+def invalidate_active_config_cache(sender, **kwargs):
+    """Cualquier alta, cambio o baja puede alterar la configuración activa"""
+    invalidate_active_config()
+
+
+@receiver([post_save, post_delete], sender=IzipayConfig)
+@receiver([post_save, post_delete], sender=ShopifyConfig)
+@receiver([post_save, post_delete], sender=Tenant)
+def invalidate_tenant_cache(sender, **kwargs):
+    """Los tenants cacheados incluyen ambas configuraciones"""
+    invalidate_tenants()
+
+
+@receiver(post_delete, sender=IzipayConfig)
+def forget_signer(sender, instance, **kwargs):
+    """Los cambios de claves los detecta get_signer; las bajas se descartan aquí"""
+    signing.forget(instance.pk)
@@ -0,0 +1,67 @@
+"""
+Firma de las peticiones a Izipay y verificación de las IPN.
+
+Cada configuración tiene un Signer que prepara una sola vez el estado HMAC de
+su clave y el header Basic; cada firma copia ese estado (hmac.copy) en vez de
+volver a derivar la clave. El payload se serializa una vez a bytes y esos
+mismos bytes son los que se firman y se envían.
+
+get_signer reutiliza el Signer mientras no cambien merchant_code, api_key ni
+hash_key de la configuración.
+"""
+import base64
+import hashlib
+import hmac
+import threading
+
+from shop_izi import fastjson
+
+
+class Signer:
+    def __init__(self, merchant_code, api_key, hash_key):
+        self._key_state = hmac.new(hash_key.encode('utf-8'), digestmod=hashlib.sha256)
+        credentials = base64.b64encode(f'{merchant_code}:{api_key}'.encode('utf-8')).decode('ascii')
+        self.headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Basic {credentials}',
+        }
+
+    def sign(self, body):
+        """HMAC-SHA256 (hex) de `body` (bytes)"""
+        digest = self._key_state.copy()
+        digest.update(body)
+        return digest.hexdigest()
+
+    def serialize(self, data):
+        return fastjson.dumps(data)
+
+    def prepare(self, data):
+        """(body, headers): el cuerpo en bytes tal como se envía y sus headers firmados"""
+        body = self.serialize(data)
+        return body, {**self.headers, 'X-Hmac-Sha256': self.sign(body)}
+
+    def verify(self, message, signature):
+        """Compara en tiempo constante la firma recibida con la de `message` (str)"""
+        return hmac.compare_digest(self.sign(message.encode('utf-8')), signature or '')
+
+
+_signers = {}
+_lock = threading.Lock()
+
+
+def get_signer(config):
+    """Signer de la configuración, reconstruido solo si cambiaron sus claves"""
+    fingerprint = (config.merchant_code, config.api_key, config.hash_key)
+    entry = _signers.get(config.pk)
+    if entry is None or entry[0] != fingerprint:
+        with _lock:
+            entry = _signers.get(config.pk)
+            if entry is None or entry[0] != fingerprint:
+                entry = _signers[config.pk] = (fingerprint, Signer(*fingerprint))
+    return entry[1]
+
+
+def forget(config_id):
+    """Descarta el Signer de una configuración eliminada"""
+    with _lock:
+        _signers.pop(config_id, None)
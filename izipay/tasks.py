@@ -0,0 +1,38 @@
+"""
+Tareas en segundo plano de Izipay (ver jobs.registry)
+"""
+from jobs.registry import task
+
+from . import ipn, ledger, payments
+from .models import IzipayConfig, IzipayNotification
+from .serializers import ShopifyOrderSerializer
+
+
+@task('izipay.process_notification')
+def process_notification(notification_id):
+    # Los reintentos del job vuelven a tomar las que fallaron, y las que dejó
+    # en 'processing' un worker que murió (el job también se reencola)
+    ipn.requeue_stale()
+    notification = ipn.claim(
+        notification_id, (IzipayNotification.STATUS_PENDING, IzipayNotification.STATUS_FAILED)
+    )
+    if not notification:
+        # Ya procesada o en manos de process_izipay_notifications
+        return
+    if ipn.handle_notification(notification) == IzipayNotification.STATUS_FAILED:
+        # El job se reintenta con backoff y termina en la cola de muertos
+        raise RuntimeError(notification.error)
+
+
+@task('izipay.create_payment')
+def create_payment(config_id, order):
+    """Crea el pago de una orden encolada por create_payments con defer=true"""
+    serializer = ShopifyOrderSerializer(data=order)
+    serializer.is_valid(raise_exception=True)
+    config = IzipayConfig.objects.get(pk=config_id)
+    order = serializer.validated_data
+    result = payments.create_payment(config, order)
+    if 'response_status' not in result:
+        # Error de red: se reintenta; un rechazo de Izipay queda registrado
+        raise RuntimeError(result['error'])
+    ledger.record_payment_results([order], [result])
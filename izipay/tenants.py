@@ -0,0 +1,86 @@
+"""
+Resolución de tenants (tienda Shopify <-> comercio Izipay).
+
+Cada webhook o petición identifica su tienda por dominio (X-Shopify-Shop-Domain)
+o su comercio por código (shopId en las IPN). La primera resolución de cada
+clave es una consulta por índice; el resultado queda en memoria del proceso
+hasta que cambie alguna configuración o vínculo (misma generación compartida
+que izipay.cache). Las claves desconocidas no se cachean: llegan en headers y
+no deben poder hacer crecer la memoria sin límite.
+"""
+from django.db import transaction
+
+from shop_izi import metrics
+
+from .cache import VersionedCache
+
+tenant_cache = VersionedCache('izipay:tenants', dict)
+
+
+def _cached(key, loader):
+    entries = tenant_cache.get()
+    if key in entries:
+        metrics.observe_cache('izipay:tenants:entry', hit=True)
+        return entries[key]
+    metrics.observe_cache('izipay:tenants:entry', hit=False)
+    value = loader()
+    if value is not None:
+        entries[key] = value
+    return value
+
+
+def invalidate_tenants():
+    """Invalida los tenants cacheados ahora y otra vez al confirmar la transacción"""
+    tenant_cache.invalidate()
+    transaction.on_commit(tenant_cache.invalidate)
+
+
+def get_tenant_for_shop(shop_domain):
+    """Tenant activo de la tienda, con su tienda y configuración Izipay ya cargadas"""
+    from .models import Tenant
+
+    if not shop_domain:
+        return None
+    return _cached(('tenant', shop_domain), lambda: (
+        Tenant.objects
+        .select_related('shop', 'izipay_config')
+        .defer('izipay_config__public_key')
+        .filter(shop__shop_name=shop_domain, is_active=True)
+        .first()
+    ))
+
+
+def get_shopify_config(shop_domain):
+    """Configuración de Shopify por dominio de tienda"""
+    from shopify.models import ShopifyConfig
+
+    if not shop_domain:
+        return None
+    return _cached(('shop', shop_domain), lambda: (
+        ShopifyConfig.objects.filter(shop_name=shop_domain).first()
+    ))
+
+
+def get_izipay_config_for_shop(shop_domain):
+    """
+    Configuración Izipay vinculada a la tienda. Sin tienda se usa la activa;
+    una tienda sin vínculo activo retorna None para no cobrar con otro comercio
+    """
+    from .models import IzipayConfig
+
+    if not shop_domain:
+        return IzipayConfig.get_active_config()
+    tenant = get_tenant_for_shop(shop_domain)
+    return tenant.izipay_config if tenant else None
+
+
+def get_izipay_config_for_merchant(merchant_code):
+    """Configuración Izipay por código de comercio, o la activa si no se indica"""
+    from .models import IzipayConfig
+
+    if not merchant_code:
+        return IzipayConfig.get_active_config()
+    return _cached(('merchant', merchant_code), lambda: (
+        IzipayConfig.objects.filter(merchant_code=merchant_code)
+        .defer('public_key').order_by('-is_active', '-created_at').first()
+    ))
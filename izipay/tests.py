@@ -1,3 +1,906 @@
-from django.test import TestCase
+import asyncio
+import base64
+import hashlib
+import hmac
+import io
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs import worker
+from jobs.models import Job
+from monitoring import probes
+from shop_izi import async_http, breaker, fastjson, http
+from shop_izi.benchmarks import stub_server
+from shopify.models import ShopifyConfig, ShopifyOrder
+from . import connectivity, ipn, payments, reconciliation, signing, tenants
+from .cache import active_config_cache
+from .models import IzipayConfig, IzipayNotification, PaymentEvent, Tenant
+from .serializers import (
+    ConnectivityTestResponseSerializer, IzipayConfigPublicSerializer, config_public, connectivity_response,
+)
+
+
+def create_config(**kwargs):
+    data = {
+        'merchant_code': '4001834',
+        'api_key': 'api-key',
+        'hash_key': 'hash-key',
+        'public_key': 'public-key',
+    }
+    data.update(kwargs)
+    return IzipayConfig.objects.create(**data)
+
+
+class ActivateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.first = create_config(merchant_code='111')
+        self.second = create_config(merchant_code='222', is_active=False)
+
+    def test_switches_the_active_config(self):
+        self.assertTrue(IzipayConfig.activate(self.second.pk))
+        self.assertEqual(list(IzipayConfig.objects.filter(is_active=True)), [self.second])
+        self.assertEqual(IzipayConfig.get_active_config(), self.second)
+
+    def test_already_active_does_not_write(self):
+        generation = active_config_cache.current_generation()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(IzipayConfig.activate(self.first.pk))
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+        self.assertEqual(active_config_cache.current_generation(), generation)
+
+    def test_invalidates_once(self):
+        with mock.patch.object(active_config_cache, 'invalidate') as invalidate, self.captureOnCommitCallbacks(execute=True):
+            IzipayConfig.activate(self.second.pk)
+        # Una vez de inmediato y otra al confirmar (ver invalidate_active_config)
+        self.assertEqual(invalidate.call_count, 2)
+
+    def test_unknown_config(self):
+        with self.assertRaises(IzipayConfig.DoesNotExist):
+            IzipayConfig.activate(self.second.pk + 100)
+        self.assertTrue(IzipayConfig.objects.get(pk=self.first.pk).is_active)
+
+    def test_saving_an_active_config_without_changes_does_not_update_others(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.first.save()
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn(f'WHERE "izipay_izipayconfig"."id" = {self.first.pk}', updates[0])
+
+    def test_only_saves_that_activate_take_the_lock(self):
+        with mock.patch.object(IzipayConfig, '_lock_activations') as lock:
+            IzipayConfig.objects.get(pk=self.first.pk).save()
+            self.second.save()
+            lock.assert_not_called()
+            second = IzipayConfig.objects.get(pk=self.second.pk)
+            second.is_active = True
+            second.save()
+            lock.assert_called_once()
+        self.assertEqual(IzipayConfig.objects.get(is_active=True), self.second)
+
+    def test_stale_active_instance_is_activated_again(self):
+        stale = IzipayConfig.objects.get(pk=self.first.pk)
+        IzipayConfig.activate(self.second.pk)
+        stale.save()
+        self.assertEqual(IzipayConfig.objects.get(is_active=True), self.first)
+
+    def test_api_create_with_is_active_switches(self):
+        from django.contrib.auth.models import User
+        self.client.force_login(User.objects.create_user('admin'))
+        response = self.client.post(reverse('izipay:izipayconfig-list'), {
+            'merchant_code': '333', 'api_key': 'k', 'hash_key': 'h', 'public_key': 'p', 'is_active': True,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(IzipayConfig.objects.get(is_active=True).merchant_code, '333')
+        response = self.client.post(reverse('izipay:izipayconfig-activate', args=[self.second.pk]))
+        self.assertEqual(response.json(), {'id': self.second.pk, 'changed': True})
+        self.assertEqual(IzipayConfig.objects.get(is_active=True), self.second)
+
+
+def retry_locked(function, attempts=200):
+    """
+    La base de datos en memoria de los tests usa caché compartida, donde SQLite
+    responde 'table is locked' en lugar de esperar busy_timeout: se reintenta
+    """
+    from django.db import OperationalError
+    for _ in range(attempts):
+        try:
+            return function()
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            time.sleep(0.001)
+    raise AssertionError('La tabla siguió bloqueada')
+
+
+class ConcurrentActivateTests(TransactionTestCase):
+    def test_concurrent_activations_leave_exactly_one_active(self):
+        configs = [create_config(merchant_code=str(number)) for number in range(4)]
+        errors = []
+        start = threading.Barrier(len(configs) * 2)
+
+        def activate(config):
+            start.wait()
+            try:
+                for _ in range(5):
+                    retry_locked(lambda: IzipayConfig.activate(config.pk))
+                    retry_locked(configs[0].save)
+            except Exception as e:  # noqa: BLE001 - se informa abajo
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=activate, args=(config,)) for config in configs * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(IzipayConfig.objects.filter(is_active=True).count(), 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Carrera de READ COMMITTED en PostgreSQL')
+    def test_activation_waits_for_a_pending_activation(self):
+        """
+        T1 activa B y aún no confirma; T2 activa C o guarda una nueva activa.
+        Un FOR UPDATE de T2 no vería B y chocaría con izipay_single_active_config
+        """
+        for second in ('activate', 'save'):
+            with self.subTest(second=second):
+                IzipayConfig.objects.all().delete()
+                first, pending, target = (create_config(merchant_code=str(number)) for number in range(3))
+                IzipayConfig.activate(first.pk)
+                activated = threading.Event()
+                errors = []
+
+                def hold_activation():
+                    try:
+                        with transaction.atomic():
+                            IzipayConfig.activate(pending.pk)
+                            activated.set()
+                            time.sleep(0.3)
+                    finally:
+                        connection.close()
+
+                def activate_other():
+                    activated.wait()
+                    try:
+                        if second == 'activate':
+                            IzipayConfig.activate(target.pk)
+                        else:
+                            create_config(merchant_code='nueva', is_active=True)
+                    except Exception as e:  # noqa: BLE001 - se informa abajo
+                        errors.append(e)
+                    finally:
+                        connection.close()
+
+                threads = [threading.Thread(target=hold_activation), threading.Thread(target=activate_other)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                self.assertEqual(errors, [])
+                self.assertEqual(IzipayConfig.objects.filter(is_active=True).count(), 1)
+
+
+class ActiveConfigCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_repeated_reads_do_not_query(self):
+        config = create_config()
+        self.assertEqual(IzipayConfig.get_active_config(), config)
+        with self.assertNumQueries(0):
+            self.assertEqual(IzipayConfig.get_active_config(), config)
+
+    def test_missing_config_is_cached(self):
+        self.assertIsNone(IzipayConfig.get_active_config())
+        with self.assertNumQueries(0):
+            self.assertIsNone(IzipayConfig.get_active_config())
+
+    def test_save_invalidates(self):
+        first = create_config(merchant_code='111')
+        self.assertEqual(IzipayConfig.get_active_config(), first)
+        second = create_config(merchant_code='222')
+        self.assertEqual(IzipayConfig.get_active_config(), second)
+
+    def test_delete_invalidates(self):
+        config = create_config()
+        self.assertEqual(IzipayConfig.get_active_config(), config)
+        config.delete()
+        self.assertIsNone(IzipayConfig.get_active_config())
+
+
+class PaymentTests(TestCase):
+    def test_build_payment_data_from_shopify_order(self):
+        order = {
+            'id': '5551234',
+            'name': '#1001',
+            'total_price': Decimal('149.90'),
+            'currency': 'PEN',
+            'customer': {'email': 'cliente@example.com'},
+        }
+        self.assertEqual(payments.build_payment_data(order), {
+            'amount': 14990,
+            'currency': 'PEN',
+            'orderId': '5551234',
+            'customer': {'email': 'cliente@example.com', 'reference': '5551234'},
+            'metadata': {'shopifyOrderName': '#1001'},
+        })
+
+    def test_create_payments_keeps_order_and_reports_each_result(self):
+        config = create_config()
+        orders = [
+            {'id': str(order_id), 'total_price': Decimal('10.00'), 'currency': 'PEN'}
+            for order_id in range(20)
+        ]
+        body = b'{"status": "SUCCESS", "answer": {"formToken": "token"}}'
+        with stub_server(body=body) as base_url:
+            with mock.patch.object(IzipayConfig, 'get_api_url', return_value=base_url):
+                results = payments.create_payments(config, orders, max_workers=4)
+        self.assertEqual([result['order_id'] for result in results], [str(i) for i in range(20)])
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(results[0]['form_token'], 'token')
+
+
+def sign(key, answer):
+    return hmac.new(key.encode(), answer.encode(), hashlib.sha256).hexdigest()
+
+
+class AsyncConnectivityTests(TestCase):
+    """El endpoint ASGI sirve lo que registraron los sondeos asíncronos (httpx)"""
+
+    def setUp(self):
+        cache.clear()
+        breaker.reset_breakers()
+
+    def tearDown(self):
+        breaker.reset_breakers()
+
+    def probe_and_fetch(self, base_url):
+        with override_settings(UPSTREAMS={'IZIPAY_SANDBOX_URL': base_url}):
+            create_config(is_sandbox=True)
+            probes.run_once()
+        response = async_to_sync(self.async_client.post)(
+            reverse('izipay:test_connectivity_async'), {'test_type': 'simple'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_success(self):
+        with stub_server() as base_url:
+            body = self.probe_and_fetch(base_url)
+        self.assertTrue(body['success'])
+        self.assertEqual(body['response_status'], 200)
+
+    def test_upstream_failure(self):
+        with stub_server() as base_url:
+            pass
+        # El servidor ya cerró: la conexión es rechazada
+        body = self.probe_and_fetch(base_url)
+        self.assertFalse(body['success'])
+        self.assertEqual(body['message'], 'No se pudo conectar con Izipay')
+
+    def test_open_circuit(self):
+        with stub_server() as base_url:
+            circuit = breaker.get_breaker(base_url)
+            for _ in range(breaker.get_setting('FAILURE_THRESHOLD')):
+                circuit.record_failure('timeout')
+            body = self.probe_and_fetch(base_url)
+        self.assertFalse(body['success'])
+        self.assertIn('Circuito abierto', body['error'])
+
+
+class HTTPClientTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        breaker.reset_breakers()
+        http.close_sessions()
+
+    def tearDown(self):
+        http.close_sessions()
+        breaker.reset_breakers()
+
+    def test_same_origin_reuses_one_session(self):
+        with stub_server() as base_url:
+            http.get(f'{base_url}/a')
+            http.get(f'{base_url}/b')
+            session = http.get_session(f'{base_url}/c')
+        self.assertIs(http.get_session(base_url), session)
+        self.assertEqual(list(http._sessions), [base_url])
+        self.assertIsNot(http.get_session('http://otro.test/'), session)
+
+    def test_default_timeouts_are_applied(self):
+        self.assertEqual(http.timeouts(), (http.DEFAULTS['CONNECT_TIMEOUT'], http.DEFAULTS['READ_TIMEOUT']))
+        self.assertEqual(http.timeouts(read=30), (http.DEFAULTS['CONNECT_TIMEOUT'], 30))
+        send = http.requests.Session.request
+        with stub_server() as base_url, \
+                mock.patch.object(http.requests.Session, 'request', autospec=True, side_effect=send) as request:
+            self.assertEqual(http.get(base_url).status_code, 200)
+        self.assertEqual(request.call_args.kwargs['timeout'], http.timeouts())
+
+    @override_settings(HTTP_CLIENT={'READ_TIMEOUT': 0.1, 'MAX_RETRIES': 0})
+    def test_read_timeout_setting_bounds_a_slow_upstream(self):
+        with stub_server(delay=0.5) as base_url:
+            with self.assertRaisesMessage(http.requests.exceptions.RequestException, 'read timeout=0.1'):
+                http.get(base_url)
+
+    @override_settings(HTTP_CLIENT={'BACKOFF_FACTOR': 0})
+    def test_get_is_retried_on_5xx_but_post_is_not(self):
+        calls = []
+        with stub_server(status=503, body=b'{}', calls=calls) as base_url:
+            self.assertEqual(http.get(base_url).status_code, 503)
+            self.assertEqual(calls, ['GET'] * (1 + http.DEFAULTS['MAX_RETRIES']))
+            calls.clear()
+            self.assertEqual(http.post(base_url, data=b'{}').status_code, 503)
+            self.assertEqual(calls, ['POST'])
+
+
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        breaker.reset_breakers()
+
+    def tearDown(self):
+        breaker.reset_breakers()
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        with stub_server(status=503, body=b'{}') as base_url:
+            for _ in range(5):
+                self.assertEqual(http.post(base_url, data=b'{}').status_code, 503)
+            with self.assertRaises(breaker.CircuitOpenError):
+                http.post(base_url, data=b'{}')
+        health = breaker.get_health(base_url)
+        self.assertFalse(health['available'])
+        self.assertEqual(health['state'], breaker.OPEN)
+        self.assertEqual(health['last_error'], 'HTTP 503')
+
+    @override_settings(CIRCUIT_BREAKER={'FAILURE_THRESHOLD': 1, 'RESET_TIMEOUT': 0})
+    def test_half_open_probe_closes_circuit_on_success(self):
+        with stub_server(status=503, body=b'{}') as base_url:
+            http.post(base_url, data=b'{}')
+        circuit = breaker.get_breaker(base_url)
+        self.assertEqual(circuit.state, breaker.OPEN)
+
+        circuit.before_call()
+        self.assertEqual(circuit.state, breaker.HALF_OPEN)
+        # Solo una prueba a la vez mientras está semiabierto
+        with self.assertRaises(breaker.CircuitOpenError):
+            circuit.before_call()
+        circuit.record_success()
+        self.assertEqual(circuit.state, breaker.CLOSED)
+        self.assertTrue(breaker.get_health(base_url)['available'])
+
+    @override_settings(CIRCUIT_BREAKER={'FAILURE_THRESHOLD': 1, 'RESET_TIMEOUT': 0})
+    def test_probe_is_released_when_the_call_raises_something_else(self):
+        with stub_server(status=503, body=b'{}') as base_url:
+            http.post(base_url, data=b'{}')
+            circuit = breaker.get_breaker(base_url)
+            with mock.patch.object(http.requests.Session, 'request', side_effect=ValueError('bad body')):
+                with self.assertRaises(ValueError):
+                    http.post(base_url, data=b'{}')
+            self.assertFalse(circuit.probe_in_flight)
+
+            async def cancelled():
+                task = asyncio.ensure_future(async_http.post(base_url, content=b'{}'))
+                await asyncio.sleep(0)
+                task.cancel()
+                try:
+                    await task
+                finally:
+                    await async_http.close_client()
+
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(cancelled())
+            self.assertFalse(circuit.probe_in_flight)
+            self.assertEqual(circuit.state, breaker.HALF_OPEN)
+            # La siguiente llamada vuelve a probar y cierra el circuito
+            with mock.patch.object(http.requests.Session, 'request', return_value=mock.Mock(status_code=200)):
+                http.post(base_url, data=b'{}')
+            self.assertEqual(circuit.state, breaker.CLOSED)
+
+    def test_health_endpoints_read_published_state(self):
+        config = create_config()
+        upstream = http.get_origin(config.get_api_url(''))
+        url = reverse('izipay:izipayconfig-health')
+        self.assertTrue(self.client.get(url).json()['available'])
+
+        circuit = breaker.get_breaker(upstream)
+        for _ in range(5):
+            circuit.record_failure('timeout')
+        body = self.client.get(url).json()
+        self.assertEqual(body, {'upstream': upstream, 'available': False, 'state': breaker.OPEN})
+        overall = self.client.get(reverse('upstream_health')).json()
+        self.assertFalse(overall['available'])
+        self.assertIn(upstream, overall['upstreams'])
+
+
+def query_plans(queries):
+    """EXPLAIN QUERY PLAN de cada consulta capturada (SQLite)"""
+    with connection.cursor() as cursor:
+        plans = []
+        for query in queries:
+            cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+            plans.append(' / '.join(row[-1] for row in cursor.fetchall()))
+        return plans
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Los planes esperados son los de SQLite')
+class ConfigQueryPlanTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for number in range(5):
+            create_config(merchant_code=f'40{number}', public_key='k' * 4096)
+
+    def test_active_config_reads_the_partial_index(self):
+        active_config_cache.invalidate()
+        with CaptureQueriesContext(connection) as queries:
+            config = IzipayConfig.get_active_config()
+        self.assertEqual(config.merchant_code, '404')
+        [plan] = query_plans(queries)
+        self.assertIn('izipay_single_active_config', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertNotIn('public_key', queries[0]['sql'])
+
+    def test_default_ordering_uses_created_at_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(IzipayConfig.objects.all()[:20])
+        [plan] = query_plans(queries)
+        self.assertIn('izipay_config_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_second_active_row_is_rejected(self):
+        inactive = IzipayConfig.objects.filter(is_active=False).first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            IzipayConfig.objects.filter(pk=inactive.pk).update(is_active=True)
+
+    def test_hot_lookups_skip_public_key(self):
+        from django.contrib.auth.models import User
+        with CaptureQueriesContext(connection) as queries:
+            tenants.get_izipay_config_for_merchant('401')
+        self.assertNotIn('public_key', queries[0]['sql'])
+        self.client.force_login(User.objects.create_superuser('admin'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:izipay_izipayconfig_changelist'))
+        self.assertEqual(response.status_code, 200)
+        listing = [query['sql'] for query in queries if 'FROM "izipay_izipayconfig"' in query['sql']]
+        self.assertTrue(listing)
+        for sql in listing:
+            self.assertNotIn('public_key', sql)
+            self.assertNotIn('hash_key', sql)
+
+
+class LeanSerializerTests(TestCase):
+    """Los serializadores ligeros deben producir exactamente lo mismo que los de DRF"""
+
+    def assertSameOutput(self, lean, expected):
+        # Mismas claves, en el mismo orden, y mismos valores
+        self.assertEqual(list(lean.items()), list(dict(expected).items()))
+        self.assertEqual(fastjson.dumps(lean), fastjson.dumps(dict(expected)))
+
+    def test_config_public(self):
+        create_config(merchant_code='111')
+        create_config(merchant_code='222', is_sandbox=False)
+        # save() desactiva las otras configuraciones en la base de datos
+        configs = list(IzipayConfig.objects.all())
+        rows = {row['id']: row for row in config_public.values(IzipayConfig.objects.all())}
+        for config in configs:
+            expected = IzipayConfigPublicSerializer(config).data
+            self.assertSameOutput(config_public.from_instance(config), expected)
+            self.assertSameOutput(config_public.to_representation(rows[config.pk]), expected)
+
+    def test_config_public_under_another_timezone(self):
+        config = create_config()
+        with timezone.override('America/Lima'):
+            self.assertSameOutput(config_public.from_instance(config), IzipayConfigPublicSerializer(config).data)
+
+    def test_connectivity_results(self):
+        now = timezone.now()
+        results = [
+            {'success': True, 'message': 'OK', 'response_status': 200, 'latency_ms': 12.3,
+             'config_info': {'merchant_code': '111', 'is_sandbox': True}, 'test_type': 'simple', 'timestamp': now},
+            {'success': False, 'message': 'Timeout', 'error': 'timeout', 'attempted_url': 'https://x',
+             'test_type': 'full', 'timestamp': datetime(2026, 1, 2, 3, 4, 5)},
+            {'success': False, 'message': 'Error', 'error': None, 'latency_ms': 7, 'response_status': '502',
+             'test_type': 'simple', 'timestamp': '2026-01-02T03:04:05Z'},
+            {'success': 1, 'message': 500, 'test_type': 'simple', 'timestamp': None},
+        ]
+        for result in results:
+            with self.subTest(result=result):
+                self.assertSameOutput(
+                    connectivity_response.to_representation(result),
+                    ConnectivityTestResponseSerializer(result).data,
+                )
+
+    def test_missing_required_key_raises_like_drf(self):
+        result = {'success': True, 'message': 'OK', 'test_type': 'simple'}
+        with self.assertRaises(KeyError):
+            ConnectivityTestResponseSerializer(result).data
+        with self.assertRaises(KeyError):
+            connectivity_response.to_representation(result)
+
+    def test_method_fields_must_be_computed(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from shop_izi.lean import LeanSerializer
+        with self.assertRaises(ImproperlyConfigured):
+            LeanSerializer(IzipayConfigPublicSerializer).accessors
+
+    def test_list_matches_model_serializer(self):
+        from django.contrib.auth.models import User
+        for number in range(3):
+            create_config(merchant_code=str(number))
+        configs = list(IzipayConfig.objects.all())
+        self.client.force_login(User.objects.create_user('admin'))
+        with self.assertNumQueries(4):  # sesión, usuario, count y la página
+            response = self.client.get(reverse('izipay:izipayconfig-list'))
+        expected = IzipayConfigPublicSerializer(configs, many=True).data
+        self.assertEqual(response.json()['results'], json.loads(fastjson.dumps(expected)))
+        detail = self.client.get(reverse('izipay:izipayconfig-detail', args=[configs[0].pk]))
+        self.assertEqual(detail.json(), json.loads(fastjson.dumps(IzipayConfigPublicSerializer(configs[0]).data)))
+
+
+class FastJSONTests(TestCase):
+    def test_renderer_matches_drf_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+        data = {
+            'amount': Decimal('149.90'),
+            'created': datetime(2026, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+            'name': 'Añil \u2028 línea',
+            'items': [{'id': 1, 'ok': True, 'none': None}],
+            1: 'int key',
+        }
+        expected = JSONRenderer().render(data)
+        rendered = fastjson.FastJSONRenderer().render(data)
+        self.assertEqual(json.loads(rendered), json.loads(expected))
+        self.assertIn(b'\\u2028', rendered)
+        self.assertEqual(json.loads(fastjson._stdlib_dumps(data)), json.loads(rendered))
+
+    def test_parser_errors_and_big_integers(self):
+        from rest_framework.exceptions import ParseError
+        with self.assertRaises(ParseError):
+            fastjson.FastJSONParser().parse(io.BytesIO(b'{"a": '))
+        self.assertEqual(fastjson.loads(fastjson.dumps({'id': 2 ** 70})), {'id': 2 ** 70})
+
+    def test_api_uses_fast_renderer(self):
+        create_config(is_active=True)
+        response = self.client.post(
+            reverse('izipay:izipayconfig-test-connectivity'), data=b'{"test_type": "simple"}', content_type='application/json'
+        )
+        self.assertIsInstance(response.accepted_renderer, fastjson.FastJSONRenderer)
+
+
+class SignerTests(TestCase):
+    def test_signed_bytes_are_the_sent_bytes(self):
+        config = create_config()
+        order = {'id': '1001', 'total_price': Decimal('10.00'), 'currency': 'PEN'}
+        with mock.patch.object(http, 'post') as post:
+            post.return_value.status_code = 200
+            post.return_value.json.return_value = {'status': 'SUCCESS', 'answer': {}}
+            payments.create_payment(config, order)
+            connectivity.full_test(config)
+        for call in post.call_args_list:
+            body, headers = call.kwargs['data'], call.kwargs['headers']
+            self.assertIsInstance(body, bytes)
+            self.assertEqual(headers['X-Hmac-Sha256'], hmac.new(b'hash-key', body, hashlib.sha256).hexdigest())
+            self.assertEqual(headers['Authorization'], 'Basic ' + base64.b64encode(b'4001834:api-key').decode())
+        self.assertEqual(post.call_count, 2)
+
+    def test_async_full_test_sends_the_signed_bytes_as_content(self):
+        config = create_config()
+        with mock.patch.object(async_http, 'post', new_callable=mock.AsyncMock) as post:
+            post.return_value.status_code = 200
+            post.return_value.json.return_value = {'status': 'SUCCESS', 'answer': {}}
+            asyncio.run(connectivity.afull_test(config))
+        body, headers = post.call_args.kwargs['content'], post.call_args.kwargs['headers']
+        self.assertNotIn('data', post.call_args.kwargs)
+        self.assertIsInstance(body, bytes)
+        self.assertEqual(headers['X-Hmac-Sha256'], hmac.new(b'hash-key', body, hashlib.sha256).hexdigest())
+
+    def test_signer_is_reused_until_keys_change(self):
+        config = create_config()
+        signer = signing.get_signer(config)
+        self.assertIs(signing.get_signer(IzipayConfig.objects.get(pk=config.pk)), signer)
+
+        config.hash_key = 'new-hash-key'
+        config.save()
+        rebuilt = signing.get_signer(config)
+        self.assertIsNot(rebuilt, signer)
+        self.assertTrue(rebuilt.verify('answer', hmac.new(b'new-hash-key', b'answer', hashlib.sha256).hexdigest()))
+        self.assertFalse(rebuilt.verify('answer', sign('hash-key', 'answer')))
+
+        config_id = config.pk
+        config.delete()
+        self.assertNotIn(config_id, signing._signers)
+
+
+class IpnTests(TestCase):
+    answer = json.dumps({
+        'orderStatus': 'PAID',
+        'orderDetails': {'orderId': '5551234'},
+        'transactions': [{'uuid': 'a1b2c3'}],
+    })
+
+    def setUp(self):
+        cache.clear()
+        self.config = create_config()
+
+    def post(self, answer, signature):
+        return self.client.post(reverse('izipay:ipn'), {
+            'kr-answer': answer,
+            'kr-hash': signature,
+            'kr-answer-type': 'V4/Payment',
+        })
+
+    def test_valid_notification_is_stored_once(self):
+        signature = sign(self.config.hash_key, self.answer)
+        self.assertEqual(self.post(self.answer, signature).status_code, 200)
+        self.assertEqual(self.post(self.answer, signature).status_code, 200)
+        notification = IzipayNotification.objects.get()
+        self.assertEqual(notification.transaction_uuid, 'a1b2c3')
+        self.assertEqual(notification.status, IzipayNotification.STATUS_PENDING)
+        self.assertEqual(Job.objects.filter(task='izipay.process_notification').count(), 1)
+
+    def test_queued_job_processes_the_notification(self):
+        self.post(self.answer, sign(self.config.hash_key, self.answer))
+        self.assertEqual(worker.work(), 1)
+        self.assertEqual(IzipayNotification.objects.get().status, IzipayNotification.STATUS_PROCESSED)
+
+    def test_invalid_signature_is_rejected(self):
+        response = self.post(self.answer, sign('otra-clave', self.answer))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IzipayNotification.objects.exists())
+
+    def test_pending_notifications_are_processed(self):
+        self.post(self.answer, sign(self.config.hash_key, self.answer))
+        self.assertEqual(ipn.process_pending(), 1)
+        notification = IzipayNotification.objects.get()
+        self.assertEqual(notification.status, IzipayNotification.STATUS_PROCESSED)
+        self.assertEqual(notification.order_id, '5551234')
+        self.assertEqual(ipn.process_pending(), 0)
+
+    def test_job_and_command_do_not_both_process(self):
+        self.post(self.answer, sign(self.config.hash_key, self.answer))
+        notification = IzipayNotification.objects.get()
+        # El comando la reservó primero: el job no la vuelve a procesar
+        self.assertIsNotNone(ipn.claim(notification.pk))
+        self.assertEqual(worker.work(), 1)
+        self.assertEqual(ipn.process_pending(), 0)
+        self.assertFalse(PaymentEvent.objects.exists())
+        self.assertEqual(IzipayNotification.objects.get().status, IzipayNotification.STATUS_PROCESSING)
+
+    def test_stale_claim_is_processed_again(self):
+        self.post(self.answer, sign(self.config.hash_key, self.answer))
+        notification = ipn.claim(IzipayNotification.objects.get().pk)
+        # Recién reservada: sigue en manos de quien la tomó
+        self.assertEqual(ipn.process_pending(), 0)
+        IzipayNotification.objects.filter(pk=notification.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=ipn.STALE_TIMEOUT + 1)
+        )
+        self.assertEqual(ipn.process_pending(), 1)
+        self.assertEqual(IzipayNotification.objects.get().status, IzipayNotification.STATUS_PROCESSED)
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+
+
+class TenantTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.default = create_config(merchant_code='111')
+        self.merchant = create_config(merchant_code='222', is_active=False)
+        self.shop = ShopifyConfig.objects.create(shop_name='tienda-b.myshopify.com')
+        Tenant.objects.create(shop=self.shop, izipay_config=self.merchant)
+
+    def test_shop_resolves_to_its_merchant_from_memory(self):
+        self.assertEqual(tenants.get_izipay_config_for_shop('tienda-b.myshopify.com'), self.merchant)
+        with self.assertNumQueries(0):
+            self.assertEqual(tenants.get_izipay_config_for_shop('tienda-b.myshopify.com'), self.merchant)
+
+    def test_unlinked_shop_has_no_merchant(self):
+        self.assertIsNone(tenants.get_izipay_config_for_shop('otra.myshopify.com'))
+        Tenant.objects.filter(shop=self.shop).update(is_active=False)
+        tenants.invalidate_tenants()
+        self.assertIsNone(tenants.get_izipay_config_for_shop('tienda-b.myshopify.com'))
+
+    def test_requests_without_shop_use_active_config(self):
+        self.assertEqual(tenants.get_izipay_config_for_shop(''), self.default)
+
+    def test_payment_for_unlinked_shop_is_rejected(self):
+        from django.contrib.auth.models import User
+        self.client.force_login(User.objects.create_user('admin'))
+        order = {'id': '1001', 'total_price': '10.00', 'currency': 'PEN'}
+        with mock.patch.object(payments, 'create_payment') as create_payment:
+            response = self.client.post(
+                reverse('izipay:izipayconfig-create-payment'),
+                {'order': order, 'shop_domain': 'otra.myshopify.com'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 404)
+        create_payment.assert_not_called()
+
+    def test_relinking_invalidates(self):
+        tenants.get_izipay_config_for_shop('tienda-b.myshopify.com')
+        Tenant.objects.filter(shop=self.shop).get().delete()
+        self.assertIsNone(tenants.get_izipay_config_for_shop('tienda-b.myshopify.com'))
+
+    def test_ipn_is_verified_with_the_merchant_hash_key(self):
+        self.merchant.hash_key = 'clave-222'
+        self.merchant.save()
+        answer = json.dumps({'shopId': '222', 'transactions': [{'uuid': 'u-222'}]})
+        response = self.client.post(reverse('izipay:ipn'), {'kr-answer': answer, 'kr-hash': sign('clave-222', answer)})
+        self.assertEqual(response.status_code, 200)
+
+
+class PublicResponseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.config = create_config()
+
+    def test_body_matches_serializer_and_repeat_reads_do_not_query(self):
+        url = reverse('izipay:izipayconfig-active-config')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['merchant_code'], self.config.merchant_code)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        self.assertIn('public', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_conditional_request_gets_304(self):
+        url = reverse('izipay:izipayconfig-script-info')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_config_change_changes_etag(self):
+        url = reverse('izipay:izipayconfig-active-config')
+        etag = self.client.get(url)['ETag']
+        self.config.is_sandbox = False
+        self.config.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['environment'], 'Producción')
+
+
+class PaymentLedgerTests(TestCase):
+    def event(self, order_id, status, minutes_ago, **kwargs):
+        return PaymentEvent.objects.create(
+            order_id=order_id,
+            status=status,
+            source=PaymentEvent.SOURCE_API,
+            created_at=timezone.now() - timedelta(minutes=minutes_ago),
+            **kwargs
+        )
+
+    def test_latest_event_is_the_current_status(self):
+        self.event('1', PaymentEvent.STATUS_CREATED, 10)
+        self.event('1', PaymentEvent.STATUS_CAPTURED, 5, transaction_uuid='t1')
+        self.assertEqual(PaymentEvent.objects.latest_for_order('1').status, PaymentEvent.STATUS_CAPTURED)
+        self.assertEqual(PaymentEvent.objects.for_transaction('t1').count(), 1)
+
+    def test_stale_pending_ignores_orders_that_moved_on(self):
+        self.event('1', PaymentEvent.STATUS_PENDING, 120)
+        self.event('2', PaymentEvent.STATUS_PENDING, 120)
+        self.event('2', PaymentEvent.STATUS_CAPTURED, 100)
+        self.event('3', PaymentEvent.STATUS_PENDING, 5)
+        stale = PaymentEvent.objects.stale_pending(60)
+        self.assertEqual([event.order_id for event in stale], ['1'])
+
+    def test_processed_ipn_is_recorded(self):
+        cache.clear()
+        config = create_config()
+        answer = json.dumps({
+            'orderStatus': 'PAID',
+            'orderDetails': {'orderId': '77', 'orderTotalAmount': 14990, 'orderCurrency': 'PEN'},
+            'transactions': [{'uuid': 'u-77'}],
+        })
+        self.client.post(reverse('izipay:ipn'), {'kr-answer': answer, 'kr-hash': sign(config.hash_key, answer)})
+        ipn.process_pending()
+        event = PaymentEvent.objects.latest_for_order('77')
+        self.assertEqual(event.status, PaymentEvent.STATUS_CAPTURED)
+        self.assertEqual(event.amount, Decimal('149.90'))
+        self.assertEqual(event.source, PaymentEvent.SOURCE_IPN)
+
+    def test_admin_cannot_alter_the_ledger(self):
+        from django.contrib.auth.models import User
+        admin_user = User.objects.create_superuser('admin')
+        self.client.force_login(admin_user)
+        event = self.event('1', PaymentEvent.STATUS_CAPTURED, 5)
+        response = self.client.post(reverse('admin:izipay_paymentevent_delete', args=[event.pk]), {'post': 'yes'})
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(PaymentEvent.objects.filter(pk=event.pk).exists())
+        changelist = self.client.get(reverse('admin:izipay_paymentevent_changelist'))
+        self.assertEqual(changelist.status_code, 200)
+        self.assertNotIn('delete_selected', changelist.content.decode())
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.shop = ShopifyConfig.objects.create(shop_name='tienda.myshopify.com')
+
+    def order(self, order_id, total, status):
+        ShopifyOrder.objects.create(
+            config=self.shop, order_id=order_id, total_price=Decimal(total),
+            financial_status=status, created_at_shopify=self.now - timedelta(hours=1),
+        )
+
+    def captured(self, order_id, amount, transaction_uuid):
+        PaymentEvent.objects.create(
+            order_id=order_id, transaction_uuid=transaction_uuid, amount=Decimal(amount),
+            status=PaymentEvent.STATUS_CAPTURED, source=PaymentEvent.SOURCE_IPN,
+        )
+
+    def test_mismatches_are_detected(self):
+        self.order('100', '10.00', 'paid')
+        self.captured('100', '10.00', 'a')
+        self.order('101', '20.00', 'pending')
+        self.captured('101', '20.00', 'b')
+        self.order('102', '30.00', 'paid')
+        self.captured('102', '25.00', 'c')
+        self.order('103', '40.00', 'paid')
+        self.captured('103', '40.00', 'd')
+        self.captured('103', '40.00', 'e')
+        self.captured('104', '50.00', 'f')
+        self.order('105', '60.00', 'pending')
+
+        found = {
+            (mismatch.order_id, mismatch.kind)
+            for mismatch in reconciliation.reconcile(self.now - timedelta(days=1), self.now + timedelta(days=1))
+        }
+        self.assertEqual(found, {
+            ('101', reconciliation.CAPTURED_NOT_PAID),
+            ('102', reconciliation.AMOUNT_MISMATCH),
+            ('103', reconciliation.DUPLICATE_CAPTURE),
+            ('104', reconciliation.MISSING_IN_SHOPIFY),
+        })
+
+    def test_merge_join_requires_sorted_streams(self):
+        with self.assertRaises(ValueError):
+            list(reconciliation.merge_join([('2', 'a'), ('1', 'b')], []))
+
+    def test_streams_use_python_order(self):
+        # En una collation de idioma 'a-2' iría antes que 'B1' y '_x'
+        order_ids = ['a-2', 'B1', '_x', 'a2', 'Ñ9', '10', '9']
+        for number, order_id in enumerate(order_ids):
+            self.order(order_id, '10.00', 'paid')
+            self.captured(order_id, '10.00', f'u{number}')
+        since, until = self.now - timedelta(days=1), self.now + timedelta(days=1)
+        self.assertEqual([key for key, _ in reconciliation.izipay_stream(since, until)], sorted(order_ids))
+        self.assertEqual([key for key, _ in reconciliation.shopify_stream(since, until)], sorted(order_ids))
+        self.assertEqual(list(reconciliation.reconcile(since, until)), [])
+
+    def test_shops_sharing_an_order_id_are_reconciled_separately(self):
+        other = ShopifyConfig.objects.create(shop_name='otra.myshopify.com')
+        self.order('100', '10.00', 'pending')
+        ShopifyOrder.objects.create(
+            config=other, order_id='100', total_price=Decimal('10.00'),
+            financial_status='paid', created_at_shopify=self.now - timedelta(hours=1),
+        )
+        self.captured('100', '10.00', 'a')
+        since, until = self.now - timedelta(days=1), self.now + timedelta(days=1)
+        with self.assertRaises(reconciliation.MultipleShopsError):
+            reconciliation.reconcile(since, until)
+        with self.assertRaisesMessage(CommandError, '--shop'):
+            call_command('reconcile_payments', since=since.date().isoformat(), stdout=io.StringIO())
+        self.assertEqual(
+            [(mismatch.kind, mismatch.config_id) for mismatch in reconciliation.reconcile(since, until, self.shop)],
+            [(reconciliation.CAPTURED_NOT_PAID, self.shop.pk)],
+        )
+        self.assertEqual(list(reconciliation.reconcile(since, until, other)), [])
+
+    def test_order_id_uses_a_binary_collation_on_postgresql(self):
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            key = reconciliation.order_id_key()
+        self.assertEqual(key.collation, 'C')
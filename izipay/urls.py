@@ -11,6 +11,8 @@ app_name = 'izipay'
 urlpatterns = [
     # API endpoints
     path('api/', include(router.urls)),
+    path('api/async/test_connectivity/', views.test_connectivity_async, name='test_connectivity_async'),
+    path('ipn/', views.ipn_notification, name='ipn'),
     
     # Página HTML tradicional (opcional)
     path('test-page/', views.connectivity_test_page, name='test_page'),
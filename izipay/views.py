@@ -3,19 +3,28 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.shortcuts import render
-import requests
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from asgiref.sync import sync_to_async
 import json
-import hashlib
-import hmac
-import base64
 from datetime import datetime
+from jobs.registry import enqueue_many
+from shop_izi.breaker import get_health
+from shop_izi.http import get_origin
+from monitoring import probes
+from monitoring.models import ProbeResult
+from . import ipn, ledger, payments, responses, tenants
 from .models import IzipayConfig
 from .serializers import (
     IzipayConfigSerializer,
     IzipayConfigPublicSerializer,
     ConnectivityTestSerializer,
-    ConnectivityTestResponseSerializer,
-    IzipayScriptSerializer
+    CreatePaymentSerializer,
+    CreatePaymentBatchSerializer,
+    PaymentResultSerializer,
+    config_public,
+    connectivity_response
 )
 
 class IzipayConfigViewSet(viewsets.ModelViewSet):
@@ -30,45 +39,68 @@ class IzipayConfigViewSet(viewsets.ModelViewSet):
             return IzipayConfigPublicSerializer
         return IzipayConfigSerializer
     
-    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
-    def active_config(self, request):
-        """Obtener la configuración activa"""
+    def list(self, request, *args, **kwargs):
+        """Listado sobre filas .values() con el serializador ligero"""
+        queryset = config_public.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(config_public.many(page))
+        return Response(config_public.many(queryset))
+    
+    def retrieve(self, request, *args, **kwargs):
+        return Response(config_public.from_instance(self.get_object()))
+    
+    @action(detail=True, methods=['post'])
+    def activate(self, request, pk=None):
+        """Activar esta configuración y desactivar la anterior en una sola transacción"""
         try:
-            config = IzipayConfig.get_active_config()
-            if not config:
-                return Response(
-                    {'error': 'No hay configuración activa'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            serializer = IzipayConfigPublicSerializer(config)
-            return Response(serializer.data)
-        except Exception as e:
+            changed = IzipayConfig.activate(int(pk))
+        except (ValueError, IzipayConfig.DoesNotExist):
             return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': f'Configuración con ID {pk} no encontrada'},
+                status=status.HTTP_404_NOT_FOUND
             )
+        return Response({'id': int(pk), 'changed': changed})
+    
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def active_config(self, request):
+        """Obtener la configuración activa (precalculada, con ETag)"""
+        return self._serve_precomputed(request, 'active_config')
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def script_info(self, request):
-        """Obtener información del script de Izipay"""
+        """Obtener información del script de Izipay (precalculada, con ETag)"""
+        return self._serve_precomputed(request, 'script_info')
+    
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def health(self, request):
+        """
+        Disponibilidad de Izipay según el circuit breaker, para que la tienda
+        oculte el botón de pago mientras está caído. No llama a Izipay.
+        """
+        config = IzipayConfig.get_active_config()
+        if not config:
+            return Response(
+                {'error': 'No hay configuración activa'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        upstream = get_origin(config.get_api_url(''))
+        health = get_health(upstream)
+        return Response({
+            'upstream': upstream,
+            'available': health['available'],
+            'state': health['state'],
+        })
+    
+    def _serve_precomputed(self, request, name):
         try:
-            config = IzipayConfig.get_active_config()
-            if not config:
+            precomputed = responses.get_precomputed(name)
+            if not precomputed:
                 return Response(
                     {'error': 'No hay configuración activa'},
                     status=status.HTTP_404_NOT_FOUND
                 )
-            
-            script_data = {
-                'script_tag': config.get_script_tag(),
-                'script_url': config.script_url,
-                'environment': 'Sandbox' if config.is_sandbox else 'Producción',
-                'merchant_code': config.merchant_code
-            }
-            
-            serializer = IzipayScriptSerializer(script_data)
-            return Response(serializer.data)
+            return responses.serve(request, precomputed)
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -77,7 +109,7 @@ class IzipayConfigViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'], permission_classes=[AllowAny])
     def test_connectivity(self, request):
-        """Probar conectividad con Izipay"""
+        """Último resultado del sondeo de conectividad con Izipay (comando run_probes)"""
         serializer = ConnectivityTestSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -89,7 +121,7 @@ class IzipayConfigViewSet(viewsets.ModelViewSet):
             # Obtener configuración
             if config_id:
                 try:
-                    config = IzipayConfig.objects.get(id=config_id)
+                    config = IzipayConfig.objects.only('id').get(id=config_id)
                 except IzipayConfig.DoesNotExist:
                     return Response(
                         {'error': f'Configuración con ID {config_id} no encontrada'},
@@ -103,105 +135,109 @@ class IzipayConfigViewSet(viewsets.ModelViewSet):
                         status=status.HTTP_404_NOT_FOUND
                     )
             
-            if test_type == 'simple':
-                result = self._simple_connectivity_test(config)
-            else:
-                result = self._full_connectivity_test(config)
-            
+            result = probes.cached_result(ProbeResult.TARGET_IZIPAY, config.pk, test_type)
+            if result is None:
+                return Response(
+                    {'error': 'Aún no hay resultados del sondeo para esta configuración (ver run_probes)'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
             result['test_type'] = test_type
-            result['timestamp'] = datetime.now()
-            
-            response_serializer = ConnectivityTestResponseSerializer(result)
-            return Response(response_serializer.data)
+            return Response(connectivity_response.to_representation(result))
             
         except Exception as e:
             error_result = {
                 'success': False,
+                'message': 'Error inesperado',
                 'error': f'Error inesperado: {str(e)}',
                 'test_type': test_type,
                 'timestamp': datetime.now()
             }
-            response_serializer = ConnectivityTestResponseSerializer(error_result)
-            return Response(response_serializer.data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response(
+                connectivity_response.to_representation(error_result),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
     
-    def _simple_connectivity_test(self, config):
-        """Prueba simple de conectividad"""
-        try:
-            test_url = config.script_url
-            response = requests.get(test_url, timeout=10)
-            
-            return {
-                'success': True,
-                'message': 'Conectividad básica exitosa con Izipay',
-                'config_info': {
-                    'merchant_code': config.merchant_code,
-                    'environment': 'Sandbox' if config.is_sandbox else 'Producción',
-                    'script_url': config.script_url,
-                    'tested_url': test_url
-                },
-                'response_status': response.status_code
-            }
-        except requests.exceptions.RequestException as e:
-            return {
-                'success': False,
-                'error': f'Error de conexión: {str(e)}',
-                'attempted_url': test_url if 'test_url' in locals() else 'URL no definida'
-            }
+    @action(detail=False, methods=['post'])
+    def create_payment(self, request):
+        """Crear el pago en Izipay de una orden de Shopify"""
+        serializer = CreatePaymentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        config, error_response = self._get_payment_config(
+            serializer.validated_data.get('config_id'),
+            serializer.validated_data.get('shop_domain')
+        )
+        if error_response:
+            return error_response
+        
+        order = serializer.validated_data['order']
+        result = payments.create_payment(config, order)
+        ledger.record_payment_results([order], [result])
+        response_status = status.HTTP_201_CREATED if result['success'] else status.HTTP_502_BAD_GATEWAY
+        return Response(PaymentResultSerializer(result).data, status=response_status)
+    
+    @action(detail=False, methods=['post'])
+    def create_payments(self, request):
+        """Crear en paralelo los pagos de un lote de órdenes (p. ej. pendientes tras una caída)"""
+        serializer = CreatePaymentBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        config, error_response = self._get_payment_config(
+            serializer.validated_data.get('config_id'),
+            serializer.validated_data.get('shop_domain')
+        )
+        if error_response:
+            return error_response
+        
+        if serializer.validated_data.get('defer'):
+            # Los pagos se crean en el worker run_jobs, fuera de la petición
+            jobs = enqueue_many('izipay.create_payment', [
+                {'config_id': config.pk, 'order': order}
+                for order in serializer.initial_data['orders']
+            ])
+            return Response({'total': len(jobs), 'queued': len(jobs)}, status=status.HTTP_202_ACCEPTED)
+        
+        orders = serializer.validated_data['orders']
+        results = payments.create_payments(
+            config,
+            orders,
+            max_workers=serializer.validated_data.get('max_workers', payments.DEFAULT_MAX_WORKERS)
+        )
+        ledger.record_payment_results(orders, results)
+        succeeded = sum(1 for result in results if result['success'])
+        return Response({
+            'total': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': PaymentResultSerializer(results, many=True).data
+        })
+    
+    def _get_payment_config(self, config_id, shop_domain=None):
+        """
+        Configuración indicada, la vinculada a la tienda (404 si la tienda no
+        tiene vínculo) o la activa; retorna (config, respuesta_de_error)
+        """
+        if config_id:
+            config = IzipayConfig.objects.defer('public_key').filter(id=config_id).first()
+            if not config:
+                return None, Response(
+                    {'error': f'Configuración con ID {config_id} no encontrada'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return config, None
+        config = tenants.get_izipay_config_for_shop(shop_domain)
+        if not config and shop_domain:
+            return None, Response(
+                {'error': f'La tienda {shop_domain} no está vinculada a un comercio Izipay'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if not config:
+            return None, Response(
+                {'error': 'No hay configuración activa de Izipay'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return config, None
     
-    def _full_connectivity_test(self, config):
-        """Prueba completa de conectividad con API"""
-        try:
-            # URLs corregidas para Izipay
-            if config.is_sandbox:
-                api_url = 'https://sandbox-checkout.izipay.pe/api-payment/V4/Charge/CreatePayment'
-            else:
-                api_url = 'https://checkout.izipay.pe/api-payment/V4/Charge/CreatePayment'
-            
-            # Datos de prueba
-            test_data = {
-                'amount': 100,
-                'currency': 'PEN',
-                'orderId': f'test-{datetime.now().strftime("%Y%m%d%H%M%S")}'
-            }
-            
-            # Crear firma HMAC
-            payload = json.dumps(test_data, separators=(',', ':'))
-            signature = hmac.new(
-                config.hash_key.encode('utf-8'),
-                payload.encode('utf-8'),
-                hashlib.sha256
-            ).hexdigest()
-            
-            # Headers
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Basic {base64.b64encode(f"{config.merchant_code}:{config.api_key}".encode()).decode()}',
-                'X-Hmac-Sha256': signature
-            }
-            
-            # Realizar petición
-            response = requests.post(api_url, json=test_data, headers=headers, timeout=30)
-            
-            return {
-                'success': True,
-                'message': f'Respuesta recibida de Izipay (Status: {response.status_code})',
-                'config_info': {
-                    'merchant_code': config.merchant_code,
-                    'environment': 'Sandbox' if config.is_sandbox else 'Producción',
-                    'script_url': config.script_url,
-                    'api_url': api_url
-                },
-                'response_status': response.status_code,
-                'response_preview': response.text[:200] + '...' if len(response.text) > 200 else response.text
-            }
-            
-        except requests.exceptions.RequestException as e:
-            return {
-                'success': False,
-                'error': f'Error de conexión: {str(e)}',
-                'attempted_url': api_url if 'api_url' in locals() else 'URL no definida'
-            }
-
 # Vista tradicional para la página HTML (opcional)
 def connectivity_test_page(request):
     """Página HTML para probar la conectividad"""
@@ -209,3 +245,71 @@ def connectivity_test_page(request):
     return render(request, 'izipay/test_connectivity.html', {
         'config': config
     })
+
+
+@csrf_exempt
+@require_POST
+async def test_connectivity_async(request):
+    """
+    Versión asíncrona (ASGI) de IzipayConfigViewSet.test_connectivity; también
+    sirve el último resultado de run_probes
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'JSON inválido'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = ConnectivityTestSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    test_type = serializer.validated_data.get('test_type', 'simple')
+    config_id = serializer.validated_data.get('config_id')
+    
+    if config_id:
+        config = await IzipayConfig.objects.only('id').filter(id=config_id).afirst()
+        if not config:
+            return JsonResponse(
+                {'error': f'Configuración con ID {config_id} no encontrada'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+    else:
+        config = await sync_to_async(IzipayConfig.get_active_config)()
+        if not config:
+            return JsonResponse(
+                {'error': 'No hay configuración activa de Izipay'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+    
+    result = await probes.acached_result(ProbeResult.TARGET_IZIPAY, config.pk, test_type)
+    if result is None:
+        return JsonResponse(
+            {'error': 'Aún no hay resultados del sondeo para esta configuración (ver run_probes)'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    result['test_type'] = test_type
+    return JsonResponse(connectivity_response.to_representation(result))
+
+
+@csrf_exempt
+@require_POST
+def ipn_notification(request):
+    """
+    Recibe la notificación de pago (IPN) de Izipay: verifica la firma, la guarda
+    y responde de inmediato. El procesamiento se hace fuera de la petición.
+    """
+    answer = request.POST.get('kr-answer', '')
+    config = tenants.get_izipay_config_for_merchant(ipn.get_merchant_code(answer))
+    if not config:
+        # Izipay reintenta la notificación si no recibe un 2xx
+        return HttpResponse('No hay configuración para el comercio', status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    if not ipn.verify_signature(config, answer, request.POST.get('kr-hash')):
+        return HttpResponse('Firma inválida', status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        ipn.store_notification(answer, request.POST.get('kr-answer-type', ''))
+    except ipn.InvalidNotification as e:
+        return HttpResponse(str(e), status=status.HTTP_400_BAD_REQUEST)
+    # Las notificaciones duplicadas también se confirman para cortar los reintentos
+    return HttpResponse('OK')
@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'queue', 'status', 'attempts', 'max_attempts', 'run_at', 'updated_at')
+    list_filter = ('status', 'queue', 'task')
+    search_fields = ('task', 'last_error')
+    readonly_fields = ('created_at', 'updated_at', 'locked_by', 'locked_at')
+    actions = ['requeue']
+
+    @admin.action(description="Requeue selected jobs")
+    def requeue(self, request, queryset):
+        from django.utils import timezone
+        queryset.update(status=Job.STATUS_QUEUED, attempts=0, run_at=timezone.now(), locked_by='', locked_at=None)
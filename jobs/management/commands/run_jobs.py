@@ -0,0 +1,59 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from jobs import worker
+
+
+def _work_forever(queue, batch_size, poll_interval, burst):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    while True:
+        close_old_connections()
+        if not worker.work(queue, batch_size):
+            if burst:
+                return
+            time.sleep(poll_interval)
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the database queue in one or more worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', default='default')
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=10, help="Jobs claimed per round trip.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Sleep when the queue is empty (s).")
+        parser.add_argument('--stale-timeout', type=int, default=600, help="Requeue jobs running longer than this (s).")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        requeued = worker.requeue_stale(options['stale_timeout'])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs")
+        worker_args = (options['queue'], options['batch_size'], options['poll_interval'], options['burst'])
+
+        if options['processes'] == 1:
+            _work_forever(*worker_args)
+            return
+
+        # Children must not inherit the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=_work_forever, args=worker_args, name=f'run_jobs-{index}')
+            for index in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} workers on queue '{options['queue']}'")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
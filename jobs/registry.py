@@ -0,0 +1,58 @@
+"""
+Task registry and enqueueing.
+
+Apps declare tasks in <app>/tasks.py, which jobs autodiscovers at startup:
+
+    from jobs.registry import task
+
+    @task('izipay.process_notification')
+    def process_notification(notification_id):
+        ...
+
+and enqueue them with enqueue('izipay.process_notification', notification_id=1).
+A task signals a retryable failure by raising; the payload must be JSON-serializable.
+"""
+from django.utils import timezone
+
+from .models import Job
+
+_tasks = {}
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def task(name):
+    def decorator(func):
+        _tasks[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise UnknownTask(name)
+
+
+def enqueue(name, queue='default', run_at=None, max_attempts=5, **payload):
+    """Create a queued job. Call it inside the caller's transaction to enqueue atomically."""
+    get_task(name)
+    return Job.objects.create(
+        task=name,
+        payload=payload,
+        queue=queue,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts,
+    )
+
+
+def enqueue_many(name, payloads, queue='default', max_attempts=5):
+    get_task(name)
+    now = timezone.now()
+    return Job.objects.bulk_create([
+        Job(task=name, payload=payload, queue=queue, run_at=now, max_attempts=max_attempts)
+        for payload in payloads
+    ])
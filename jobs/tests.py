@@ -0,0 +1,57 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from . import worker
+from .models import Job
+from .registry import enqueue, task
+
+calls = []
+
+
+@task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task('tests.fail')
+def fail():
+    raise RuntimeError('boom')
+
+
+class JobWorkerTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_run_once_in_order(self):
+        enqueue('tests.record', value=1)
+        enqueue('tests.record', value=2)
+        self.assertEqual(worker.work(batch_size=10), 2)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(worker.work(), 0)
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.STATUS_DONE})
+
+    def test_claimed_jobs_are_not_claimed_twice(self):
+        enqueue('tests.record', value=1)
+        self.assertEqual(len(worker.claim(locked_by='a')), 1)
+        self.assertEqual(worker.claim(locked_by='b'), [])
+
+    def test_failures_back_off_then_dead_letter(self):
+        job = enqueue('tests.fail', max_attempts=2)
+        worker.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        worker.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DEAD)
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = enqueue('tests.record', value=1)
+        worker.claim()
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timezone.timedelta(hours=1))
+        self.assertEqual(worker.requeue_stale(timeout=60), 1)
+        self.assertEqual(worker.work(), 1)
@@ -0,0 +1,92 @@
+"""
+Claiming and running jobs.
+
+On databases with SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL, MySQL 8)
+concurrent workers lock disjoint rows and never wait on each other. SQLite has
+no row locks, so a worker claims each candidate with a conditional UPDATE
+(status still queued) and simply skips the ones another worker won.
+"""
+import logging
+import random
+import socket
+import os
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 5
+BACKOFF_MAX = 3600
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def backoff(attempts):
+    """Seconds before retry number `attempts`: exponential with jitter, capped."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(queue='default', limit=1, locked_by=None):
+    """Mark up to `limit` due jobs as running for this worker and return them."""
+    locked_by = locked_by or worker_id()
+    now = timezone.now()
+    due = Job.objects.filter(queue=queue, status=Job.STATUS_QUEUED, run_at__lte=now).order_by('run_at', 'id')
+    claim_fields = dict(status=Job.STATUS_RUNNING, locked_by=locked_by, locked_at=now, attempts=F('attempts') + 1)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            Job.objects.filter(pk__in=ids).update(**claim_fields)
+    else:
+        ids = [
+            pk for pk in due.values_list('pk', flat=True)[:limit]
+            if Job.objects.filter(pk=pk, status=Job.STATUS_QUEUED).update(**claim_fields)
+        ]
+    return list(Job.objects.filter(pk__in=ids).order_by('run_at', 'id'))
+
+
+def run(job):
+    """Run a claimed job, then mark it done, schedule a retry or dead-letter it."""
+    try:
+        get_task(job.task)(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.STATUS_DEAD
+            logger.error("Job %s dead after %s attempts", job, job.attempts)
+        else:
+            job.status = Job.STATUS_QUEUED
+            job.run_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+    else:
+        job.status = Job.STATUS_DONE
+        job.last_error = ''
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=['status', 'last_error', 'run_at', 'locked_by', 'locked_at', 'updated_at'])
+    return job.status
+
+
+def requeue_stale(timeout=600):
+    """Return to the queue running jobs whose worker died without finishing them."""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=cutoff).update(
+        status=Job.STATUS_QUEUED, locked_by='', locked_at=None,
+    )
+
+
+def work(queue='default', batch_size=10):
+    """Claim and run one batch; returns the number of jobs run."""
+    jobs = claim(queue, batch_size)
+    for job in jobs:
+        run(job)
+    return len(jobs)
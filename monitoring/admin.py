@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import ProbeResult, SlowRequest
+
+
+@admin.register(ProbeResult)
+class ProbeResultAdmin(admin.ModelAdmin):
+    list_display = ('target', 'config_id', 'test_type', 'success', 'latency_ms', 'probe_count', 'failure_count', 'checked_at')
+    list_filter = ('target', 'test_type', 'success')
+    readonly_fields = [field.name for field in ProbeResult._meta.fields]
+
+
+@admin.register(SlowRequest)
+class SlowRequestAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view', 'status_code', 'duration_ms', 'query_count', 'query_ms', 'upstream_ms')
+    list_filter = ('view', 'status_code')
+    search_fields = ('path', 'view')
+    readonly_fields = [field.name for field in SlowRequest._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
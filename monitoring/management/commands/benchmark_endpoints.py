@@ -0,0 +1,237 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from izipay.models import IzipayConfig
+from monitoring import probes
+from shop_izi.benchmarks import Timer, summarize
+from shop_izi.mock_upstreams import FaultProfile, mock_upstreams, upstream_settings
+from shopify.models import ShopifyConfig
+from shopify.webhooks import webhook_queue
+
+BENCH_MERCHANT = 'BENCH0001'
+BENCH_SHOP = 'bench.myshopify.com'
+BENCH_SECRET = 'bench-secret'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure throughput and p50/p99 latency of the public Izipay and Shopify endpoints "
+        "through the WSGI and ASGI request handlers, with the mock upstreams (shop_izi.mock_upstreams), "
+        "and store the results as JSON. It writes benchmark configurations and requests to "
+        "the database: run it against a scratch copy (SQLITE_PATH=/tmp/bench.sqlite3, migrated)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and mode.")
+        parser.add_argument('--concurrency', type=int, default=16, help="Threads (WSGI) or in-flight requests (ASGI).")
+        parser.add_argument('--modes', default='wsgi,asgi')
+        parser.add_argument('--endpoints', default='', help="Comma-separated subset of endpoint names.")
+        parser.add_argument('--upstream-delay', type=float, default=0.05, help="Stand-in upstream latency (s).")
+        parser.add_argument('--output', default='', help="JSON file (default bench-results/endpoints-<timestamp>.json).")
+        parser.add_argument('--compare', default='', help="Previous JSON result to diff against.")
+
+    def handle(self, *args, **options):
+        with ExitStack() as stack:
+            upstream = stack.enter_context(mock_upstreams(FaultProfile(latency=f"fixed:{options['upstream_delay']}")))
+            stack.enter_context(override_settings(
+                UPSTREAMS=upstream_settings(upstream),
+                # Host used by the test clients
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            ))
+            izipay_config, shop = self._fixtures()
+            endpoints = self._endpoints(izipay_config, shop)
+            if options['endpoints']:
+                selected = options['endpoints'].split(',')
+                unknown = set(selected) - set(endpoints)
+                if unknown:
+                    raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+                endpoints = {name: endpoints[name] for name in selected}
+            # test_connectivity serves the latest probe: probe the mock upstreams once
+            probes.run_once()
+
+            results = {}
+            for mode in options['modes'].split(','):
+                runner = {'wsgi': self._run_wsgi, 'asgi': self._run_asgi}.get(mode)
+                if runner is None:
+                    raise CommandError(f"Unknown mode '{mode}'")
+                results[mode] = {}
+                for name, build in endpoints.items():
+                    summary = runner(build, options['requests'], options['concurrency'])
+                    results[mode][name] = summary
+                    self._report(mode, name, summary)
+            webhook_queue.join()
+
+        report = {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'commit': self._commit(),
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'upstream_delay_s': options['upstream_delay'],
+            'results': results,
+        }
+        output = Path(options['output'] or f"bench-results/endpoints-{datetime.now():%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(f"Results written to {output}")
+        if options['compare']:
+            self._compare(json.loads(Path(options['compare']).read_text()), report)
+
+    def _fixtures(self):
+        if IzipayConfig.objects.exclude(merchant_code=BENCH_MERCHANT).exists():
+            raise CommandError("The database has real Izipay configurations; run against a scratch database.")
+        izipay_config = IzipayConfig.objects.filter(merchant_code=BENCH_MERCHANT).first() or IzipayConfig(
+            merchant_code=BENCH_MERCHANT, api_key='bench-api-key', hash_key='bench-hash-key',
+            public_key='bench-public-key', is_active=True,
+        )
+        # save() points script_url at the current (mock) upstream
+        izipay_config.save()
+        shop, _ = ShopifyConfig.objects.get_or_create(
+            shop_name=BENCH_SHOP,
+            defaults={'access_token': 'bench-token', 'api_secret': BENCH_SECRET, 'is_active': True},
+        )
+        return izipay_config, shop
+
+    def _endpoints(self, izipay_config, shop):
+        """name -> callable returning (method, path, body, content_type, headers) for one request"""
+
+        def get(path):
+            return lambda: ('get', path, None, None, {})
+
+        def post_json(path, data):
+            return lambda: ('post', path, json.dumps(data), 'application/json', {})
+
+        def ipn():
+            answer = json.dumps({
+                'shopId': izipay_config.merchant_code,
+                'orderStatus': 'PAID',
+                'orderDetails': {'orderId': str(uuid.uuid4().int)[:12]},
+                'transactions': [{'uuid': uuid.uuid4().hex}],
+            })
+            signature = hmac.new(izipay_config.hash_key.encode(), answer.encode(), hashlib.sha256).hexdigest()
+            body = {'kr-answer': answer, 'kr-hash': signature, 'kr-answer-type': 'V4/Payment'}
+            return 'post', reverse('izipay:ipn'), body, None, {}
+
+        def order_webhook():
+            body = json.dumps({
+                'id': int(str(uuid.uuid4().int)[:12]), 'name': '#bench', 'financial_status': 'paid',
+                'total_price': '10.00', 'currency': 'PEN', 'created_at': '2026-01-01T00:00:00Z',
+            }).encode()
+            digest = base64.b64encode(hmac.new(shop.api_secret.encode(), body, hashlib.sha256).digest()).decode()
+            headers = {
+                'X-Shopify-Topic': 'orders/paid',
+                'X-Shopify-Shop-Domain': shop.shop_name,
+                'X-Shopify-Hmac-Sha256': digest,
+            }
+            return 'post', reverse('order_webhook'), body, 'application/json', headers
+
+        return {
+            'izipay.active_config': get(reverse('izipay:izipayconfig-active-config')),
+            'izipay.script_info': get(reverse('izipay:izipayconfig-script-info')),
+            'izipay.test_connectivity': post_json(reverse('izipay:izipayconfig-test-connectivity'), {'test_type': 'simple'}),
+            'izipay.test_connectivity_async': post_json(reverse('izipay:test_connectivity_async'), {'test_type': 'simple'}),
+            'izipay.ipn': ipn,
+            'shopify.test_connectivity': post_json(reverse('shopify-config-test-connectivity'), {}),
+            'shopify.test_connectivity_async': post_json(reverse('test_connectivity_async'), {}),
+            'shopify.order_webhook': order_webhook,
+        }
+
+    @staticmethod
+    def _send(client, request):
+        method, path, body, content_type, headers = request
+        kwargs = {'headers': headers}
+        if body is not None:
+            kwargs['data'] = body
+        if content_type:
+            kwargs['content_type'] = content_type
+        return getattr(client, method)(path, **kwargs)
+
+    def _run_wsgi(self, build, total, concurrency):
+        requests = [build() for _ in range(total)]
+        # Client keeps cookies and the last response: one per pool thread
+        local = threading.local()
+
+        def timed(request):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            start = time.perf_counter()
+            response = self._send(client, request)
+            return time.perf_counter() - start, response.status_code
+
+        with Timer() as timer, ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(timed, requests))
+        return self._summary(outcomes, timer.elapsed)
+
+    def _run_asgi(self, build, total, concurrency):
+        requests = [build() for _ in range(total)]
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def timed(request):
+                async with semaphore:
+                    # Like the WSGI runner, no client state is shared between concurrent requests
+                    client = AsyncClient()
+                    start = time.perf_counter()
+                    response = await self._send(client, request)
+                    return time.perf_counter() - start, response.status_code
+
+            return await asyncio.gather(*(timed(request) for request in requests))
+
+        with Timer() as timer:
+            outcomes = asyncio.run(run())
+        return self._summary(outcomes, timer.elapsed)
+
+    @staticmethod
+    def _summary(outcomes, elapsed):
+        summary = summarize([latency for latency, _ in outcomes], elapsed)
+        statuses = {}
+        for _, status in outcomes:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        summary['statuses'] = statuses
+        summary['errors'] = sum(count for status, count in statuses.items() if not status.startswith('2'))
+        return summary
+
+    def _report(self, mode, name, summary):
+        self.stdout.write(
+            f"{mode:<5} {name:<34} {summary['throughput_rps']:>8} req/s  "
+            f"p50 {summary['p50_ms']:>8}ms  p99 {summary['p99_ms']:>8}ms  errors {summary['errors']}"
+        )
+
+    def _compare(self, previous, current):
+        self.stdout.write(f"Compared with {previous.get('commit') or 'previous run'}:")
+        for mode, endpoints in current['results'].items():
+            for name, summary in endpoints.items():
+                before = previous.get('results', {}).get(mode, {}).get(name)
+                if not before:
+                    continue
+                changes = []
+                for key in ('throughput_rps', 'p50_ms', 'p99_ms'):
+                    if before[key]:
+                        changes.append(f"{key} {(summary[key] - before[key]) / before[key] * 100:+.1f}%")
+                self.stdout.write(f"{mode:<5} {name:<34} " + '  '.join(changes))
+
+    @staticmethod
+    def _commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ''
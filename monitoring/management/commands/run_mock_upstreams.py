@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shop_izi.mock_upstreams import FaultProfile, create_server, upstream_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve mock Izipay and Shopify APIs with configurable latency, 5xx errors, 429 throttling "
+        "and slow-drip responses, for offline load tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8099)
+        parser.add_argument(
+            '--latency', default='fixed:0.05',
+            help="fixed:S | uniform:MIN,MAX | normal:MEAN,STDDEV | lognormal:MEDIAN,SIGMA | exp:MEAN (seconds).",
+        )
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of 503 responses.")
+        parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of 429/THROTTLED responses.")
+        parser.add_argument('--drip-rate', type=float, default=0.0, help="Fraction of responses sent slowly.")
+        parser.add_argument('--drip-interval', type=float, default=0.5, help="Seconds between dripped chunks.")
+        parser.add_argument('--drip-chunk', type=int, default=16, help="Bytes per dripped chunk.")
+        parser.add_argument('--orders', type=int, default=1000, help="Orders served by orders.json and bulk results.")
+
+    def handle(self, *args, **options):
+        try:
+            faults = FaultProfile(
+                latency=options['latency'],
+                error_rate=options['error_rate'],
+                throttle_rate=options['throttle_rate'],
+                drip_rate=options['drip_rate'],
+                drip_interval=options['drip_interval'],
+                drip_chunk=options['drip_chunk'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        server = create_server(options['host'], options['port'], faults, options['orders'])
+        base_url = f"http://{options['host']}:{server.server_address[1]}"
+        self.stdout.write(f"Mock upstreams on {base_url} ({faults})")
+        self.stdout.write("Point the app at it with:")
+        for name, value in upstream_settings(base_url).items():
+            self.stdout.write(f"  export {name}='{value}'")
+        self.stdout.flush()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from monitoring import probes
+
+
+class Command(BaseCommand):
+    help = "Probe every Izipay and Shopify configuration at a fixed interval and store the results."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=getattr(settings, 'PROBE_INTERVAL', 60),
+            help="Seconds between the start of two probe rounds.",
+        )
+        parser.add_argument('--concurrency', type=int, default=4, help="Configurations probed at the same time.")
+        parser.add_argument('--once', action='store_true', help="Run a single round and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            count = probes.run_once(options['concurrency'])
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"Probed {count} configurations in {elapsed:.1f}s")
+            if options['once']:
+                return
+            time.sleep(max(0.0, options['interval'] - elapsed))
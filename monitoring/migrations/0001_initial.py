@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProbeResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(choices=[('izipay', 'Izipay'), ('shopify', 'Shopify')], max_length=16)),
+                ('config_id', models.PositiveIntegerField(help_text='IzipayConfig or ShopifyConfig id, depending on target.')),
+                ('test_type', models.CharField(choices=[('simple', 'Simple'), ('full', 'Full')], max_length=16)),
+                ('success', models.BooleanField(default=False)),
+                ('result', models.JSONField(blank=True, default=dict, help_text='Body served by the test_connectivity endpoints.')),
+                ('latency_ms', models.FloatField(default=0)),
+                ('checked_at', models.DateTimeField()),
+                ('probe_count', models.PositiveIntegerField(default=0)),
+                ('failure_count', models.PositiveIntegerField(default=0)),
+                ('latency_sum_ms', models.FloatField(default=0)),
+                ('latency_buckets', models.JSONField(blank=True, default=list, help_text='Probe counts per bucket of monitoring.probes.LATENCY_BUCKETS_MS (last one is overflow).')),
+            ],
+            options={
+                'verbose_name': 'Probe result',
+                'verbose_name_plural': 'Probe results',
+                'constraints': [models.UniqueConstraint(fields=('target', 'config_id', 'test_type'), name='probe_result_unique')],
+            },
+        ),
+    ]
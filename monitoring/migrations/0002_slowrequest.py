@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=255)),
+                ('view', models.CharField(blank=True, help_text='View name or ViewSet.action.', max_length=255)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('query_count', models.PositiveIntegerField(default=0)),
+                ('query_ms', models.FloatField(default=0)),
+                ('upstream_ms', models.FloatField(default=0)),
+                ('queries', models.JSONField(blank=True, default=list, help_text='Slowest SQL queries with their duration.')),
+                ('duplicate_queries', models.JSONField(blank=True, default=list, help_text='SQL executed more than once (N+1).')),
+                ('upstream_calls', models.JSONField(blank=True, default=list)),
+                ('profile', models.TextField(blank=True, help_text='cProfile stats sorted by cumulative time.')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Slow request',
+                'verbose_name_plural': 'Slow requests',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
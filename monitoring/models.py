@@ -0,0 +1,70 @@
+from django.db import models
+
+
+class ProbeResult(models.Model):
+    """Latest result and cumulative latency histogram of one upstream check, written by run_probes."""
+
+    TARGET_IZIPAY = 'izipay'
+    TARGET_SHOPIFY = 'shopify'
+    TARGET_CHOICES = [
+        (TARGET_IZIPAY, 'Izipay'),
+        (TARGET_SHOPIFY, 'Shopify'),
+    ]
+
+    TEST_SIMPLE = 'simple'
+    TEST_FULL = 'full'
+    TEST_TYPE_CHOICES = [
+        (TEST_SIMPLE, 'Simple'),
+        (TEST_FULL, 'Full'),
+    ]
+
+    target = models.CharField(max_length=16, choices=TARGET_CHOICES)
+    config_id = models.PositiveIntegerField(help_text="IzipayConfig or ShopifyConfig id, depending on target.")
+    test_type = models.CharField(max_length=16, choices=TEST_TYPE_CHOICES)
+    success = models.BooleanField(default=False)
+    result = models.JSONField(default=dict, blank=True, help_text="Body served by the test_connectivity endpoints.")
+    latency_ms = models.FloatField(default=0)
+    checked_at = models.DateTimeField()
+    probe_count = models.PositiveIntegerField(default=0)
+    failure_count = models.PositiveIntegerField(default=0)
+    latency_sum_ms = models.FloatField(default=0)
+    latency_buckets = models.JSONField(
+        default=list, blank=True,
+        help_text="Probe counts per bucket of monitoring.probes.LATENCY_BUCKETS_MS (last one is overflow).",
+    )
+
+    def __str__(self):
+        return f"{self.target} #{self.config_id} {self.test_type} ({'ok' if self.success else 'failing'})"
+
+    class Meta:
+        verbose_name = "Probe result"
+        verbose_name_plural = "Probe results"
+        constraints = [
+            models.UniqueConstraint(fields=['target', 'config_id', 'test_type'], name='probe_result_unique'),
+        ]
+
+
+class SlowRequest(models.Model):
+    """A profiled request that exceeded PROFILING['SLOW_THRESHOLD_MS'], stored by ProfilingMiddleware."""
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    view = models.CharField(max_length=255, blank=True, help_text="View name or ViewSet.action.")
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    query_ms = models.FloatField(default=0)
+    upstream_ms = models.FloatField(default=0)
+    queries = models.JSONField(default=list, blank=True, help_text="Slowest SQL queries with their duration.")
+    duplicate_queries = models.JSONField(default=list, blank=True, help_text="SQL executed more than once (N+1).")
+    upstream_calls = models.JSONField(default=list, blank=True)
+    profile = models.TextField(blank=True, help_text="cProfile stats sorted by cumulative time.")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+    class Meta:
+        verbose_name = "Slow request"
+        verbose_name_plural = "Slow requests"
+        ordering = ['-created_at']
@@ -0,0 +1,118 @@
+"""
+Scheduled upstream probes.
+
+The run_probes command runs the simple and full connectivity checks for every
+IzipayConfig and the connection check for every ShopifyConfig at a fixed
+interval, and stores the latest result plus a cumulative latency histogram in
+ProbeResult. The test_connectivity endpoints only read these rows, so upstream
+load depends on the probe interval, not on how often dashboards poll.
+
+A round runs every check concurrently on one event loop through the async
+checks (shop_izi.async_http: pooled httpx client and the same circuit
+breakers as the sync client); results are written afterwards from the calling
+thread, so the database is never touched from the loop.
+
+Only one prober is expected to run; the histogram is updated with a plain
+read-modify-write.
+"""
+import asyncio
+import bisect
+import time
+
+from django.utils import timezone
+
+from izipay import connectivity
+from izipay.models import IzipayConfig
+from shop_izi import async_http
+from shopify.models import ShopifyConfig
+
+from .models import ProbeResult
+
+# Upper bounds in milliseconds; a final bucket counts everything slower
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+def bucket_index(latency_ms):
+    return bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)
+
+
+def record(target, config_id, test_type, result, latency_ms):
+    probe, _ = ProbeResult.objects.get_or_create(
+        target=target, config_id=config_id, test_type=test_type,
+        defaults={'checked_at': timezone.now()},
+    )
+    buckets = probe.latency_buckets or [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    buckets[bucket_index(latency_ms)] += 1
+    probe.success = bool(result.get('success'))
+    probe.result = result
+    probe.latency_ms = latency_ms
+    probe.checked_at = timezone.now()
+    probe.probe_count += 1
+    probe.failure_count += 0 if probe.success else 1
+    probe.latency_sum_ms += latency_ms
+    probe.latency_buckets = buckets
+    probe.save()
+    return probe
+
+
+async def _timed(check):
+    start = time.perf_counter()
+    result = await check
+    return result, (time.perf_counter() - start) * 1000
+
+
+async def probe_izipay(config):
+    """[(target, config_id, test_type, result, latency_ms)] of the simple and full checks"""
+    checks = (
+        (ProbeResult.TEST_SIMPLE, connectivity.asimple_test(config)),
+        (ProbeResult.TEST_FULL, connectivity.afull_test(config)),
+    )
+    timed = await asyncio.gather(*(_timed(check) for _, check in checks))
+    return [
+        (ProbeResult.TARGET_IZIPAY, config.pk, test_type, result, latency_ms)
+        for (test_type, _), (result, latency_ms) in zip(checks, timed)
+    ]
+
+
+async def probe_shopify(config):
+    (success, message), latency_ms = await _timed(config.atest_connection())
+    result = {'success': success, 'message': message}
+    return [(ProbeResult.TARGET_SHOPIFY, config.pk, ProbeResult.TEST_SIMPLE, result, latency_ms)]
+
+
+async def _probe_all(jobs, concurrency):
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def bounded(probe, config):
+        async with semaphore:
+            return await probe(config)
+
+    try:
+        return await asyncio.gather(*(bounded(probe, config) for probe, config in jobs))
+    finally:
+        await async_http.close_client()
+
+
+def run_once(concurrency=4):
+    """Probe every configuration once; slow upstreams do not delay the others."""
+    jobs = [(probe_izipay, config) for config in IzipayConfig.objects.defer('public_key')]
+    jobs += [(probe_shopify, config) for config in ShopifyConfig.objects.all()]
+    for results in asyncio.run(_probe_all(jobs, concurrency)):
+        for target, config_id, test_type, result, latency_ms in results:
+            record(target, config_id, test_type, result, latency_ms)
+    return len(jobs)
+
+
+def _serve(probe):
+    if probe is None:
+        return None
+    return dict(probe.result, latency_ms=round(probe.latency_ms, 1), timestamp=probe.checked_at)
+
+
+def cached_result(target, config_id, test_type=ProbeResult.TEST_SIMPLE):
+    """Latest stored result with its latency and probe time, or None if never probed."""
+    return _serve(ProbeResult.objects.filter(target=target, config_id=config_id, test_type=test_type).first())
+
+
+async def acached_result(target, config_id, test_type=ProbeResult.TEST_SIMPLE):
+    return _serve(await ProbeResult.objects.filter(target=target, config_id=config_id, test_type=test_type).afirst())
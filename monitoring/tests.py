@@ -0,0 +1,276 @@
+import io
+import json
+import os
+import runpy
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db.utils import ConnectionHandler
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from izipay import connectivity, payments
+from izipay.models import IzipayConfig
+from shop_izi import breaker, http, metrics, profiling
+from shop_izi.benchmarks import stub_server
+from shop_izi.mock_upstreams import FaultProfile, mock_upstreams, parse_latency, upstream_settings
+from shopify.models import ShopifyConfig, ShopifyOrder
+from shopify.sync import OrderSyncEngine
+
+from . import probes
+from .models import ProbeResult, SlowRequest
+
+
+def izipay_config():
+    return IzipayConfig.objects.create(
+        merchant_code='4001834', api_key='api-key', hash_key='hash-key', public_key='public-key', is_active=True,
+    )
+
+
+class ProbeTests(TestCase):
+    def test_run_once_stores_latest_result_and_histogram(self):
+        config = izipay_config()
+        shop = ShopifyConfig.objects.create(shop_name='probe.myshopify.com', access_token='token')
+        simple = {'success': True, 'message': 'ok'}
+        full = {'success': False, 'message': 'No se pudo conectar con Izipay', 'error': 'timeout'}
+        with mock.patch.object(connectivity, 'asimple_test', return_value=simple), \
+                mock.patch.object(connectivity, 'afull_test', return_value=full), \
+                mock.patch.object(ShopifyConfig, 'atest_connection', return_value=(True, 'Connected')):
+            self.assertEqual(probes.run_once(), 2)
+            probes.run_once()
+
+        probe = ProbeResult.objects.get(target='izipay', config_id=config.pk, test_type='full')
+        self.assertFalse(probe.success)
+        self.assertEqual(probe.result, full)
+        self.assertEqual((probe.probe_count, probe.failure_count), (2, 2))
+        self.assertEqual(len(probe.latency_buckets), len(probes.LATENCY_BUCKETS_MS) + 1)
+        self.assertEqual(sum(probe.latency_buckets), 2)
+        self.assertTrue(ProbeResult.objects.get(target='shopify', config_id=shop.pk).success)
+
+    def test_bucket_index(self):
+        self.assertEqual(probes.bucket_index(10), 0)
+        self.assertEqual(probes.bucket_index(50), 0)
+        self.assertEqual(probes.bucket_index(51), 1)
+        self.assertEqual(probes.bucket_index(60000), len(probes.LATENCY_BUCKETS_MS))
+
+    def test_test_connectivity_serves_cached_result_without_calling_upstream(self):
+        config = izipay_config()
+        url = reverse('izipay:izipayconfig-test-connectivity')
+        with mock.patch.object(connectivity, 'full_test') as full_test:
+            self.assertEqual(self.client.post(url, {'test_type': 'full'}).status_code, 503)
+            probes.record('izipay', config.pk, 'full', {'success': True, 'message': 'Respuesta recibida'}, 120.0)
+            for _ in range(3):
+                response = self.client.post(url, {'test_type': 'full'})
+        full_test.assert_not_called()
+        body = response.json()
+        self.assertTrue(body['success'])
+        self.assertEqual(body['test_type'], 'full')
+        self.assertEqual(body['latency_ms'], 120.0)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_request_latency_queries_and_cache_per_drf_action(self):
+        izipay_config()
+        self.client.get(reverse('izipay:izipayconfig-active-config'))
+        self.client.get(reverse('izipay:izipayconfig-active-config'))
+        body = self.scrape()
+        labels = 'view="IzipayConfigViewSet.active_config",method="GET",status="200"'
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}', body)
+        self.assertIn('http_request_db_queries_count{view="IzipayConfigViewSet.active_config"}', body)
+        self.assertIn('cache_requests_total{cache="izipay:active_config",result="hit"}', body)
+        self.assertNotIn('view="metrics"', body)
+
+    def test_upstream_calls_are_labelled_by_host_and_normalized_endpoint(self):
+        with stub_server() as base_url:
+            http.get(f'{base_url}/admin/api/2024-04/orders/4501.json')
+        host = base_url.split('//')[1]
+        self.assertIn(
+            f'upstream_request_duration_seconds_count{{host="{host}",endpoint="/admin/api/2024-04/orders/:id.json",'
+            'method="GET",status="200"} 1',
+            self.scrape(),
+        )
+
+    def test_metrics_dir_sums_every_worker(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            other_worker = {'cache_requests_total': [[['tests', 'hit'], 5]]}
+            (Path(directory) / '99999-abcdef12.json').write_text(json.dumps(other_worker))
+            metrics.observe_cache('tests', hit=True)
+            metrics.observe_cache('tests', hit=True)
+            self.assertIn('cache_requests_total{cache="tests",result="hit"} 7', self.scrape())
+            self.assertTrue(any(path.name.startswith(f'{metrics.registry.pid}-') for path in Path(directory).iterdir()))
+
+
+    def test_idle_worker_flushes_without_new_updates(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory), \
+                mock.patch.object(metrics, 'FLUSH_INTERVAL', 0.2):
+            # La segunda lectura llega dentro del intervalo y el worker queda ocioso
+            metrics.observe_cache('idle', hit=False)
+            metrics.observe_cache('idle', hit=False)
+            path = Path(directory) / metrics.registry.file_name
+            expected = [['idle', 'miss'], 2]
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                if path.exists() and expected in json.loads(path.read_text()).get('cache_requests_total', []):
+                    break
+                time.sleep(0.02)
+            self.assertIn(expected, json.loads(path.read_text())['cache_requests_total'])
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PROFILING={'SAMPLE_RATE': 1.0, 'SLOW_THRESHOLD_MS': 0})
+    def test_sampled_slow_request_is_stored_with_sql_and_profile(self):
+        izipay_config()
+        url = reverse('izipay:izipayconfig-active-config')
+        self.client.get(url)
+        slow = SlowRequest.objects.get()
+        self.assertEqual(slow.view, 'IzipayConfigViewSet.active_config')
+        self.assertEqual(slow.status_code, 200)
+        self.assertGreater(slow.query_count, 0)
+        self.assertEqual(len(slow.queries), slow.query_count)
+        self.assertIn('cumulative', slow.profile)
+
+    @override_settings(PROFILING={'HEADER_TOKEN': 'secret', 'SLOW_THRESHOLD_MS': 0})
+    def test_header_opt_in_requires_token(self):
+        url = reverse('upstream_health')
+        self.client.get(url)
+        self.client.get(url, headers={'X-Profile': 'wrong'})
+        self.assertFalse(SlowRequest.objects.exists())
+        self.client.get(url, headers={'X-Profile': 'secret'})
+        self.assertEqual(SlowRequest.objects.get().view, 'upstream_health')
+
+    @override_settings(PROFILING={'SAMPLE_RATE': 0, 'HEADER_TOKEN': ''})
+    def test_disabled_middleware_is_dropped(self):
+        from shop_izi.middleware import ProfilingMiddleware
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(lambda request: None)
+
+    def test_profile_captures_upstream_calls_and_duplicate_queries(self):
+        with stub_server() as base_url, profiling.RequestProfile(use_cprofile=False) as profile:
+            http.get(f'{base_url}/admin/api/2024-04/shop.json?fields=name')
+        self.assertEqual(profile.upstream[0]['url'], f'{base_url}/admin/api/2024-04/shop.json')
+        self.assertEqual(profile.upstream[0]['status'], '200')
+
+        profile.queries = [('SELECT 1', 1.0), ('SELECT 2', 5.0), ('SELECT 1', 2.0)]
+        self.assertEqual(profile.duplicate_queries(), [{'sql': 'SELECT 1', 'count': 2}])
+        self.assertEqual(profile.slowest_queries(1), [{'sql': 'SELECT 2', 'ms': 5.0}])
+
+
+class MockUpstreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        breaker.reset_breakers()
+
+    def tearDown(self):
+        breaker.reset_breakers()
+
+    @override_settings(UPSTREAMS={'IZIPAY_SANDBOX_URL': 'http://izipay.test/', 'SHOPIFY_URL': 'http://shopify.test/{shop}'})
+    def test_upstream_urls_come_from_settings(self):
+        config = izipay_config()
+        self.assertEqual(config.script_url, 'http://izipay.test/payments/v1/js/index.js')
+        self.assertEqual(config.get_api_url('Charge/CreatePayment'), 'http://izipay.test/api-payment/V4/Charge/CreatePayment')
+        shop = ShopifyConfig(shop_name='demo.myshopify.com')
+        self.assertEqual(shop.get_api_url('shop.json'), 'http://shopify.test/demo.myshopify.com/admin/api/2024-04/shop.json')
+
+    def test_app_talks_to_mock_upstreams(self):
+        with mock_upstreams(orders=120) as base_url, override_settings(UPSTREAMS=upstream_settings(base_url)):
+            config = izipay_config()
+            self.assertTrue(connectivity.simple_test(config)['success'])
+            result = payments.create_payment(config, {'id': '1001', 'total_price': '10.00', 'currency': 'PEN'})
+            self.assertTrue(result['success'])
+            self.assertTrue(result['form_token'])
+
+            shop = ShopifyConfig.objects.create(shop_name='mock.myshopify.com', access_token='token')
+            self.assertTrue(shop.test_connection()[0])
+            engine = OrderSyncEngine(shop, batch_size=50)
+            self.assertEqual(engine.run_rest(), 120)
+            self.assertEqual(OrderSyncEngine(shop, poll_interval=0).run_bulk(), 120)
+        self.assertEqual(ShopifyOrder.objects.filter(config=shop).count(), 120)
+
+    def test_fault_injection(self):
+        order = {'id': '1001', 'total_price': '10.00', 'currency': 'PEN'}
+        for faults, status in ((FaultProfile(error_rate=1), 503), (FaultProfile(throttle_rate=1), 429)):
+            with mock_upstreams(faults) as base_url, override_settings(UPSTREAMS=upstream_settings(base_url)):
+                result = payments.create_payment(izipay_config(), order)
+            self.assertEqual(result['response_status'], status)
+
+        faults = FaultProfile(drip_rate=1, drip_interval=0.05, drip_chunk=4)
+        with mock_upstreams(faults) as base_url:
+            with self.assertRaises(http.requests.exceptions.ConnectionError):
+                http.get(f'{base_url}/payments/v1/js/index.js', timeout=http.timeouts(read=0.02))
+            self.assertEqual(http.get(f'{base_url}/payments/v1/js/index.js').status_code, 200)
+
+    def test_parse_latency(self):
+        self.assertEqual(parse_latency('fixed:0.25')(), 0.25)
+        self.assertTrue(0.01 <= parse_latency('uniform:0.01,0.02')() <= 0.02)
+        self.assertGreaterEqual(parse_latency('normal:0,1')(), 0)
+        for spec in ('fixed', 'uniform:1', 'pareto:1', 'exp:x'):
+            with self.assertRaises(ValueError):
+                parse_latency(spec)
+
+
+def database_settings(**environ):
+    """DATABASES de shop_izi.settings evaluado con estas variables de entorno"""
+    with mock.patch.dict(os.environ, environ):
+        for name in set(('DB_ENGINE', 'DB_POOL', 'SQLITE_TUNING')) - set(environ):
+            os.environ.pop(name, None)
+        return runpy.run_path(str(Path(settings.BASE_DIR) / 'shop_izi' / 'settings.py'))['DATABASES']['default']
+
+
+class DatabaseSettingsTests(TestCase):
+    def test_sqlite_connections_use_wal_and_immediate_transactions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = database_settings(SQLITE_PATH=str(Path(directory) / 'db.sqlite3'))
+            self.assertEqual(settings_dict['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+            self.assertNotIn('busy_timeout', settings_dict['OPTIONS']['init_command'])
+            handler = ConnectionHandler({'default': settings_dict})
+            try:
+                with handler['default'].cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA busy_timeout')
+                    self.assertEqual(cursor.fetchone()[0], 20000)
+            finally:
+                handler.close_all()
+
+    def test_sqlite_tuning_can_be_disabled(self):
+        self.assertNotIn('OPTIONS', database_settings(SQLITE_TUNING='0'))
+
+    def test_postgres_pool_replaces_persistent_connections(self):
+        settings_dict = database_settings(DB_ENGINE='postgres', DB_POOL='1')
+        self.assertEqual(settings_dict['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(settings_dict['CONN_MAX_AGE'], 0)
+        self.assertIn('pool', settings_dict['OPTIONS'])
+        self.assertEqual(database_settings(DB_ENGINE='postgres')['OPTIONS'], {})
+
+
+class BenchmarkEndpointsTests(TransactionTestCase):
+    def test_smoke(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'endpoints.json'
+            call_command(
+                'benchmark_endpoints', requests=2, concurrency=1, modes='wsgi,asgi', upstream_delay=0,
+                output=str(output), stdout=io.StringIO(),
+            )
+            report = json.loads(output.read_text())
+        self.assertEqual(set(report['results']), {'wsgi', 'asgi'})
+        for mode, endpoints in report['results'].items():
+            for name, summary in endpoints.items():
+                with self.subTest(mode=mode, endpoint=name):
+                    self.assertEqual(sum(summary['statuses'].values()), 2)
+                    self.assertEqual(summary['errors'], 0, summary['statuses'])
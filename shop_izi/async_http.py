@@ -0,0 +1,89 @@
+"""
+Cliente HTTP asíncrono (httpx) para las pruebas de conectividad de
+monitoring.probes.
+
+Equivalente asíncrono de shop_izi.http: un único AsyncClient por event loop
+con pool de conexiones keep-alive compartido entre orígenes, de modo que una
+ronda de sondeos puede mantener cientos de esperas a Izipay/Shopify sin ocupar
+un hilo por cada una. Usa los mismos timeouts que settings.HTTP_CLIENT y los
+mismos circuit breakers que el cliente síncrono.
+"""
+import asyncio
+import time
+import weakref
+
+import httpx
+
+from . import breaker
+from .http import get_origin, get_setting, is_upstream_failure, observe
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def timeouts(connect=None, read=None):
+    return httpx.Timeout(
+        read if read is not None else get_setting('READ_TIMEOUT'),
+        connect=connect if connect is not None else get_setting('CONNECT_TIMEOUT'),
+    )
+
+
+def get_client():
+    """
+    AsyncClient del event loop actual; un cliente no puede usarse desde otro
+    loop (p. ej. cuando Django ejecuta una vista async bajo WSGI)
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        max_connections = get_setting('ASYNC_MAX_CONNECTIONS')
+        client = _clients[loop] = httpx.AsyncClient(
+            timeout=timeouts(),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            # httpx solo reintenta fallos de conexión, nunca peticiones enviadas
+            transport=httpx.AsyncHTTPTransport(retries=get_setting('MAX_RETRIES')),
+        )
+    return client
+
+
+async def close_client():
+    """Cierra el AsyncClient del loop actual (p. ej. antes de que asyncio.run cierre el loop)"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def request(method, url, timeout=None, **kwargs):
+    circuit = breaker.get_breaker(get_origin(url))
+    try:
+        circuit.before_call()
+    except breaker.CircuitOpenError as e:
+        observe(method, url, 'circuit_open', 0.0)
+        raise httpx.ConnectError(str(e))
+    start = time.perf_counter()
+    try:
+        response = await get_client().request(method, url, timeout=timeout or timeouts(), **kwargs)
+    except httpx.HTTPError as e:
+        observe(method, url, 'error', time.perf_counter() - start)
+        circuit.record_failure(e)
+        raise
+    except BaseException:
+        # Incluye asyncio.CancelledError (p. ej. timeout de asyncio.wait_for)
+        circuit.release_probe()
+        raise
+    observe(method, url, response.status_code, time.perf_counter() - start)
+    if is_upstream_failure(response):
+        circuit.record_failure(f'HTTP {response.status_code}')
+    else:
+        circuit.record_success()
+    return response
+
+
+async def get(url, **kwargs):
+    return await request('GET', url, **kwargs)
+
+
+async def post(url, **kwargs):
+    return await request('POST', url, **kwargs)
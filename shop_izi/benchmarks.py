@@ -0,0 +1,84 @@
+"""
+Utilidades compartidas por los comandos benchmark_* de las apps
+"""
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano de una lista de valores"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    """Resumen de latencias (en segundos) y throughput de una corrida"""
+    return {
+        'requests': len(latencies),
+        'elapsed_s': round(elapsed, 4),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # El backlog por defecto (5) descarta conexiones simultáneas
+    request_queue_size = 1024
+
+
+@contextmanager
+def stub_server(delay=0.0, body=b'{"shop": {"name": "Stub"}}', status=200, calls=None):
+    """
+    Servidor HTTP local que responde a cualquier GET/POST tras `delay` segundos.
+    Retorna la URL base (http://127.0.0.1:<puerto>). Si se pasa la lista
+    `calls`, agrega el método de cada petición recibida.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _respond(self):
+            if calls is not None:
+                calls.append(self.command)
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                self.rfile.read(length)
+            if delay:
+                time.sleep(delay)
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = _respond
+
+        def log_message(self, *args):
+            pass
+
+    server = _StubHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,148 @@
+"""
+Circuit breaker por upstream (origen) para el cliente HTTP saliente.
+
+Tras FAILURE_THRESHOLD fallos seguidos, o una tasa de error mayor a ERROR_RATE
+en las últimas WINDOW llamadas (con al menos MIN_CALLS), el circuito se abre y
+las llamadas fallan de inmediato con CircuitOpenError en vez de esperar el
+timeout completo. Pasados RESET_TIMEOUT segundos se deja pasar una única
+llamada de prueba (half-open): si responde, el circuito se cierra.
+
+El estado vive en cada proceso; cada cambio se publica en el backend de caché
+para que el endpoint de salud lo sirva sin llamar al upstream.
+Configurable desde settings.CIRCUIT_BREAKER.
+"""
+import threading
+import time
+from collections import deque
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULTS = {
+    'FAILURE_THRESHOLD': 5,
+    'ERROR_RATE': 0.5,
+    'WINDOW': 20,
+    'MIN_CALLS': 10,
+    'RESET_TIMEOUT': 30,
+}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+HEALTH_KEY = 'upstream_health'
+
+_breakers = {}
+_lock = threading.Lock()
+
+
+def get_setting(name):
+    return getattr(settings, 'CIRCUIT_BREAKER', {}).get(name, DEFAULTS[name])
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """El upstream está marcado como caído; no se intentó la conexión"""
+
+
+class CircuitBreaker:
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.results = deque(maxlen=get_setting('WINDOW'))
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.last_error = ''
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Lanza CircuitOpenError si la llamada no debe intentarse"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self.opened_at >= get_setting('RESET_TIMEOUT'):
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return
+        raise CircuitOpenError(f'Circuito abierto para {self.name}: {self.last_error}')
+
+    def record_success(self):
+        with self._lock:
+            self.results.append(True)
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+            if self.state != CLOSED:
+                self.results.clear()
+                self._set_state(CLOSED)
+
+    def record_failure(self, error):
+        with self._lock:
+            self.results.append(False)
+            self.consecutive_failures += 1
+            self.probe_in_flight = False
+            self.last_error = str(error)[:200]
+            if self.state == HALF_OPEN or self._should_open():
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def release_probe(self):
+        """
+        Libera la llamada de prueba sin registrar resultado: la llamada terminó
+        por algo que no es culpa del upstream (cancelación, error de programación)
+        y la siguiente podrá volver a probar
+        """
+        with self._lock:
+            self.probe_in_flight = False
+
+    def _should_open(self):
+        if self.state != CLOSED:
+            return False
+        if self.consecutive_failures >= get_setting('FAILURE_THRESHOLD'):
+            return True
+        calls = len(self.results)
+        if calls < get_setting('MIN_CALLS'):
+            return False
+        return self.results.count(False) / calls > get_setting('ERROR_RATE')
+
+    def _set_state(self, state):
+        self.state = state
+        publish_health(self.name, {
+            'state': state,
+            'available': state != OPEN,
+            'last_error': self.last_error if state != CLOSED else '',
+            'updated_at': time.time(),
+        })
+
+
+def get_breaker(name):
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def reset_breakers():
+    with _lock:
+        _breakers.clear()
+    cache.delete(HEALTH_KEY)
+
+
+def publish_health(name, status):
+    # Lectura-modificación-escritura sin bloqueo: ante una carrera, el
+    # siguiente cambio de estado vuelve a publicar
+    health = cache.get(HEALTH_KEY) or {}
+    health[name] = status
+    cache.set(HEALTH_KEY, health, timeout=None)
+
+
+def get_health(name=None):
+    """Salud publicada de todos los upstreams, o de uno (disponible si nunca falló)"""
+    health = cache.get(HEALTH_KEY) or {}
+    if name is None:
+        return health
+    return health.get(name, {'state': CLOSED, 'available': True, 'last_error': '', 'updated_at': None})
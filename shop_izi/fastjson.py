@@ -0,0 +1,73 @@
+"""
+JSON rápido para la API y los payloads de Izipay/Shopify.
+
+Usa orjson si está instalado y, si no, la librería estándar; el resto del
+código solo llama a dumps/loads de este módulo. dumps siempre retorna bytes
+compactos en UTF-8.
+
+Los tipos que orjson no conoce (Decimal, lazy strings, ...) y los datetime
+pasan por el encoder de DRF, para que la API responda igual con cualquiera
+de los dos motores.
+"""
+import json
+
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+_drf_encoder = JSONEncoder()
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(data, indent=False):
+        options = _OPTIONS | orjson.OPT_INDENT_2 if indent else _OPTIONS
+        try:
+            return orjson.dumps(data, default=_drf_encoder.default, option=options)
+        except orjson.JSONEncodeError:
+            # p. ej. enteros de más de 64 bits
+            return _stdlib_dumps(data, indent)
+
+    loads = orjson.loads
+else:
+    def dumps(data, indent=False):
+        return _stdlib_dumps(data, indent)
+
+    loads = json.loads
+
+
+def _stdlib_dumps(data, indent=False):
+    separators = None if indent else (',', ':')
+    return json.dumps(
+        data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False,
+        indent=2 if indent else None, separators=separators,
+    ).encode('utf-8')
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        indent = bool(self.get_indent(accepted_media_type, renderer_context))
+        ret = dumps(data, indent=indent)
+        # Igual que JSONRenderer: U+2028/U+2029 rompen el JSON incrustado en JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
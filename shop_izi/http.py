@@ -0,0 +1,160 @@
+"""
+Cliente HTTP compartido para las llamadas salientes a Izipay y Shopify.
+
+Cada origen (sandbox-checkout.izipay.pe, checkout.izipay.pe, cada tienda
+*.myshopify.com) obtiene su propia sesión de requests con un pool de
+conexiones keep-alive, de modo que el handshake TCP/TLS se paga una sola vez
+por conexión y no en cada petición. Todas las peticiones llevan timeout de
+conexión y de lectura, y los errores transitorios se reintentan con backoff.
+
+Cada origen pasa además por su circuit breaker (shop_izi.breaker).
+
+Configurable desde settings.HTTP_CLIENT (ver DEFAULTS).
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import breaker, metrics, profiling
+
+DEFAULTS = {
+    'POOL_SIZE': 10,
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.3,
+    'RETRY_STATUSES': (429, 502, 503, 504),
+    'ASYNC_MAX_CONNECTIONS': 200,
+}
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+UPSTREAM_DEFAULTS = {
+    'IZIPAY_SANDBOX_URL': 'https://sandbox-checkout.izipay.pe',
+    'IZIPAY_PRODUCTION_URL': 'https://checkout.izipay.pe',
+    'SHOPIFY_URL': 'https://{shop}',
+    'SHOPIFY_API_VERSION': '2024-04',
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'HTTP_CLIENT', {}).get(name, DEFAULTS[name])
+
+
+def upstream_setting(name):
+    return getattr(settings, 'UPSTREAMS', {}).get(name, UPSTREAM_DEFAULTS[name])
+
+
+def upstream_url(name):
+    """URL base de un upstream según settings.UPSTREAMS, sin barra final"""
+    return upstream_setting(name).rstrip('/')
+
+
+def timeouts(connect=None, read=None):
+    """Tupla (conexión, lectura) para requests, con los valores por defecto"""
+    return (
+        connect if connect is not None else get_setting('CONNECT_TIMEOUT'),
+        read if read is not None else get_setting('READ_TIMEOUT'),
+    )
+
+
+def get_origin(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+def _build_session():
+    # Las lecturas y los estados solo se reintentan en métodos idempotentes;
+    # un POST de pago solo se reintenta si la conexión nunca se estableció
+    retry = Retry(
+        total=get_setting('MAX_RETRIES'),
+        backoff_factor=get_setting('BACKOFF_FACTOR'),
+        status_forcelist=get_setting('RETRY_STATUSES'),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=get_setting('POOL_SIZE'),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(url):
+    """Sesión con pool de conexiones para el origen de la URL"""
+    origin = get_origin(url)
+    session = _sessions.get(origin)
+    if session is None:
+        with _lock:
+            session = _sessions.get(origin)
+            if session is None:
+                session = _sessions[origin] = _build_session()
+    return session
+
+
+def close_sessions():
+    """Cierra todas las sesiones (p. ej. tras cambiar HTTP_CLIENT)"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def is_upstream_failure(response):
+    return response.status_code >= 500
+
+
+def observe(method, url, status, seconds):
+    """Registra la llamada en las métricas y en el perfil de la petición en curso"""
+    metrics.observe_upstream(method, url, status, seconds)
+    profiling.record_upstream(method, url, status, seconds)
+
+
+def request(method, url, timeout=None, **kwargs):
+    """
+    Petición a través de la sesión del origen y de su circuit breaker; con el
+    circuito abierto lanza breaker.CircuitOpenError sin conectar
+    """
+    circuit = breaker.get_breaker(get_origin(url))
+    try:
+        circuit.before_call()
+    except breaker.CircuitOpenError:
+        observe(method, url, 'circuit_open', 0.0)
+        raise
+    start = time.perf_counter()
+    try:
+        response = get_session(url).request(method, url, timeout=timeout or timeouts(), **kwargs)
+    except requests.exceptions.RequestException as e:
+        observe(method, url, 'error', time.perf_counter() - start)
+        circuit.record_failure(e)
+        raise
+    except BaseException:
+        circuit.release_probe()
+        raise
+    # Con stream=True solo mide hasta las cabeceras
+    observe(method, url, response.status_code, time.perf_counter() - start)
+    if is_upstream_failure(response):
+        circuit.record_failure(f'HTTP {response.status_code}')
+    else:
+        circuit.record_success()
+    return response
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
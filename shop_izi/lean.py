@@ -0,0 +1,155 @@
+"""
+Serialización de solo lectura para los endpoints más llamados.
+
+Instanciar un serializador DRF copia sus campos (y en un ModelSerializer
+vuelve a introspeccionar el modelo) en cada petición. LeanSerializer enlaza
+los campos del serializador una sola vez y guarda, por campo, la clave a leer
+y la función que lo convierte; después serializa diccionarios (filas de
+.values() o resultados ya armados) con un bucle sobre esa lista.
+
+La salida es la misma que `serializer_class(obj).data`: campos opcionales
+ausentes se omiten, None se mantiene y el resto pasa por el to_representation
+del campo (o por str/int/float, que es exactamente lo que hacen CharField,
+IntegerField y FloatField; los datetime con zona se formatean igual que
+DateTimeField, leyendo la zona horaria actual una vez por respuesta).
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import ISO_8601
+from rest_framework import fields as drf_fields
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
+# Campos cuyo to_representation es solo la conversión de tipo
+_PLAIN_CONVERTERS = {
+    drf_fields.CharField: str,
+    drf_fields.IntegerField: int,
+    drf_fields.FloatField: float,
+}
+
+
+def _is_plain_iso_datetime(field):
+    """DateTimeField en ISO 8601 con el formato y la zona horaria por defecto"""
+    return (
+        type(field) is drf_fields.DateTimeField
+        and getattr(field, 'format', empty) is empty
+        and not hasattr(field, 'timezone')
+        and (api_settings.DATETIME_FORMAT or '').lower() == ISO_8601
+    )
+
+
+def _iso_datetime(value, field, current_timezone):
+    """
+    Igual que DateTimeField.to_representation para datetime con zona; el resto
+    (naive, str, USE_TZ=False) sigue por el campo de DRF
+    """
+    if current_timezone is None or type(value) is not datetime or value.utcoffset() is None:
+        return field.to_representation(value)
+    value = value.astimezone(current_timezone).isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+# Qué hacer si falta la clave, como Field.get_attribute
+_DEFAULT = 'default'
+_NULL = 'null'
+_SKIP = 'skip'
+_REQUIRED = 'required'
+
+
+class LeanSerializer:
+    """
+    `serializer_class` define los campos y su formato. `computed` reemplaza
+    campos que no salen de una columna (p. ej. SerializerMethodField): nombre
+    -> función que recibe la fila y retorna el valor ya representado.
+    """
+
+    def __init__(self, serializer_class, computed=None):
+        self.serializer_class = serializer_class
+        self.computed = computed or {}
+
+    @cached_property
+    def accessors(self):
+        """[(nombre, clave, conversión, si falta, campo)] en el orden del serializador"""
+        accessors = []
+        for field in self.serializer_class()._readable_fields:
+            name = field.field_name
+            if name in self.computed:
+                accessors.append((name, None, self.computed[name], None, field))
+                continue
+            if isinstance(field, drf_fields.SerializerMethodField) or len(field.source_attrs) != 1:
+                raise ImproperlyConfigured(
+                    f'{self.serializer_class.__name__}.{name} no se lee de una clave: declararlo en computed'
+                )
+            if field.default is not empty:
+                missing = _DEFAULT
+            elif field.allow_null:
+                missing = _NULL
+            elif not field.required:
+                missing = _SKIP
+            else:
+                missing = _REQUIRED
+            if _is_plain_iso_datetime(field):
+                # Sin conversión: _iso_datetime con la zona horaria leída una vez por llamada
+                convert = None
+            else:
+                convert = _PLAIN_CONVERTERS.get(type(field), field.to_representation)
+            accessors.append((name, field.source_attrs[0], convert, missing, field))
+        return accessors
+
+    @cached_property
+    def columns(self):
+        """Columnas a pedir con .values() (sin los campos calculados)"""
+        return [key for _, key, _, _, _ in self.accessors if key is not None]
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def to_representation(self, row):
+        return self._render(row, self._current_timezone())
+
+    def many(self, rows):
+        current_timezone = self._current_timezone()
+        return [self._render(row, current_timezone) for row in rows]
+
+    @cached_property
+    def _has_datetimes(self):
+        return any(key is not None and convert is None for _, key, convert, _, _ in self.accessors)
+
+    def _current_timezone(self):
+        # get_current_timezone() lee un asgiref.Local: una vez por respuesta, no por valor
+        if not self._has_datetimes or not settings.USE_TZ:
+            return None
+        return timezone.get_current_timezone()
+
+    def _render(self, row, current_timezone):
+        data = {}
+        for name, key, convert, missing, field in self.accessors:
+            if key is None:
+                data[name] = convert(row)
+                continue
+            try:
+                value = row[key]
+            except KeyError:
+                if missing == _SKIP:
+                    continue
+                if missing == _DEFAULT:
+                    value = field.get_default()
+                elif missing == _NULL:
+                    value = None
+                else:
+                    raise KeyError(f'{self.serializer_class.__name__}.{name}: falta la clave {key!r}')
+            if value is None:
+                data[name] = None
+            elif convert is None:
+                data[name] = _iso_datetime(value, field, current_timezone)
+            else:
+                data[name] = convert(value)
+        return data
+
+    def from_instance(self, instance):
+        """Igual que to_representation, para una instancia de modelo ya cargada"""
+        return self.to_representation({column: getattr(instance, column) for column in self.columns})
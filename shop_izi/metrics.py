@@ -0,0 +1,238 @@
+"""
+Métricas en formato de texto de Prometheus, sin dependencias externas.
+
+Cada proceso acumula sus contadores e histogramas en memoria. Con
+settings.METRICS_DIR definido (un directorio vacío al arrancar, compartido por
+los workers de gunicorn), un hilo de fondo de cada proceso vuelca su estado a
+su propio archivo cada FLUSH_INTERVAL segundos si hubo cambios, también cuando
+el worker queda ocioso, y /metrics suma los archivos de todos los procesos.
+Sin METRICS_DIR solo se informa el proceso que atiende /metrics.
+
+Los procesos hijos creados con fork empiezan de cero, con archivo y hilo propios.
+"""
+import atexit
+import bisect
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+FLUSH_INTERVAL = 1.0
+
+# Ids numéricos y UUIDs de la ruta: el endpoint no debe crear una serie por recurso
+_ID_SEGMENT = re.compile(r'/(\d+|[0-9a-f]{8}-[0-9a-f-]{27,})(?=/|\.|$)', re.IGNORECASE)
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+
+class Metric:
+    def __init__(self, kind, name, documentation, labels, buckets=None):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets or ())
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[label]) for label in self.labels)
+
+
+class Counter(Metric):
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(COUNTER, name, documentation, labels)
+
+    def inc(self, amount=1, **labels):
+        registry.update(self, self._key(labels), lambda value: (value or 0) + amount)
+
+
+class Histogram(Metric):
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(HISTOGRAM, name, documentation, labels, buckets)
+
+    def observe(self, value, **labels):
+        index = bisect.bisect_left(self.buckets, value)
+
+        def add(state):
+            # Un contador por bucket más el de +Inf, y la suma al final
+            state = state or [0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+            return state
+
+        registry.update(self, self._key(labels), add)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.values = {}
+        self.file_name = f'{self.pid}-{uuid.uuid4().hex[:8]}.json'
+        self.dirty = False
+        self.flusher = None
+
+    def _after_fork(self):
+        # El lock pudo quedar tomado por un hilo que no existe en el hijo
+        self._lock = threading.Lock()
+        self._reset()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def update(self, metric, key, apply):
+        with self._lock:
+            if self.pid != os.getpid():
+                self._reset()
+            values = self.values.setdefault(metric.name, {})
+            values[key] = apply(values.get(key))
+            self.dirty = True
+            if self.flusher is None and get_metrics_dir():
+                self.flusher = threading.Thread(target=self._flush_periodically, name='metrics-flush', daemon=True)
+                self.flusher.start()
+
+    def _flush_periodically(self):
+        pid = os.getpid()
+        while self.pid == pid:
+            time.sleep(FLUSH_INTERVAL)
+            with self._lock:
+                if not self.dirty or self.pid != pid:
+                    continue
+                try:
+                    self._flush()
+                except OSError:
+                    # Se reintenta en la siguiente vuelta (p. ej. directorio aún no creado)
+                    pass
+
+    def snapshot(self):
+        return {
+            name: [[list(key), value] for key, value in values.items()]
+            for name, values in self.values.items()
+        }
+
+    def flush(self):
+        with self._lock:
+            if self.pid == os.getpid():
+                self._flush()
+
+    def _flush(self):
+        directory = get_metrics_dir()
+        if not directory:
+            return
+        path = Path(directory) / self.file_name
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(self.snapshot()))
+        os.replace(temporary, path)
+        self.dirty = False
+
+    def collect(self):
+        """Valores de todos los procesos: {nombre: {etiquetas: valor}}"""
+        directory = get_metrics_dir()
+        if not directory:
+            with self._lock:
+                return {name: dict(values) for name, values in self.values.items()}
+        self.flush()
+        merged = {}
+        for path in Path(directory).glob('*.json'):
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            for name, items in snapshot.items():
+                values = merged.setdefault(name, {})
+                for key, value in items:
+                    values[tuple(key)] = _merge(values.get(tuple(key)), value)
+        return merged
+
+
+def _merge(current, value):
+    if current is None:
+        return value
+    if isinstance(value, list):
+        return [a + b for a, b in zip(current, value)]
+    return current + value
+
+
+def get_metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format(number):
+    return repr(float(number)) if isinstance(number, float) else str(number)
+
+
+def render():
+    """Todas las métricas en el formato de texto de Prometheus"""
+    collected = registry.collect()
+    lines = []
+    for name, metric in sorted(registry.metrics.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(collected.get(name, {}).items()):
+            if metric.kind == COUNTER:
+                lines.append(f'{name}{_labels(metric.labels, key)} {_format(value)}')
+                continue
+            cumulative = 0
+            bounds = [_format(float(bound)) for bound in metric.buckets] + ['+Inf']
+            for bound, count in zip(bounds, value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(metric.labels, key, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(metric.labels, key)} {_format(value[-1])}')
+            lines.append(f'{name}_count{_labels(metric.labels, key)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+atexit.register(registry.flush)
+os.register_at_fork(after_in_child=registry._after_fork)
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Duración de las peticiones por vista o acción DRF',
+    ['view', 'method', 'status'],
+)
+request_queries = Histogram(
+    'http_request_db_queries', 'Consultas SQL por petición',
+    ['view'], buckets=QUERY_BUCKETS,
+)
+upstream_duration = Histogram(
+    'upstream_request_duration_seconds', 'Duración de las llamadas a Izipay/Shopify por host y endpoint',
+    ['host', 'endpoint', 'method', 'status'],
+)
+cache_requests = Counter(
+    'cache_requests_total', 'Lecturas de cachés de la aplicación por resultado (hit/miss)',
+    ['cache', 'result'],
+)
+
+
+def observe_upstream(method, url, status, seconds):
+    parts = urlsplit(url)
+    endpoint = _ID_SEGMENT.sub('/:id', parts.path) or '/'
+    upstream_duration.observe(seconds, host=parts.netloc, endpoint=endpoint, method=method.upper(), status=status)
+
+
+def observe_cache(name, hit):
+    cache_requests.inc(cache=name, result='hit' if hit else 'miss')
@@ -0,0 +1,120 @@
+"""
+Middlewares de observabilidad:
+
+* MetricsMiddleware: duración de cada petición por vista (o acción DRF) y
+  número de consultas SQL que ejecutó. Ver shop_izi.metrics.
+* ProfilingMiddleware: perfila una fracción de las peticiones (o las que
+  traen el header X-Profile con el token configurado) y guarda las lentas
+  en monitoring.SlowRequest. Ver shop_izi.profiling.
+"""
+import hmac
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metrics, profiling
+
+
+def view_label(request):
+    """'IzipayConfigViewSet.active_config' para acciones DRF, el nombre de la URL en el resto"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    view_class = getattr(match.func, 'cls', None)
+    actions = getattr(match.func, 'actions', None)
+    if view_class is not None and actions:
+        return f'{view_class.__name__}.{actions.get(request.method.lower(), request.method.lower())}'
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count):
+            response = self.get_response(request)
+        self._observe(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        # Las consultas de las vistas async corren en otro hilo y no se cuentan
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, time.perf_counter() - start)
+        return response
+
+    def _observe(self, request, response, seconds, queries=None):
+        view = view_label(request)
+        if view == 'metrics':
+            return
+        metrics.request_duration.observe(seconds, view=view, method=request.method, status=response.status_code)
+        if queries is not None:
+            metrics.request_queries.observe(queries, view=view)
+
+
+class ProfilingMiddleware:
+    """
+    Sin muestreo ni token configurados (settings.PROFILING) Django descarta
+    el middleware al arrancar, así que no añade coste alguno
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = profiling.get_setting('SAMPLE_RATE')
+        self.token = profiling.get_setting('HEADER_TOKEN')
+        if not self.sample_rate and not self.token:
+            raise MiddlewareNotUsed
+
+    def should_profile(self, request):
+        header = request.headers.get(profiling.HEADER)
+        if self.token and header:
+            return hmac.compare_digest(header, self.token)
+        return random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        profile = profiling.RequestProfile(use_cprofile=profiling.get_setting('CPROFILE'))
+        with connection.execute_wrapper(profile.record_query), profile:
+            response = self.get_response(request)
+        if profile.duration_ms >= profiling.get_setting('SLOW_THRESHOLD_MS'):
+            self.store(request, response, profile)
+        return response
+
+    def store(self, request, response, profile):
+        from monitoring.models import SlowRequest
+
+        # Fuera del perfil: la consulta del INSERT no debe contarse
+        SlowRequest.objects.create(
+            method=request.method,
+            path=request.path[:255],
+            view=view_label(request)[:255],
+            status_code=response.status_code,
+            duration_ms=profile.duration_ms,
+            query_count=len(profile.queries),
+            query_ms=sum(ms for _, ms in profile.queries),
+            upstream_ms=sum(call['ms'] for call in profile.upstream),
+            queries=profile.slowest_queries(profiling.get_setting('MAX_QUERIES')),
+            duplicate_queries=profile.duplicate_queries(),
+            upstream_calls=profile.upstream,
+            profile=profile.profile_text(profiling.get_setting('MAX_PROFILE_LINES')),
+        )
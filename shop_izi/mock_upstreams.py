@@ -0,0 +1,257 @@
+"""
+Servidor simulado de Izipay y Shopify para pruebas de carga sin red.
+
+Implementa los endpoints que llama la aplicación:
+
+* Izipay: script del formulario (/payments/v1/js/index.js) y la API REST V4
+  (/api-payment/V4/Charge/CreatePayment y cualquier otro endpoint V4).
+* Shopify, bajo /<tienda>/admin/api/<versión>/: shop.json, orders.json con
+  paginación por Link y graphql.json (orderMarkAsPaid y operaciones bulk, con
+  el resultado JSONL servido en /bulk/orders.jsonl).
+
+Cada respuesta pasa por un perfil de fallos: latencia con distribución
+configurable, errores 5xx, throttling (429 en REST, THROTTLED en GraphQL) y
+respuestas lentas que envían el cuerpo a cuentagotas.
+
+Para usarlo, settings.UPSTREAMS debe apuntar al servidor:
+IZIPAY_SANDBOX_URL=http://127.0.0.1:8099 y SHOPIFY_URL=http://127.0.0.1:8099/{shop}.
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+from .benchmarks import _StubHTTPServer
+
+OK = 'ok'
+ERROR = 'error'
+THROTTLE = 'throttle'
+DRIP = 'drip'
+
+_SHOPIFY_PATH = re.compile(r'^/(?P<shop>[^/]+)/admin/api/(?P<version>[^/]+)/(?P<endpoint>.+)$')
+
+FORM_SCRIPT = b'/* Izipay simulado */ window.KR = window.KR || {};\n'
+
+
+def parse_latency(spec):
+    """
+    Distribución de latencia en segundos a partir de una especificación:
+    'fixed:0.05', 'uniform:0.01,0.2', 'normal:media,desviación',
+    'lognormal:mediana,sigma' o 'exp:media'. Retorna una función sin argumentos.
+    """
+    kind, _, args = (spec or 'fixed:0').partition(':')
+    try:
+        values = [float(value) for value in args.split(',') if value]
+    except ValueError:
+        raise ValueError(f'Latencia inválida: {spec!r}')
+    distributions = {
+        'fixed': (1, lambda delay: delay),
+        'uniform': (2, random.uniform),
+        'normal': (2, random.gauss),
+        'lognormal': (2, lambda median, sigma: median * random.lognormvariate(0, sigma)),
+        'exp': (1, lambda mean: random.expovariate(1 / mean) if mean else 0.0),
+    }
+    if kind not in distributions or len(values) != distributions[kind][0]:
+        raise ValueError(f'Latencia inválida: {spec!r}')
+    sample = distributions[kind][1]
+    return lambda: max(0.0, sample(*values))
+
+
+@dataclass
+class FaultProfile:
+    latency: str = 'fixed:0'
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    drip_rate: float = 0.0
+    drip_interval: float = 0.5
+    drip_chunk: int = 16
+    sample_latency: object = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.sample_latency = parse_latency(self.latency)
+
+    def decide(self):
+        """Resultado de una petición: ERROR, THROTTLE, DRIP u OK"""
+        roll = random.random()
+        for outcome, rate in ((ERROR, self.error_rate), (THROTTLE, self.throttle_rate), (DRIP, self.drip_rate)):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return OK
+
+
+def _order_node(number):
+    order_id = 100000 + number
+    return {
+        'id': f'gid://shopify/Order/{order_id}',
+        'legacyResourceId': str(order_id),
+        'name': f'#{order_id}',
+        'email': f'cliente{number}@example.com',
+        'displayFinancialStatus': 'PAID',
+        'createdAt': '2026-01-01T00:00:00Z',
+        'updatedAt': '2026-01-01T00:00:00Z',
+        'totalPriceSet': {'shopMoney': {'amount': '10.00', 'currencyCode': 'PEN'}},
+        'transactions': [],
+    }
+
+
+def _order_rest(number):
+    order_id = 100000 + number
+    return {
+        'id': order_id, 'name': f'#{order_id}', 'email': f'cliente{number}@example.com',
+        'financial_status': 'paid', 'total_price': '10.00', 'currency': 'PEN',
+        'created_at': '2026-01-01T00:00:00Z', 'updated_at': '2026-01-01T00:00:00Z',
+    }
+
+
+def make_handler(faults, orders=1000):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        @property
+        def base_url(self):
+            host = self.headers.get('Host') or '{}:{}'.format(*self.server.server_address)
+            return f'http://{host}'
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def _handle(self, method):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+            delay = faults.sample_latency()
+            if delay:
+                time.sleep(delay)
+            outcome = faults.decide()
+            path = urlsplit(self.path).path
+            shopify = _SHOPIFY_PATH.match(path)
+            if outcome == ERROR:
+                return self._send(503, {'errors': 'Error simulado'})
+            if outcome == THROTTLE:
+                if shopify and shopify['endpoint'] == 'graphql.json':
+                    return self._send(200, {
+                        'errors': [{'message': 'Throttled', 'extensions': {'code': 'THROTTLED'}}],
+                        'extensions': {'cost': {
+                            'requestedQueryCost': 10,
+                            'throttleStatus': {'maximumAvailable': 1000, 'currentlyAvailable': 0, 'restoreRate': 50},
+                        }},
+                    })
+                return self._send(429, {'errors': 'Exceeded 2 calls per second for api client.'}, {'Retry-After': '1'})
+            drip = outcome == DRIP
+            if path == '/payments/v1/js/index.js':
+                return self._send(200, FORM_SCRIPT, {'Content-Type': 'application/javascript'}, drip=drip)
+            if path.startswith('/api-payment/V4/'):
+                return self._izipay(path, drip)
+            if path == '/bulk/orders.jsonl':
+                lines = '\n'.join(json.dumps(_order_node(number)) for number in range(orders)) + '\n'
+                return self._send(200, lines.encode(), {'Content-Type': 'application/jsonl'}, drip=drip)
+            if shopify:
+                return self._shopify(method, shopify['endpoint'], body, drip)
+            return self._send(404, {'errors': 'Not Found'})
+
+        def _izipay(self, path, drip):
+            if not self.headers.get('Authorization'):
+                return self._send(401, {'status': 'ERROR', 'answer': {'errorCode': 'INT_902'}}, drip=drip)
+            answer = {}
+            if path.endswith('/Charge/CreatePayment'):
+                answer = {'formToken': uuid.uuid4().hex}
+            return self._send(200, {'status': 'SUCCESS', 'answer': answer}, drip=drip)
+
+        def _shopify(self, method, endpoint, body, drip):
+            headers = {'X-Shopify-Shop-Api-Call-Limit': '1/40'}
+            if endpoint == 'shop.json':
+                return self._send(200, {'shop': {'name': 'Tienda simulada'}}, headers, drip=drip)
+            if endpoint == 'orders.json':
+                query = parse_qs(urlsplit(self.path).query)
+                limit = int(query.get('limit', ['50'])[0])
+                start = int(query.get('page_info', ['0'])[0])
+                page = [_order_rest(number) for number in range(start, min(start + limit, orders))]
+                if start + limit < orders:
+                    next_url = f'{self.base_url}{urlsplit(self.path).path}?limit={limit}&page_info={start + limit}'
+                    headers['Link'] = f'<{next_url}>; rel="next"'
+                return self._send(200, {'orders': page}, headers, drip=drip)
+            if endpoint == 'graphql.json' and method == 'POST':
+                return self._send(200, self._graphql(json.loads(body or b'{}')), drip=drip)
+            return self._send(404, {'errors': 'Not Found'})
+
+        def _graphql(self, request):
+            query = request.get('query', '')
+            if 'orderMarkAsPaid' in query:
+                order_id = request.get('variables', {}).get('input', {}).get('id')
+                data = {'orderMarkAsPaid': {'order': {'id': order_id, 'displayFinancialStatus': 'PAID'}, 'userErrors': []}}
+            elif 'bulkOperationRunQuery' in query:
+                operation = {'id': 'gid://shopify/BulkOperation/1', 'status': 'CREATED'}
+                data = {'bulkOperationRunQuery': {'bulkOperation': operation, 'userErrors': []}}
+            elif 'BulkOperation' in query:
+                data = {'node': {
+                    'id': request.get('variables', {}).get('id'), 'status': 'COMPLETED', 'errorCode': None,
+                    'url': f'{self.base_url}/bulk/orders.jsonl', 'objectCount': str(orders),
+                }}
+            else:
+                data = {}
+            return {'data': data, 'extensions': {'cost': {
+                'requestedQueryCost': 10, 'actualQueryCost': 10,
+                'throttleStatus': {'maximumAvailable': 1000, 'currentlyAvailable': 990, 'restoreRate': 50},
+            }}}
+
+        def _send(self, status, payload, headers=None, drip=False):
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            headers = {'Content-Type': 'application/json', **(headers or {})}
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if not drip:
+                self.wfile.write(body)
+                return
+            # Cuerpo a cuentagotas: cada trozo llega antes del timeout de lectura
+            try:
+                for start in range(0, len(body), faults.drip_chunk):
+                    self.wfile.write(body[start:start + faults.drip_chunk])
+                    self.wfile.flush()
+                    time.sleep(faults.drip_interval)
+            except (BrokenPipeError, ConnectionResetError):
+                # El cliente se cansó de esperar: justo lo que se quería probar
+                self.close_connection = True
+
+    return Handler
+
+
+def create_server(host='127.0.0.1', port=0, faults=None, orders=1000):
+    return _StubHTTPServer((host, port), make_handler(faults or FaultProfile(), orders))
+
+
+@contextmanager
+def mock_upstreams(faults=None, orders=1000):
+    """Servidor simulado en un hilo; retorna su URL base (http://127.0.0.1:<puerto>)"""
+    server = create_server(faults=faults, orders=orders)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def upstream_settings(base_url):
+    """settings.UPSTREAMS que apuntan todos los upstreams al servidor simulado"""
+    return {
+        'IZIPAY_SANDBOX_URL': base_url,
+        'IZIPAY_PRODUCTION_URL': base_url,
+        'SHOPIFY_URL': f'{base_url}/{{shop}}',
+        'SHOPIFY_API_VERSION': '2024-04',
+    }
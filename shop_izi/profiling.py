@@ -0,0 +1,90 @@
+"""
+Perfilado de peticiones individuales (ver ProfilingMiddleware).
+
+Una petición perfilada registra sus consultas SQL (con duración), las llamadas
+a upstreams hechas con shop_izi.http / shop_izi.async_http y, si está
+activado, un perfil cProfile. Las llamadas a upstreams se asocian a la
+petición con un ContextVar, así que fuera de una petición perfilada el coste
+es una lectura de variable.
+"""
+import cProfile
+import io
+import pstats
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+
+DEFAULTS = {
+    'SAMPLE_RATE': 0.0,
+    'HEADER_TOKEN': '',
+    'SLOW_THRESHOLD_MS': 500,
+    'CPROFILE': True,
+    'MAX_QUERIES': 50,
+    'MAX_PROFILE_LINES': 40,
+}
+
+HEADER = 'X-Profile'
+
+_current = ContextVar('shop_izi_profile', default=None)
+
+
+def get_setting(name):
+    return getattr(settings, 'PROFILING', {}).get(name, DEFAULTS[name])
+
+
+def record_upstream(method, url, status, seconds):
+    profile = _current.get()
+    if profile is not None:
+        profile.upstream.append({
+            'method': method.upper(), 'url': url.split('?', 1)[0],
+            'status': str(status), 'ms': round(seconds * 1000, 2),
+        })
+
+
+class RequestProfile:
+    def __init__(self, use_cprofile=True):
+        self.queries = []
+        self.upstream = []
+        self.profiler = cProfile.Profile() if use_cprofile else None
+        self.duration_ms = 0.0
+        self._token = None
+        self._start = None
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - start) * 1000))
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        self._start = time.perf_counter()
+        if self.profiler:
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiler:
+            self.profiler.disable()
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        _current.reset(self._token)
+
+    def duplicate_queries(self):
+        """SQL repetido (mismo texto, p. ej. consultas N+1) con su número de ejecuciones"""
+        counts = Counter(sql for sql, _ in self.queries)
+        return [{'sql': sql, 'count': count} for sql, count in counts.most_common() if count > 1]
+
+    def slowest_queries(self, limit):
+        ranked = sorted(self.queries, key=lambda query: query[1], reverse=True)[:limit]
+        return [{'sql': sql, 'ms': round(ms, 2)} for sql, ms in ranked]
+
+    def profile_text(self, lines):
+        if not self.profiler:
+            return ''
+        output = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=output)
+        stats.strip_dirs().sort_stats('cumulative').print_stats(lines)
+        return output.getvalue()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,9 +42,13 @@ INSTALLED_APPS = [
     'drf_spectacular',
     'izipay',
     'shopify',
+    'jobs',
+    'monitoring',
 ]
 
 MIDDLEWARE = [
+    'shop_izi.middleware.MetricsMiddleware',
+    'shop_izi.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,12 +81,74 @@ WSGI_APPLICATION = 'shop_izi.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgres para producción; sqlite (por defecto) para un solo nodo.
+# Con SQLite, WAL permite lecturas concurrentes con una escritura en curso,
+# synchronous=NORMAL evita un fsync por commit (seguro en modo WAL) y las
+# transacciones IMMEDIATE toman el bloqueo de escritura al empezar, en lugar
+# de fallar con "database is locked" al pasar de lectura a escritura.
+# SQLITE_TUNING=0 vuelve a los valores por defecto de SQLite (para comparar).
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DB_POOL = os.environ.get('DB_POOL', '0') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'shop_izi'),
+            'USER': os.environ.get('POSTGRES_USER', 'shop_izi'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # El pool de psycopg (DB_POOL=1) reemplaza a las conexiones persistentes
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                },
+            } if DB_POOL else {},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+    if os.environ.get('SQLITE_TUNING', '1') == '1':
+        DATABASES['default']['OPTIONS'] = {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA cache_size=-20000;'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+            # Espera por el bloqueo de escritura (busy_timeout de sqlite3), en segundos
+            'timeout': 20,
+        }
+
+
+# Cache
+# La configuración activa de Izipay se cachea por proceso y se invalida con un
+# contador de generación guardado aquí; con varios workers (gunicorn) el backend
+# debe ser compartido, p. ej. REDIS_URL=redis://localhost:6379/0
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
 
 
 # Password validation
@@ -129,6 +196,16 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Configuración de DRF
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # orjson si está instalado, json de la librería estándar si no (shop_izi/fastjson.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'shop_izi.fastjson.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'shop_izi.fastjson.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Cambiar de IsAuthenticated a AllowAny
     ],
@@ -139,3 +216,70 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
+
+# Cliente HTTP saliente (shop_izi.http): pool keep-alive por host, timeouts y reintentos
+HTTP_CLIENT = {
+    'POOL_SIZE': int(os.environ.get('HTTP_POOL_SIZE', 10)),
+    'CONNECT_TIMEOUT': float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05)),
+    'READ_TIMEOUT': float(os.environ.get('HTTP_READ_TIMEOUT', 10)),
+    'MAX_RETRIES': int(os.environ.get('HTTP_MAX_RETRIES', 2)),
+    'BACKOFF_FACTOR': float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.3)),
+    'ASYNC_MAX_CONNECTIONS': int(os.environ.get('HTTP_ASYNC_MAX_CONNECTIONS', 200)),
+}
+
+# Métricas (/metrics): directorio compartido por los workers para sumar sus
+# métricas; debe vaciarse al arrancar el servidor. Sin él, solo las del proceso
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+
+# Perfilado de peticiones (shop_izi/profiling.py): fracción muestreada y/o
+# token del header X-Profile; las peticiones más lentas que el umbral se
+# guardan en monitoring.SlowRequest. Desactivado por defecto
+PROFILING = {
+    'SAMPLE_RATE': float(os.environ.get('PROFILING_SAMPLE_RATE', 0)),
+    'HEADER_TOKEN': os.environ.get('PROFILING_HEADER_TOKEN', ''),
+    'SLOW_THRESHOLD_MS': float(os.environ.get('PROFILING_SLOW_THRESHOLD_MS', 500)),
+    'CPROFILE': os.environ.get('PROFILING_CPROFILE', '1') != '0',
+}
+
+# Intervalo (s) del comando run_probes; test_connectivity sirve su último resultado
+PROBE_INTERVAL = float(os.environ.get('PROBE_INTERVAL', 60))
+
+# URLs base de los upstreams. Para pruebas de carga sin red se apuntan al
+# servidor simulado: python manage.py run_mock_upstreams
+UPSTREAMS = {
+    'IZIPAY_SANDBOX_URL': os.environ.get('IZIPAY_SANDBOX_URL', 'https://sandbox-checkout.izipay.pe'),
+    'IZIPAY_PRODUCTION_URL': os.environ.get('IZIPAY_PRODUCTION_URL', 'https://checkout.izipay.pe'),
+    # {shop} se reemplaza por ShopifyConfig.shop_name
+    'SHOPIFY_URL': os.environ.get('SHOPIFY_URL', 'https://{shop}'),
+    'SHOPIFY_API_VERSION': os.environ.get('SHOPIFY_API_VERSION', '2024-04'),
+}
+
+# Circuit breaker por upstream (ver shop_izi/breaker.py)
+CIRCUIT_BREAKER = {
+    'FAILURE_THRESHOLD': int(os.environ.get('BREAKER_FAILURE_THRESHOLD', 5)),
+    'ERROR_RATE': float(os.environ.get('BREAKER_ERROR_RATE', 0.5)),
+    'WINDOW': int(os.environ.get('BREAKER_WINDOW', 20)),
+    'MIN_CALLS': int(os.environ.get('BREAKER_MIN_CALLS', 10)),
+    'RESET_TIMEOUT': float(os.environ.get('BREAKER_RESET_TIMEOUT', 30)),
+}
+
+# Webhooks de Shopify: cola acotada en memoria y número de hilos que la procesan
+SHOPIFY_WEBHOOKS = {
+    'QUEUE_SIZE': int(os.environ.get('SHOPIFY_WEBHOOK_QUEUE_SIZE', 1000)),
+    'WORKERS': int(os.environ.get('SHOPIFY_WEBHOOK_WORKERS', 4)),
+}
+
+# Ritmo de llamadas a la API de Shopify por tienda (shopify.ratelimit); el estado
+# se comparte entre procesos a través de CACHES
+SHOPIFY_RATE_LIMIT = {
+    'REST_CAPACITY': int(os.environ.get('SHOPIFY_REST_CAPACITY', 40)),
+    'REST_LEAK_RATE': float(os.environ.get('SHOPIFY_REST_LEAK_RATE', 2)),
+    'GRAPHQL_CAPACITY': int(os.environ.get('SHOPIFY_GRAPHQL_CAPACITY', 1000)),
+    'GRAPHQL_RESTORE_RATE': float(os.environ.get('SHOPIFY_GRAPHQL_RESTORE_RATE', 50)),
+    'HEADROOM': 0.9,
+}
+
+# Cache-Control de los endpoints públicos active_config y script_info (precalculados, con ETag)
+IZIPAY_PUBLIC_CACHE_CONTROL = os.environ.get(
+    'IZIPAY_PUBLIC_CACHE_CONTROL', 'public, max-age=60, stale-while-revalidate=300'
+)
@@ -1,11 +1,14 @@
 from django.contrib import admin
 from django.urls import path, include
+from shop_izi.views import metrics_view, upstream_health
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('izipay/', include('izipay.urls')),
     path('shopify/', include('shopify.urls')),
+    path('health/upstreams/', upstream_health, name='upstream_health'),
+    path('metrics', metrics_view, name='metrics'),
     # Documentación de la API
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     # Interfaces de la documentación
@@ -0,0 +1,24 @@
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+from . import metrics
+from .breaker import get_health
+
+
+@require_GET
+def upstream_health(request):
+    """
+    Estado de los circuit breakers de todos los upstreams, leído del caché.
+    Un upstream que nunca falló no aparece: se considera disponible.
+    """
+    upstreams = get_health()
+    return JsonResponse({
+        'available': all(status['available'] for status in upstreams.values()),
+        'upstreams': upstreams,
+    })
+
+
+@require_GET
+def metrics_view(request):
+    """Métricas de todos los workers en formato de texto de Prometheus"""
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
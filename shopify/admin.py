@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import ShopifyConfig
+from .models import ShopifyConfig, ShopifyOrder, ShopifySyncState
 
 @admin.register(ShopifyConfig)
 class ShopifyConfigAdmin(admin.ModelAdmin):
@@ -21,3 +21,15 @@ class ShopifyConfigAdmin(admin.ModelAdmin):
         })
     )
     readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(ShopifyOrder)
+class ShopifyOrderAdmin(admin.ModelAdmin):
+    list_display = ('name', 'order_id', 'config', 'financial_status', 'total_price', 'currency', 'updated_at_shopify')
+    list_filter = ('financial_status', 'config')
+    search_fields = ('order_id', 'name', 'email')
+
+
+@admin.register(ShopifySyncState)
+class ShopifySyncStateAdmin(admin.ModelAdmin):
+    list_display = ('config', 'resource', 'bulk_operation_id', 'last_completed_at', 'updated_at')
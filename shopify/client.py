@@ -0,0 +1,68 @@
+import time
+
+import requests
+
+from shop_izi import fastjson, http
+from .ratelimit import ShopRateLimiter, get_setting
+
+
+class ShopifyAPIError(Exception):
+    pass
+
+
+class ShopifyClient:
+    """
+    Thin wrapper over the pooled HTTP client for a single ShopifyConfig.
+    Every Admin API call (REST or GraphQL) should go through here so it is
+    paced by the shop's shared rate-limit buckets.
+    """
+
+    # Attempts for a GraphQL call that still comes back THROTTLED
+    MAX_THROTTLED_ATTEMPTS = 3
+
+    def __init__(self, config):
+        self.config = config
+        self.headers = config.get_headers()
+        self.limiter = ShopRateLimiter(config.shop_name)
+
+    def request(self, method, url, **kwargs):
+        headers = dict(self.headers, **kwargs.pop('headers', {}))
+        try:
+            response = http.request(method, url, headers=headers, **kwargs)
+        except requests.exceptions.RequestException as e:
+            raise ShopifyAPIError(f"Request to {url} failed: {e}") from e
+        return response
+
+    def get(self, endpoint_or_url, params=None):
+        """GET a REST endpoint (e.g. 'orders.json') or an absolute URL such as a Link page."""
+        url = endpoint_or_url if endpoint_or_url.startswith('http') else self.config.get_api_url(endpoint_or_url)
+        self.limiter.rest.acquire()
+        response = self.request('GET', url, params=params)
+        self.limiter.observe_rest(response)
+        if response.status_code != 200:
+            raise ShopifyAPIError(f"GET {url} returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    def graphql(self, query, variables=None, cost=None):
+        """
+        Run a GraphQL query. `cost` is the expected query cost used to pace the
+        call; Shopify's reported throttleStatus corrects it afterwards.
+        """
+        cost = cost or get_setting('DEFAULT_QUERY_COST')
+        for attempt in range(1, self.MAX_THROTTLED_ATTEMPTS + 1):
+            self.limiter.graphql.acquire(cost)
+            response = self.request(
+                'POST', self.config.get_api_url('graphql.json'),
+                data=fastjson.dumps({'query': query, 'variables': variables or {}}),
+            )
+            if response.status_code != 200:
+                raise ShopifyAPIError(f"GraphQL returned {response.status_code}: {response.text[:200]}")
+            body = fastjson.loads(response.content)
+            self.limiter.observe_graphql(body)
+            wait = self.limiter.throttled_for(body)
+            if wait is None or attempt == self.MAX_THROTTLED_ATTEMPTS:
+                break
+            time.sleep(wait)
+        if body.get('errors'):
+            raise ShopifyAPIError(f"GraphQL errors: {body['errors']}")
+        return body
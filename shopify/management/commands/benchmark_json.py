@@ -0,0 +1,103 @@
+import io
+import json
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from shop_izi import fastjson
+
+
+def sample_order(number, line_items=40):
+    """An order shaped like Shopify's REST/webhook payload (~tens of KB with 40 line items)."""
+    address = {
+        'first_name': 'María', 'last_name': 'Quispe', 'address1': 'Av. Larco 1234', 'address2': 'Dpto. 502',
+        'city': 'Miraflores', 'province': 'Lima', 'country': 'Peru', 'zip': '15074', 'phone': '+51 999 888 777',
+        'company': None, 'latitude': -12.1211, 'longitude': -77.0297, 'country_code': 'PE', 'province_code': 'LIM',
+    }
+
+    def money(amount):
+        return {
+            'shop_money': {'amount': amount, 'currency_code': 'PEN'},
+            'presentment_money': {'amount': amount, 'currency_code': 'PEN'},
+        }
+
+    items = [{
+        'id': 13000000000 + index, 'admin_graphql_api_id': f'gid://shopify/LineItem/{13000000000 + index}',
+        'variant_id': 44000000000 + index, 'product_id': 8000000000 + index, 'sku': f'SKU-{index:05d}',
+        'title': f'Polo algodón pima {index}', 'variant_title': 'M / Azul', 'vendor': 'Tienda Demo',
+        'quantity': 1 + index % 3, 'price': '59.90', 'price_set': money('59.90'), 'total_discount': '0.00',
+        'total_discount_set': money('0.00'), 'grams': 250, 'requires_shipping': True, 'taxable': True,
+        'fulfillment_status': None, 'fulfillable_quantity': 1, 'gift_card': False,
+        'properties': [{'name': 'Grabado', 'value': 'Feliz cumpleaños'}],
+        'tax_lines': [{'title': 'IGV', 'rate': 0.18, 'price': '9.14', 'price_set': money('9.14')}],
+        'discount_allocations': [], 'duties': [],
+    } for index in range(line_items)]
+    return {
+        'id': 5500000000 + number, 'admin_graphql_api_id': f'gid://shopify/Order/{5500000000 + number}',
+        'name': f'#{1000 + number}', 'order_number': 1000 + number, 'email': f'cliente{number}@example.com',
+        'created_at': '2026-10-18T10:00:00-05:00', 'updated_at': '2026-10-18T10:05:00-05:00',
+        'processed_at': '2026-10-18T10:00:00-05:00', 'currency': 'PEN', 'presentment_currency': 'PEN',
+        'financial_status': 'paid', 'fulfillment_status': None, 'total_price': '2396.00',
+        'subtotal_price': '2396.00', 'total_tax': '365.49', 'total_discounts': '0.00',
+        'total_price_set': money('2396.00'), 'taxes_included': True, 'confirmed': True, 'test': False,
+        'gateway': 'izipay', 'payment_gateway_names': ['izipay'], 'tags': 'web, lima',
+        'note': 'Entregar en recepción', 'note_attributes': [{'name': 'dni', 'value': '45678912'}],
+        'customer': {
+            'id': 7000000000 + number, 'email': f'cliente{number}@example.com', 'first_name': 'María',
+            'last_name': 'Quispe', 'accepts_marketing': False, 'default_address': address, 'tags': '',
+        },
+        'billing_address': address, 'shipping_address': address,
+        'shipping_lines': [{'title': 'Envío Lima', 'price': '15.00', 'price_set': money('15.00'), 'tax_lines': []}],
+        'tax_lines': [{'title': 'IGV', 'rate': 0.18, 'price': '365.49', 'price_set': money('365.49')}],
+        'line_items': items, 'refunds': [], 'fulfillments': [], 'discount_codes': [],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare CPU time of DRF's stdlib JSON renderer/parser and stdlib json against "
+        "shop_izi.fastjson on real-sized Shopify order payloads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--line-items', type=int, default=40)
+        parser.add_argument('--page-size', type=int, default=20, help="Orders in the rendered API response.")
+
+    def handle(self, *args, **options):
+        order = sample_order(1, options['line_items'])
+        body = json.dumps(order).encode()
+        page = {
+            'count': options['page_size'],
+            'results': [dict(sample_order(n, options['line_items']), total_price=Decimal('2396.00'))
+                        for n in range(options['page_size'])],
+        }
+        self.stdout.write(
+            f"Backend: {'orjson' if fastjson.orjson else 'stdlib'}; webhook body {len(body) / 1024:.1f} KB, "
+            f"API response {len(fastjson.dumps(page)) / 1024:.1f} KB"
+        )
+        iterations = options['iterations']
+        drf_renderer, fast_renderer = JSONRenderer(), fastjson.FastJSONRenderer()
+        drf_parser, fast_parser = JSONParser(), fastjson.FastJSONParser()
+        pairs = [
+            ('webhook parse', lambda: json.loads(body), lambda: fastjson.loads(body)),
+            ('DRF request parse', lambda: drf_parser.parse(io.BytesIO(body)), lambda: fast_parser.parse(io.BytesIO(body))),
+            ('DRF response render', lambda: drf_renderer.render(page), lambda: fast_renderer.render(page)),
+            ('outbound serialize', lambda: json.dumps(order).encode(), lambda: fastjson.dumps(order)),
+        ]
+        for label, baseline, fast in pairs:
+            before, after = self._time(baseline, iterations), self._time(fast, iterations)
+            self.stdout.write(
+                f"{label:<20} stdlib {before:>9.1f} µs  fast {after:>8.1f} µs  "
+                f"saved {before - after:>8.1f} µs/request ({before / after:.1f}x)"
+            )
+
+    @staticmethod
+    def _time(function, iterations):
+        start = time.process_time()
+        for _ in range(iterations):
+            function()
+        return (time.process_time() - start) / iterations * 1e6
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from shopify.client import ShopifyAPIError
+from shopify.models import ShopifyConfig
+from shopify.sync import OrderSyncEngine
+
+
+class Command(BaseCommand):
+    help = "Sync Shopify orders (and transactions, in bulk mode) into the local tables. Resumes an interrupted run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', help="shop_name of the configuration to sync (defaults to the active one).")
+        parser.add_argument('--mode', choices=['bulk', 'rest'], default='bulk')
+        parser.add_argument('--since', help="Only orders updated at or after this ISO datetime.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--restart', action='store_true', help="Discard the stored cursor and start over.")
+
+    def handle(self, *args, **options):
+        if options['shop']:
+            config = ShopifyConfig.objects.filter(shop_name=options['shop']).first()
+        else:
+            config = ShopifyConfig.get_active_config()
+        if not config:
+            raise CommandError("No matching Shopify configuration found.")
+
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError(f"Invalid --since value: {options['since']}")
+
+        engine = OrderSyncEngine(config, batch_size=options['batch_size'])
+        if options['restart']:
+            engine.save_cursor('', bulk_operation_id='')
+        try:
+            if options['mode'] == 'bulk':
+                synced = engine.run_bulk(since)
+            else:
+                synced = engine.run_rest(since)
+        except ShopifyAPIError as e:
+            raise CommandError(f"Sync stopped, run again to resume: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Synced {synced} orders from {config.shop_name}."))
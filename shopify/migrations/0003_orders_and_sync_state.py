@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopify', '0002_shopifyconfig_access_token_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopifyOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.CharField(help_text='Numeric Shopify order id (legacyResourceId).', max_length=32)),
+                ('name', models.CharField(blank=True, max_length=64)),
+                ('email', models.CharField(blank=True, max_length=255)),
+                ('financial_status', models.CharField(blank=True, max_length=32)),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('currency', models.CharField(blank=True, max_length=3)),
+                ('created_at_shopify', models.DateTimeField(blank=True, null=True)),
+                ('updated_at_shopify', models.DateTimeField(blank=True, null=True)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+                ('config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='shopify.shopifyconfig')),
+            ],
+            options={
+                'verbose_name': 'Shopify Order',
+                'verbose_name_plural': 'Shopify Orders',
+                'constraints': [models.UniqueConstraint(fields=('config', 'order_id'), name='shopify_order_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShopifySyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(default='orders', max_length=32)),
+                ('bulk_operation_id', models.CharField(blank=True, help_text='GraphQL bulk operation being consumed.', max_length=255)),
+                ('cursor', models.TextField(blank=True, help_text='Next REST page URL, or lines already consumed from the bulk result.')),
+                ('last_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_states', to='shopify.shopifyconfig')),
+            ],
+            options={
+                'verbose_name': 'Shopify Sync State',
+                'verbose_name_plural': 'Shopify Sync States',
+                'constraints': [models.UniqueConstraint(fields=('config', 'resource'), name='shopify_sync_state_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShopifyTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_id', models.CharField(max_length=32)),
+                ('order_id', models.CharField(db_index=True, max_length=32)),
+                ('kind', models.CharField(blank=True, max_length=32)),
+                ('status', models.CharField(blank=True, max_length=32)),
+                ('gateway', models.CharField(blank=True, max_length=64)),
+                ('authorization', models.CharField(blank=True, max_length=255)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('currency', models.CharField(blank=True, max_length=3)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='shopify.shopifyconfig')),
+            ],
+            options={
+                'verbose_name': 'Shopify Transaction',
+                'verbose_name_plural': 'Shopify Transactions',
+                'constraints': [models.UniqueConstraint(fields=('config', 'transaction_id'), name='shopify_transaction_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopify', '0003_orders_and_sync_state'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shopifyconfig',
+            index=models.Index(fields=['created_at'], name='shopify_config_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shopifyconfig',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='shopify_active_config_idx'),
+        ),
+    ]
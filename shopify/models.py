@@ -15,13 +15,21 @@ class ShopifyConfig(models.Model):
     class Meta:
         verbose_name = "Shopify Configuration"
         verbose_name_plural = "Shopify Configurations"
+        indexes = [
+            models.Index(fields=['created_at'], name='shopify_config_created_idx'),
+            # Active stores in pk order: the get_active_config lookup, without a sort
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='shopify_active_config_idx'),
+        ]
 
     @classmethod
     def get_active_config(cls):
         return cls.objects.filter(is_active=True).first()
 
     def get_api_url(self, endpoint):
-        return f"https://{self.shop_name}/admin/api/2024-04/{endpoint}"
+        """Admin API URL; host and version come from settings.UPSTREAMS."""
+        from shop_izi.http import upstream_setting, upstream_url
+        base = upstream_url('SHOPIFY_URL').format(shop=self.shop_name)
+        return f"{base}/admin/api/{upstream_setting('SHOPIFY_API_VERSION')}/{endpoint}"
 
     def get_headers(self):
         if self.access_token:
@@ -40,15 +48,95 @@ class ShopifyConfig(models.Model):
 
     def test_connection(self):
         import requests
+        from shop_izi import http
         try:
-            url = self.get_api_url('shop.json')
-            headers = self.get_headers()
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                shop_data = response.json()
-                shop_name = shop_data.get('shop', {}).get('name', 'Unknown')
-                return True, f"Connection successful! Connected to: {shop_name}"
-            else:
-                return False, f"Connection failed. Status code: {response.status_code}, Response: {response.text}"
+            response = http.get(self.get_api_url('shop.json'), headers=self.get_headers())
         except requests.exceptions.RequestException as e:
             return False, f"An error occurred: {e}"
+        return self._connection_result(response)
+
+    async def atest_connection(self):
+        """Async variant of test_connection, used by monitoring.probes."""
+        import httpx
+        from shop_izi import async_http
+        try:
+            response = await async_http.get(self.get_api_url('shop.json'), headers=self.get_headers())
+        except httpx.HTTPError as e:
+            return False, f"An error occurred: {e}"
+        return self._connection_result(response)
+
+    def _connection_result(self, response):
+        from shop_izi import fastjson
+        if response.status_code == 200:
+            shop_data = fastjson.loads(response.content)
+            shop_name = shop_data.get('shop', {}).get('name', 'Unknown')
+            return True, f"Connection successful! Connected to: {shop_name}"
+        else:
+            return False, f"Connection failed. Status code: {response.status_code}, Response: {response.text}"
+
+
+class ShopifyOrder(models.Model):
+    """Local copy of a Shopify order, kept up to date by shopify.sync and the order webhooks."""
+    config = models.ForeignKey(ShopifyConfig, on_delete=models.CASCADE, related_name='orders')
+    order_id = models.CharField(max_length=32, help_text="Numeric Shopify order id (legacyResourceId).")
+    name = models.CharField(max_length=64, blank=True)
+    email = models.CharField(max_length=255, blank=True)
+    financial_status = models.CharField(max_length=32, blank=True)
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    currency = models.CharField(max_length=3, blank=True)
+    created_at_shopify = models.DateTimeField(null=True, blank=True)
+    updated_at_shopify = models.DateTimeField(null=True, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name or self.order_id} ({self.config})"
+
+    class Meta:
+        verbose_name = "Shopify Order"
+        verbose_name_plural = "Shopify Orders"
+        constraints = [
+            models.UniqueConstraint(fields=['config', 'order_id'], name='shopify_order_unique'),
+        ]
+
+
+class ShopifyTransaction(models.Model):
+    config = models.ForeignKey(ShopifyConfig, on_delete=models.CASCADE, related_name='transactions')
+    transaction_id = models.CharField(max_length=32)
+    order_id = models.CharField(max_length=32, db_index=True)
+    kind = models.CharField(max_length=32, blank=True)
+    status = models.CharField(max_length=32, blank=True)
+    gateway = models.CharField(max_length=64, blank=True)
+    authorization = models.CharField(max_length=255, blank=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    currency = models.CharField(max_length=3, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.amount} {self.currency} (order {self.order_id})"
+
+    class Meta:
+        verbose_name = "Shopify Transaction"
+        verbose_name_plural = "Shopify Transactions"
+        constraints = [
+            models.UniqueConstraint(fields=['config', 'transaction_id'], name='shopify_transaction_unique'),
+        ]
+
+
+class ShopifySyncState(models.Model):
+    """Where the last order sync stopped, so an interrupted run can resume."""
+    config = models.ForeignKey(ShopifyConfig, on_delete=models.CASCADE, related_name='sync_states')
+    resource = models.CharField(max_length=32, default='orders')
+    bulk_operation_id = models.CharField(max_length=255, blank=True, help_text="GraphQL bulk operation being consumed.")
+    cursor = models.TextField(blank=True, help_text="Next REST page URL, or lines already consumed from the bulk result.")
+    last_completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.config} {self.resource} sync"
+
+    class Meta:
+        verbose_name = "Shopify Sync State"
+        verbose_name_plural = "Shopify Sync States"
+        constraints = [
+            models.UniqueConstraint(fields=['config', 'resource'], name='shopify_sync_state_unique'),
+        ]
@@ -0,0 +1,146 @@
+"""
+Per-shop pacing for the Shopify Admin API.
+
+Shopify limits each shop with a leaky bucket: REST calls cost 1 and the bucket
+size/leak rate are reported in X-Shopify-Shop-Api-Call-Limit ("32/40"),
+GraphQL calls cost query points and report extensions.cost.throttleStatus.
+Instead of firing until a 429 comes back, every call reserves its cost in a
+bucket kept in the Django cache, so all workers and processes talking to the
+same shop share one view of the budget. When the reservation would push the
+bucket past HEADROOM of its capacity the caller sleeps until it has drained
+enough. Each response then corrects the estimate with what Shopify reports.
+
+Defaults match a standard plan and are overridden by settings.SHOPIFY_RATE_LIMIT.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULTS = {
+    'REST_CAPACITY': 40,
+    'REST_LEAK_RATE': 2.0,
+    'GRAPHQL_CAPACITY': 1000,
+    'GRAPHQL_RESTORE_RATE': 50.0,
+    'DEFAULT_QUERY_COST': 10,
+    'HEADROOM': 0.9,
+}
+
+# How long a bucket lock may be held before another process takes over
+LOCK_TIMEOUT = 2
+LOCK_WAIT = 1.0
+
+
+def get_setting(name):
+    return getattr(settings, 'SHOPIFY_RATE_LIMIT', {}).get(name, DEFAULTS[name])
+
+
+class LeakyBucket:
+    def __init__(self, key, capacity, rate):
+        self.key = key
+        self.lock_key = f'{key}:lock'
+        self.default_capacity = capacity
+        self.default_rate = rate
+
+    def _lock(self):
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + LOCK_WAIT
+        while not cache.add(self.lock_key, token, timeout=LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                # Better to pace on a slightly stale state than to stall
+                return None
+            time.sleep(0.005)
+        return token
+
+    def _unlock(self, token):
+        if token and cache.get(self.lock_key) == token:
+            cache.delete(self.lock_key)
+
+    def _load(self, now):
+        state = cache.get(self.key) or {
+            'level': 0.0, 'updated': now,
+            'capacity': self.default_capacity, 'rate': self.default_rate,
+        }
+        elapsed = max(0.0, now - state['updated'])
+        state['level'] = max(0.0, state['level'] - elapsed * state['rate'])
+        state['updated'] = now
+        return state
+
+    def reserve(self, cost=1):
+        """
+        Reserve `cost` units and return how many seconds the caller must wait
+        before sending. The reservation is taken immediately, so concurrent
+        callers queue up behind it instead of racing for the same capacity.
+        """
+        token = self._lock()
+        try:
+            now = time.time()
+            state = self._load(now)
+            limit = state['capacity'] * get_setting('HEADROOM')
+            wait = max(0.0, (state['level'] + cost - limit) / state['rate'])
+            state['level'] += cost
+            cache.set(self.key, state, timeout=None)
+        finally:
+            self._unlock(token)
+        return wait
+
+    def acquire(self, cost=1):
+        wait = self.reserve(cost)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def observe(self, used, capacity, rate=None):
+        """Replace the estimate with the usage Shopify reported."""
+        token = self._lock()
+        try:
+            state = self._load(time.time())
+            state['level'] = float(used)
+            state['capacity'] = capacity
+            if rate:
+                state['rate'] = float(rate)
+            cache.set(self.key, state, timeout=None)
+        finally:
+            self._unlock(token)
+
+
+class ShopRateLimiter:
+    """REST and GraphQL buckets for one shop, identified by ShopifyConfig.shop_name."""
+
+    def __init__(self, shop_name):
+        self.rest = LeakyBucket(
+            f'shopify:ratelimit:{shop_name}:rest',
+            get_setting('REST_CAPACITY'), get_setting('REST_LEAK_RATE'),
+        )
+        self.graphql = LeakyBucket(
+            f'shopify:ratelimit:{shop_name}:graphql',
+            get_setting('GRAPHQL_CAPACITY'), get_setting('GRAPHQL_RESTORE_RATE'),
+        )
+
+    def observe_rest(self, response):
+        header = response.headers.get('X-Shopify-Shop-Api-Call-Limit')
+        if not header:
+            return
+        try:
+            used, capacity = (int(value) for value in header.split('/'))
+        except ValueError:
+            return
+        self.rest.observe(used, capacity)
+
+    def observe_graphql(self, body):
+        throttle = (((body or {}).get('extensions') or {}).get('cost') or {}).get('throttleStatus')
+        if not throttle:
+            return
+        capacity = throttle['maximumAvailable']
+        self.graphql.observe(capacity - throttle['currentlyAvailable'], capacity, throttle.get('restoreRate'))
+
+    def throttled_for(self, body):
+        """Seconds to wait after a THROTTLED GraphQL error, or None if it was not throttled."""
+        errors = (body or {}).get('errors') or []
+        if not any((error.get('extensions') or {}).get('code') == 'THROTTLED' for error in errors):
+            return None
+        cost = (body.get('extensions') or {}).get('cost') or {}
+        throttle = cost.get('throttleStatus') or {}
+        missing = cost.get('requestedQueryCost', get_setting('DEFAULT_QUERY_COST')) - throttle.get('currentlyAvailable', 0)
+        return max(0.0, missing / throttle.get('restoreRate', get_setting('GRAPHQL_RESTORE_RATE')))
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from shop_izi.lean import LeanSerializer
 from .models import ShopifyConfig
 
 class ShopifyConfigSerializer(serializers.ModelSerializer):
@@ -16,4 +17,11 @@ class ConnectivityTestSerializer(serializers.Serializer):
 
 class ConnectivityTestResponseSerializer(serializers.Serializer):
     success = serializers.BooleanField()
-    message = serializers.CharField()
\ No newline at end of file
+    message = serializers.CharField()
+    latency_ms = serializers.FloatField(required=False)
+    timestamp = serializers.DateTimeField(required=False)
+
+
+# Lean (shop_izi.lean) versions for the active_config and test_connectivity hot paths
+config_public = LeanSerializer(ShopifyConfigPublicSerializer)
+connectivity_response = LeanSerializer(ConnectivityTestResponseSerializer)
@@ -1,3 +1,278 @@
-from django.test import TestCase
+import base64
+import hashlib
+import hmac
+import json
+import queue
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+
+from monitoring import probes
+from shop_izi import breaker
+from shop_izi.benchmarks import stub_server
+
+from . import sync, webhooks
+from .client import ShopifyAPIError
+from .models import ShopifyConfig, ShopifyOrder, ShopifyTransaction
+from .ratelimit import LeakyBucket, ShopRateLimiter
+from .serializers import (
+    ConnectivityTestResponseSerializer, ShopifyConfigPublicSerializer, config_public, connectivity_response,
+)
+from .sync import OrderSyncEngine, next_page_url
+
+
+def create_config(**kwargs):
+    data = {
+        'shop_name': 'test-store.myshopify.com',
+        'access_token': 'token',
+        'api_secret': 'secret',
+        'is_active': True,
+    }
+    data.update(kwargs)
+    return ShopifyConfig.objects.create(**data)
+
+
+def shopify_hmac(secret, body):
+    return base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+
+
+class OrderWebhookTests(TestCase):
+    body = json.dumps({'id': 820982911946154508, 'total_price': '199.00'}).encode()
+
+    def setUp(self):
+        cache.clear()
+        self.config = create_config()
+
+    def post(self, signature, topic='orders/paid'):
+        return self.client.post(
+            reverse('order_webhook'),
+            data=self.body,
+            content_type='application/json',
+            HTTP_X_SHOPIFY_TOPIC=topic,
+            HTTP_X_SHOPIFY_SHOP_DOMAIN=self.config.shop_name,
+            HTTP_X_SHOPIFY_HMAC_SHA256=signature,
+        )
+
+    def test_valid_webhook_is_queued_and_handled(self):
+        received = []
+        test_queue = webhooks.WebhookQueue(maxsize=10, workers=2)
+        with mock.patch.object(webhooks, 'webhook_queue', test_queue), \
+                mock.patch.object(webhooks, 'get_handlers', return_value=[lambda shop, payload: received.append(payload)]):
+            response = self.post(shopify_hmac('secret', self.body))
+            test_queue.join()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(received, [json.loads(self.body)])
+
+    def test_invalid_signature_is_rejected(self):
+        response = self.post(shopify_hmac('wrong', self.body))
+        self.assertEqual(response.status_code, 401)
+
+    def test_full_queue_asks_shopify_to_retry(self):
+        with mock.patch.object(webhooks.webhook_queue, 'submit', side_effect=queue.Full):
+            response = self.post(shopify_hmac('secret', self.body))
+        self.assertEqual(response.status_code, 503)
+
+
+class OrderSyncTests(TestCase):
+    def setUp(self):
+        self.config = create_config()
+
+    def bulk_line(self, order_id, amount='10.00', status='PAID'):
+        return json.dumps({
+            'id': f'gid://shopify/Order/{order_id}',
+            'legacyResourceId': str(order_id),
+            'name': f'#{order_id}',
+            'displayFinancialStatus': status,
+            'totalPriceSet': {'shopMoney': {'amount': amount, 'currencyCode': 'PEN'}},
+            'transactions': [{
+                'id': f'gid://shopify/OrderTransaction/{order_id}0',
+                'kind': 'SALE',
+                'status': 'SUCCESS',
+                'amountSet': {'shopMoney': {'amount': amount, 'currencyCode': 'PEN'}},
+            }],
+        }).encode()
+
+    def test_bulk_lines_are_upserted_in_batches(self):
+        engine = OrderSyncEngine(self.config, batch_size=2)
+        engine.consume_lines(self.bulk_line(order_id) for order_id in range(1, 6))
+        self.assertEqual(ShopifyOrder.objects.count(), 5)
+        self.assertEqual(ShopifyTransaction.objects.filter(order_id='3').count(), 1)
+        self.assertEqual(engine.state.cursor, '4')
+
+        engine.consume_lines([self.bulk_line(1, amount='12.50', status='REFUNDED')])
+        order = ShopifyOrder.objects.get(order_id='1')
+        self.assertEqual(order.total_price, Decimal('12.50'))
+        self.assertEqual(order.financial_status, 'refunded')
+        self.assertEqual(ShopifyOrder.objects.count(), 5)
+
+    def test_resume_skips_consumed_lines(self):
+        engine = OrderSyncEngine(self.config)
+        engine.consume_lines((self.bulk_line(order_id) for order_id in range(1, 4)), skip=2)
+        self.assertEqual(list(ShopifyOrder.objects.values_list('order_id', flat=True)), ['3'])
+
+    def test_switching_modes_mid_sync_starts_over(self):
+        engine = OrderSyncEngine(self.config)
+        engine.save_cursor('2', bulk_operation_id='gid://shopify/BulkOperation/1')
+
+        # REST run interrupted after its first page
+        next_url = 'https://s.myshopify.com/admin/api/2024-04/orders.json?page_info=def'
+        first_page = mock.Mock(
+            content=json.dumps({'orders': [{'id': 1, 'total_price': '10.00'}]}).encode(),
+            headers={'Link': f'<{next_url}>; rel="next"'},
+        )
+        with mock.patch.object(engine.client, 'get', side_effect=[first_page, ShopifyAPIError('timeout')]):
+            with self.assertRaises(ShopifyAPIError):
+                engine.run_rest()
+        engine.state.refresh_from_db()
+        self.assertEqual((engine.state.bulk_operation_id, engine.state.cursor), ('', next_url))
+
+        # A bulk run afterwards starts its own operation and reads every line
+        engine = OrderSyncEngine(self.config)
+        responses = [
+            {'data': {'bulkOperationRunQuery': {'bulkOperation': {'id': 'gid://shopify/BulkOperation/2'}, 'userErrors': []}}},
+            {'data': {'node': {'status': 'COMPLETED', 'url': 'https://storage.example/result.jsonl'}}},
+        ]
+        result = mock.MagicMock()
+        result.__enter__.return_value.iter_lines.return_value = [self.bulk_line(2), self.bulk_line(3)]
+        with mock.patch.object(engine.client, 'graphql', side_effect=responses), \
+                mock.patch.object(sync.http, 'get', return_value=result):
+            self.assertEqual(engine.run_bulk(), 2)
+        self.assertEqual(ShopifyTransaction.objects.count(), 2)
+        engine.state.refresh_from_db()
+        self.assertEqual((engine.state.bulk_operation_id, engine.state.cursor), ('', ''))
+
+    def test_next_page_url(self):
+        link = (
+            '<https://s.myshopify.com/admin/api/2024-04/orders.json?page_info=abc>; rel="previous", '
+            '<https://s.myshopify.com/admin/api/2024-04/orders.json?page_info=def>; rel="next"'
+        )
+        self.assertEqual(next_page_url(link), 'https://s.myshopify.com/admin/api/2024-04/orders.json?page_info=def')
+        self.assertIsNone(next_page_url('<https://x>; rel="previous"'))
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reservations_wait_once_headroom_is_used(self):
+        bucket = LeakyBucket('test:bucket', capacity=10, rate=2.0)
+        waits = [bucket.reserve() for _ in range(12)]
+        # 90% headroom: nine calls go straight through, the rest queue behind them
+        self.assertEqual(waits[:9], [0.0] * 9)
+        self.assertAlmostEqual(waits[9], 0.5, places=1)
+        self.assertAlmostEqual(waits[11], 1.5, places=1)
+
+    def test_rest_header_replaces_the_estimate(self):
+        limiter = ShopRateLimiter('test-store.myshopify.com')
+        response = mock.Mock(headers={'X-Shopify-Shop-Api-Call-Limit': '39/40'})
+        limiter.observe_rest(response)
+        self.assertGreater(limiter.rest.reserve(), 0)
+
+    def test_graphql_throttle_status(self):
+        limiter = ShopRateLimiter('test-store.myshopify.com')
+        body = {
+            'errors': [{'message': 'Throttled', 'extensions': {'code': 'THROTTLED'}}],
+            'extensions': {'cost': {
+                'requestedQueryCost': 150,
+                'throttleStatus': {'maximumAvailable': 1000, 'currentlyAvailable': 50, 'restoreRate': 50},
+            }},
+        }
+        limiter.observe_graphql(body)
+        self.assertEqual(limiter.throttled_for(body), 2.0)
+        self.assertGreater(limiter.graphql.reserve(100), 0)
+
+
+class LeanSerializerTests(TestCase):
+    def test_config_public_matches_model_serializer(self):
+        config = create_config(api_key='legacy-key')
+        row = config_public.values(ShopifyConfig.objects.filter(pk=config.pk)).get()
+        self.assertEqual(list(config_public.to_representation(row).items()),
+                         list(ShopifyConfigPublicSerializer(config).data.items()))
+
+    def test_active_config_endpoint(self):
+        config = create_config()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('shopify-config-active-config'))
+        self.assertEqual(response.json(), dict(ShopifyConfigPublicSerializer(config).data))
+
+    def test_connectivity_results(self):
+        results = [
+            {'success': True, 'message': 'Connection successful.', 'latency_ms': 41.25, 'timestamp': timezone.now()},
+            {'success': False, 'message': 'Connection failed', 'error': 'timeout'},
+            {'success': False, 'message': None, 'latency_ms': 3, 'timestamp': None},
+        ]
+        for result in results:
+            with self.subTest(result=result):
+                self.assertEqual(list(connectivity_response.to_representation(result).items()),
+                                 list(ConnectivityTestResponseSerializer(result).data.items()))
+
+
+class ActiveConfigTests(TestCase):
+    def test_several_stores_can_be_active(self):
+        first = create_config(shop_name='first.myshopify.com')
+        create_config(shop_name='second.myshopify.com')
+        first.refresh_from_db()
+        self.assertTrue(first.is_active)
+        self.assertEqual(ShopifyConfig.objects.filter(is_active=True).count(), 2)
+        self.assertEqual(ShopifyConfig.get_active_config(), first)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Expected plans are SQLite plans')
+    def test_active_lookup_reads_the_partial_index(self):
+        for number in range(5):
+            create_config(shop_name=f'store-{number}.myshopify.com')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(ShopifyConfig.get_active_config().shop_name, 'store-0.myshopify.com')
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {queries[0]['sql']}")
+            plan = ' / '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('shopify_active_config_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class AsyncConnectivityTests(TestCase):
+    """The ASGI endpoint serves what the async probes (httpx) recorded."""
+
+    def setUp(self):
+        cache.clear()
+        breaker.reset_breakers()
+        self.config = create_config()
+
+    def tearDown(self):
+        breaker.reset_breakers()
+
+    def probe_and_fetch(self, base_url):
+        with override_settings(UPSTREAMS={'SHOPIFY_URL': base_url}):
+            probes.run_once()
+        response = async_to_sync(self.async_client.post)(
+            reverse('test_connectivity_async'), {}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_success(self):
+        with stub_server() as base_url:
+            body = self.probe_and_fetch(base_url)
+        self.assertTrue(body['success'])
+        self.assertIn('Stub', body['message'])
+
+    def test_upstream_failure(self):
+        with stub_server(status=503, body=b'{}') as base_url:
+            body = self.probe_and_fetch(base_url)
+        self.assertFalse(body['success'])
+        self.assertIn('Status code: 503', body['message'])
+
+    def test_open_circuit(self):
+        with stub_server() as base_url:
+            circuit = breaker.get_breaker(base_url)
+            for _ in range(breaker.get_setting('FAILURE_THRESHOLD')):
+                circuit.record_failure('timeout')
+            body = self.probe_and_fetch(base_url)
+        self.assertFalse(body['success'])
+        self.assertIn('Circuito abierto', body['message'])
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ShopifyConfigViewSet, test_connectivity_page, ShopifyConfig
+from .views import ShopifyConfigViewSet, test_connectivity_page, test_connectivity_async, order_webhook, ShopifyConfig
 
 router = DefaultRouter()
 router.register(r'config', ShopifyConfigViewSet, basename='shopify-config')
 
 urlpatterns = [
     path('api/', include(router.urls)),
+    path('api/async/test_connectivity/', test_connectivity_async, name='test_connectivity_async'),
+    path('webhooks/orders/', order_webhook, name='order_webhook'),
     path('test/', test_connectivity_page, name='test_connectivity_page'),
 ]
\ No newline at end of file
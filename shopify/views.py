@@ -1,11 +1,22 @@
+import json
+import queue
+
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from izipay import tenants
+from monitoring import probes
+from monitoring.models import ProbeResult
+from . import webhooks
 from .models import ShopifyConfig
-from .serializers import ShopifyConfigSerializer, ShopifyConfigPublicSerializer, ConnectivityTestSerializer, ConnectivityTestResponseSerializer
+from .serializers import ShopifyConfigSerializer, ConnectivityTestSerializer, config_public, connectivity_response
+
+NOT_PROBED = 'No probe result for this configuration yet (see run_probes).'
 
 @method_decorator(csrf_exempt, name='dispatch')
 class ShopifyConfigViewSet(viewsets.ModelViewSet):
@@ -14,24 +25,24 @@ class ShopifyConfigViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def active_config(self, request):
-        config = ShopifyConfig.get_active_config()
-        if not config:
+        row = config_public.values(ShopifyConfig.objects.filter(is_active=True)).first()
+        if not row:
             return Response({'error': 'No active Shopify configuration found.'}, status=status.HTTP_404_NOT_FOUND)
-        serializer = ShopifyConfigPublicSerializer(config)
-        return Response(serializer.data)
+        return Response(config_public.to_representation(row))
 
     @action(detail=False, methods=['post'])
     def test_connectivity(self, request):
         """
-        Tests connectivity for a given config_id from the request body,
-        or the active configuration if no ID is provided.
+        Latest probed connectivity of a given config_id from the request body,
+        or the active configuration if no ID is provided. Results come from the
+        run_probes command; this endpoint never calls Shopify.
         """
         serializer = ConnectivityTestSerializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
             config_id = serializer.validated_data.get('config_id')
             if config_id:
                 try:
-                    config = ShopifyConfig.objects.get(pk=config_id)
+                    config = ShopifyConfig.objects.only('id').get(pk=config_id)
                 except ShopifyConfig.DoesNotExist:
                     return Response({'error': 'Configuration not found.'}, status=status.HTTP_404_NOT_FOUND)
             else:
@@ -39,12 +50,63 @@ class ShopifyConfigViewSet(viewsets.ModelViewSet):
                 if not config:
                     return Response({'error': 'No active Shopify configuration found.'}, status=status.HTTP_404_NOT_FOUND)
             
-            success, message = config.test_connection()
-            response_serializer = ConnectivityTestResponseSerializer(data={'success': success, 'message': message})
-            if response_serializer.is_valid():
-                return Response(response_serializer.data)
-            return Response(response_serializer.errors, status=status.HTTP_500_INTERNAL_SERVER_ERROR) # Should not happen
+            result = probes.cached_result(ProbeResult.TARGET_SHOPIFY, config.pk)
+            if result is None:
+                return Response({'error': NOT_PROBED}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            return Response(connectivity_response.to_representation(result))
 
 def test_connectivity_page(request):
     active_config = ShopifyConfig.get_active_config()
     return render(request, 'shopify/test_connectivity.html', {'config': active_config})
+
+
+@csrf_exempt
+@require_POST
+async def test_connectivity_async(request):
+    """
+    Async (ASGI) variant of ShopifyConfigViewSet.test_connectivity, also served
+    from the latest probe result.
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON body.'}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = ConnectivityTestSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    config_id = serializer.validated_data.get('config_id')
+    if config_id:
+        config = await ShopifyConfig.objects.only('id').filter(pk=config_id).afirst()
+        if not config:
+            return JsonResponse({'error': 'Configuration not found.'}, status=status.HTTP_404_NOT_FOUND)
+    else:
+        config = await ShopifyConfig.objects.only('id').filter(is_active=True).afirst()
+        if not config:
+            return JsonResponse({'error': 'No active Shopify configuration found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    result = await probes.acached_result(ProbeResult.TARGET_SHOPIFY, config.pk)
+    if result is None:
+        return JsonResponse({'error': NOT_PROBED}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return JsonResponse(connectivity_response.to_representation(result))
+
+
+@csrf_exempt
+@require_POST
+def order_webhook(request):
+    """
+    Receives orders/create and orders/paid webhooks. The payload is verified
+    and queued; handlers run on the webhook worker pool, never inline.
+    """
+    topic = request.headers.get('X-Shopify-Topic', '')
+    shop_domain = request.headers.get('X-Shopify-Shop-Domain', '')
+    config = tenants.get_shopify_config(shop_domain)
+    if not config or not webhooks.verify_hmac(config.api_secret, request.body, request.headers.get('X-Shopify-Hmac-Sha256')):
+        return HttpResponse('Invalid webhook signature.', status=status.HTTP_401_UNAUTHORIZED)
+    if topic not in webhooks.SUPPORTED_TOPICS:
+        # Acknowledge so Shopify does not keep retrying a topic we ignore
+        return HttpResponse(status=status.HTTP_200_OK)
+    try:
+        webhooks.webhook_queue.submit(topic, shop_domain, request.body)
+    except queue.Full:
+        return HttpResponse('Webhook queue is full, retry later.', status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return HttpResponse(status=status.HTTP_200_OK)
@@ -0,0 +1,116 @@
+"""
+Shopify webhook intake.
+
+The view only verifies the HMAC and hands the raw body to a bounded in-process
+queue; a small pool of worker threads parses the payload and runs the handlers
+registered for its topic. Shopify gives up on a delivery after 5 seconds, so
+nothing on the receive path may talk to an upstream. When the queue is full the
+view answers 503 and Shopify retries the delivery later.
+
+Sizes come from settings.SHOPIFY_WEBHOOKS ('QUEUE_SIZE', 'WORKERS').
+"""
+import base64
+import hashlib
+import hmac
+import logging
+import queue
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from shop_izi import fastjson
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_TOPICS = ('orders/create', 'orders/paid')
+
+_handlers = defaultdict(list)
+
+
+def register(topic):
+    """Decorator registering a handler(shop_domain, payload) for a webhook topic."""
+    def decorator(func):
+        _handlers[topic].append(func)
+        return func
+    return decorator
+
+
+def get_handlers(topic):
+    return list(_handlers.get(topic, ()))
+
+
+def verify_hmac(secret, body, header_value):
+    """X-Shopify-Hmac-Sha256 is the base64 HMAC-SHA256 of the raw body."""
+    if not secret or not header_value:
+        return False
+    digest = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest), header_value.encode('utf-8'))
+
+
+class WebhookQueue:
+    """Bounded queue drained by a lazily started pool of daemon threads."""
+
+    def __init__(self, maxsize=None, workers=None):
+        options = getattr(settings, 'SHOPIFY_WEBHOOKS', {})
+        self.maxsize = maxsize or options.get('QUEUE_SIZE', 1000)
+        self.workers = workers or options.get('WORKERS', 4)
+        self._queue = queue.Queue(maxsize=self.maxsize)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'shopify-webhook-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, topic, shop_domain, body):
+        """Enqueue without blocking; raises queue.Full when at capacity."""
+        self.start()
+        self._queue.put_nowait((topic, shop_domain, body))
+
+    def join(self):
+        """Block until every submitted webhook has been handled."""
+        self._queue.join()
+
+    def _work(self):
+        while True:
+            topic, shop_domain, body = self._queue.get()
+            try:
+                self.handle(topic, shop_domain, body)
+            except Exception:
+                logger.exception("Shopify webhook %s from %s failed", topic, shop_domain)
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+    def handle(self, topic, shop_domain, body):
+        payload = fastjson.loads(body)
+        for handler in get_handlers(topic):
+            handler(shop_domain, payload)
+
+
+webhook_queue = WebhookQueue()
+
+
+@register('orders/create')
+@register('orders/paid')
+def upsert_order(shop_domain, payload):
+    """Keep the local ShopifyOrder table current between syncs."""
+    from izipay import tenants
+    from .models import ShopifyOrder
+    from .sync import ORDER_UPDATE_FIELDS, order_from_rest
+
+    config = tenants.get_shopify_config(shop_domain)
+    if not config:
+        logger.warning("Order webhook for unknown shop %s", shop_domain)
+        return
+    ShopifyOrder.objects.bulk_create(
+        [order_from_rest(config, payload)], update_conflicts=True,
+        unique_fields=['config', 'order_id'], update_fields=ORDER_UPDATE_FIELDS,
+    )